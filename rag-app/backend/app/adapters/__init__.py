@@ -1,7 +1,11 @@
 """Adapters for vector and embedding integrations."""
 
+from .analyzer import Analyzer, get_analyzer
+from .ann import IVFIndex, make_dense_index
 from .db import upsert_document_record
 from .llm import LLMClient, call_llm
+from .quant import ProductQuantizedIndex, ScalarQuantizedIndex
+from .sparse import CorpusStats
 from .storage import (
     StorageAdapter,
     assert_no_unmanaged_writes,
@@ -20,14 +24,23 @@ from .vectors import (
     FaissIndex,
     QdrantIndex,
     hybrid_search,
+    hybrid_search_batch,
 )
 
 __all__ = [
+    "Analyzer",
+    "get_analyzer",
     "EmbeddingModel",
     "BM25Index",
+    "CorpusStats",
     "FaissIndex",
+    "IVFIndex",
+    "ScalarQuantizedIndex",
+    "ProductQuantizedIndex",
     "QdrantIndex",
+    "make_dense_index",
     "hybrid_search",
+    "hybrid_search_batch",
     "LLMClient",
     "call_llm",
     "StorageAdapter",
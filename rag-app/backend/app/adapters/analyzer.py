@@ -0,0 +1,149 @@
+"""Shared text analyzer: one tokenization per chunk, interned vocabulary.
+
+Every consumer that needs tokens (BM25 indexing and queries, the hashed
+embeddings built at chunk time, UF chunk sizing and context packing) goes
+through :func:`get_analyzer`. Texts are tokenized once with a ``\\w+``
+lowercase pattern; the result is cached under the text's content hash as an
+array of integer ids into the analyzer's vocabulary, so repeated texts (the
+same chunk ranked by five passes, sentences re-counted while chunking) are
+never split again and identical terms share one string object.
+
+The vocabulary is capped. Once it holds ``max_terms`` terms the analyzer
+starts a fresh one and drops the cached analyses, whose ids referred to the
+old one; an id array is only meaningful together with the vocabulary that
+produced it, which is why hashes are read through :meth:`Analyzer.token_hashes`.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import re
+import threading
+import zlib
+from collections import OrderedDict
+from functools import lru_cache
+from typing import NamedTuple
+
+import numpy as np
+
+from ..config import get_settings
+
+ANALYZER_NAME = "word-lower-v1"
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+class Vocabulary:
+    """Thread-safe interning of terms to dense integer ids."""
+
+    def __init__(self) -> None:
+        self._ids: dict[str, int] = {}
+        self._terms: list[str] = []
+        self._hashes: list[int] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+    def intern(self, terms: list[str]) -> np.ndarray:
+        """Return ids for *terms*, assigning new ids to unseen ones."""
+        ids = np.empty(len(terms), dtype=np.int32)
+        with self._lock:
+            for position, term in enumerate(terms):
+                term_id = self._ids.get(term)
+                if term_id is None:
+                    term_id = self._ids[term] = len(self._terms)
+                    self._terms.append(term)
+                    self._hashes.append(zlib.crc32(term.encode("utf-8")))
+                ids[position] = term_id
+        return ids
+
+    def term(self, term_id: int) -> str:
+        """Return the interned string for *term_id*."""
+        return self._terms[term_id]
+
+    def stable_hashes(self, ids: np.ndarray) -> np.ndarray:
+        """Process-independent 32-bit hashes of the terms behind *ids*."""
+        hashes = self._hashes
+        return np.fromiter((hashes[i] for i in ids.tolist()), np.uint32, len(ids))
+
+
+class _Analysis(NamedTuple):
+    ids: np.ndarray
+    terms: tuple[str, ...]
+    vocabulary: Vocabulary
+
+
+class Analyzer:
+    """Tokenize texts once and cache token-id arrays by content hash."""
+
+    def __init__(self, cache_size: int = 65536, max_terms: int = 1_000_000) -> None:
+        self.vocabulary = Vocabulary()
+        self._cache_size = max(int(cache_size), 0)
+        self._max_terms = max(int(max_terms), 1)
+        self._cache: OrderedDict[bytes, _Analysis] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.rotations = 0
+
+    def _analyze(self, text: str) -> _Analysis:
+        key = hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return cached
+            self.misses += 1
+            vocabulary = self.vocabulary
+        ids = vocabulary.intern(_TOKEN_PATTERN.findall(text.lower()))
+        ids.flags.writeable = False
+        entry = _Analysis(
+            ids, tuple(vocabulary.term(i) for i in ids.tolist()), vocabulary
+        )
+        with self._lock:
+            if len(vocabulary) >= self._max_terms and vocabulary is self.vocabulary:
+                # Term ids cannot be reclaimed one by one without invalidating
+                # cached arrays, so the whole vocabulary is retired at once.
+                self.vocabulary = Vocabulary()
+                self._cache.clear()
+                self.rotations += 1
+            elif self._cache_size and vocabulary is self.vocabulary:
+                self._cache[key] = entry
+                while len(self._cache) > self._cache_size:
+                    self._cache.popitem(last=False)
+        return entry
+
+    def token_ids(self, text: str) -> np.ndarray:
+        """Return the (read-only) token-id array of *text*."""
+        return self._analyze(text).ids
+
+    def token_hashes(self, text: str) -> np.ndarray:
+        """Return process-independent 32-bit hashes of *text*'s tokens."""
+        analysis = self._analyze(text)
+        return analysis.vocabulary.stable_hashes(analysis.ids)
+
+    def terms(self, text: str) -> tuple[str, ...]:
+        """Return the interned terms of *text* in order."""
+        return self._analyze(text).terms
+
+    def count(self, text: str) -> int:
+        """Return the number of tokens in *text*."""
+        return len(self._analyze(text).ids)
+
+    def clear(self) -> None:
+        """Drop cached analyses (the vocabulary is kept)."""
+        with self._lock:
+            self._cache.clear()
+            self.hits = self.misses = 0
+
+
+@lru_cache(maxsize=1)
+def get_analyzer() -> Analyzer:
+    """Return the process-wide analyzer."""
+    settings = get_settings()
+    return Analyzer(settings.analyzer_cache_size, settings.analyzer_max_terms)
+
+
+__all__ = ["ANALYZER_NAME", "Analyzer", "Vocabulary", "get_analyzer"]
@@ -0,0 +1,249 @@
+"""Approximate nearest-neighbour dense indexes."""
+
+from __future__ import annotations
+
+import threading
+from typing import Any
+
+import numpy as np
+
+from ..config import get_settings
+from ..util.logging import get_logger
+from .dense import FaissIndex
+from .quant import ProductQuantizedIndex, ScalarQuantizedIndex
+from .vector_format import VectorFile
+
+logger = get_logger(__name__)
+
+_TRAIN_ROWS_PER_LIST = 4
+_MAX_TRAIN_ROWS_PER_LIST = 64
+_TRAIN_ITERATIONS = 10
+_ASSIGN_BATCH = 65536
+_COMPACT_MIN_PENDING = 256
+
+
+class _InvertedLists:
+    """Centroids and the rows filed under each, published as one unit."""
+
+    def __init__(self, centroids: np.ndarray, assignment: np.ndarray) -> None:
+        nlist = len(centroids)
+        order = np.argsort(assignment, kind="stable")
+        bounds = np.searchsorted(assignment[order], np.arange(nlist + 1))
+        self.centroids = centroids
+        self.lists = [
+            order[bounds[i] : bounds[i + 1]].astype(np.int64) for i in range(nlist)
+        ]
+        self.pending: list[list[int]] = [[] for _ in range(nlist)]
+
+    def bucket(self, list_id: int) -> np.ndarray:
+        """Return the rows filed under *list_id* without modifying anything."""
+        filed = self.lists[list_id]
+        pending = list(self.pending[list_id])
+        if not pending:
+            return filed
+        return np.concatenate([filed, np.asarray(pending, dtype=np.int64)])
+
+    def compact(self, list_id: int) -> None:
+        """Fold a list's pending rows into its array (writers only)."""
+        # Publish the merged array before clearing pending so a search racing
+        # with compaction sees rows twice (deduplicated) rather than not at all.
+        self.lists[list_id] = self.bucket(list_id)
+        self.pending[list_id] = []
+
+
+class IVFIndex(FaissIndex):
+    """Inverted-file index bucketing rows under spherical k-means centroids.
+
+    A query scores the centroids, then only the rows filed under the
+    ``nprobe`` closest ones. Raising ``nprobe`` trades latency for recall;
+    ``nprobe == nlist`` is exact. Training happens on the write path, under a
+    lock: once the index holds enough rows (``nlist * 4``; searches score
+    exactly until then) and again whenever it has doubled since. Rows added
+    in between are filed under their nearest centroid. Searches only read a
+    snapshot of the lists, so they never train or reorganise them.
+    """
+
+    index_type = "ivf"
+
+    def __init__(
+        self,
+        dim: int,
+        index_path: str | None = None,
+        nlist: int | None = None,
+        nprobe: int | None = None,
+    ) -> None:
+        """Create or load index.
+
+        ``nlist``/``nprobe`` default to the values saved with a loaded index,
+        then to settings.
+        """
+        settings = get_settings()
+        self.nlist = max(int(nlist or settings.vector_ivf_nlist), 1)
+        self.nprobe = max(int(nprobe or settings.vector_ivf_nprobe), 1)
+        self._given = {"nlist": nlist is not None, "nprobe": nprobe is not None}
+        self._ivf: _InvertedLists | None = None
+        self._trained_rows = 0
+        self._lock = threading.Lock()
+        super().__init__(dim, index_path)
+
+    @property
+    def params(self) -> dict[str, Any]:
+        """Return the parameters recorded alongside the index."""
+        return {"nlist": self.nlist, "nprobe": self.nprobe}
+
+    @property
+    def is_trained(self) -> bool:
+        """Return True once coarse centroids exist."""
+        return self._ivf is not None
+
+    def train(self) -> None:
+        """Fit centroids on (a sample of) the stored rows and file every row."""
+        with self._lock:
+            if self._ivf is None or self._trained_rows != self._count:
+                self._train()
+
+    def _train(self) -> None:
+        rows = self._matrix[: self._count]
+        nlist = min(self.nlist, len(rows))
+        if nlist == 0:
+            return
+        rng = np.random.default_rng(0)
+        sample_size = min(len(rows), nlist * _MAX_TRAIN_ROWS_PER_LIST)
+        sample = np.asarray(rows[np.sort(rng.choice(len(rows), sample_size, False))])
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+        for _ in range(_TRAIN_ITERATIONS):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, sample)
+            counts = np.bincount(assignment, minlength=nlist)
+            empty = counts == 0
+            if empty.any():
+                sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))]
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            norms[norms == 0.0] = 1.0
+            centroids = (sums / norms).astype(np.float32)
+        self._ivf = _InvertedLists(centroids, _assign(centroids, rows))
+        self._trained_rows = len(rows)
+        self._bump_version("train", len(rows))
+        logger.info(
+            "ivf.train",
+            extra={"rows": len(rows), "nlist": nlist, "sample": sample_size},
+        )
+
+    def _added(self, start: int, end: int) -> None:
+        with self._lock:
+            ivf = self._ivf
+            if ivf is None or end >= 2 * self._trained_rows:
+                if end >= self.nlist * _TRAIN_ROWS_PER_LIST:
+                    self._train()
+                return
+            rows = self._matrix[start:end]
+            touched: set[int] = set()
+            for row, list_id in enumerate(_assign(ivf.centroids, rows), start):
+                ivf.pending[int(list_id)].append(row)
+                touched.add(int(list_id))
+            for list_id in touched:
+                limit = max(_COMPACT_MIN_PENDING, len(ivf.lists[list_id]) // 4)
+                if len(ivf.pending[list_id]) > limit:
+                    ivf.compact(list_id)
+
+    def _updated(self, rows: np.ndarray) -> None:
+        with self._lock:
+            ivf = self._ivf
+            if ivf is None or not len(rows):
+                return
+            # Moved rows may change lists; refile everything (updates are rare).
+            rows_now = self._matrix[: self._count]
+            self._ivf = _InvertedLists(ivf.centroids, _assign(ivf.centroids, rows_now))
+
+    def _search_unit(self, query: np.ndarray, k: int) -> list[tuple[int, float]]:
+        ivf = self._ivf
+        if ivf is None:
+            return super()._search_unit(query, k)
+        probes = np.argsort(-(ivf.centroids @ query), kind="stable")[: self.nprobe]
+        candidates = np.unique(np.concatenate([ivf.bucket(int(p)) for p in probes]))
+        if not len(candidates):
+            return []
+        scores = self._matrix[candidates] @ query
+        return [(int(candidates[i]), score) for i, score in self._top_k(scores, k)]
+
+    def _search_units(
+        self, queries: np.ndarray, k: int
+    ) -> list[list[tuple[int, float]]]:
+        # Probed lists differ per query, so each one is scanned on its own.
+        return [self._search_unit(query, k) for query in queries]
+
+    def _persisted_arrays(self) -> tuple[dict[str, np.ndarray], dict[str, Any]]:
+        meta: dict[str, Any] = {"index_type": self.index_type, **self.params}
+        with self._lock:
+            ivf = self._ivf
+            if ivf is None:
+                return {}, meta
+            assignment = np.empty(self._count, dtype=np.int32)
+            for list_id in range(len(ivf.lists)):
+                assignment[ivf.bucket(list_id)] = list_id
+        return {"ivf_centroids": ivf.centroids, "ivf_assign": assignment}, meta
+
+    def _restore(self, stored: VectorFile) -> None:
+        if not self._given["nlist"] and stored.meta.get("nlist"):
+            self.nlist = max(int(stored.meta["nlist"]), 1)
+        if not self._given["nprobe"] and stored.meta.get("nprobe"):
+            self.nprobe = max(int(stored.meta["nprobe"]), 1)
+        centroids = stored.arrays.get("ivf_centroids")
+        assignment = stored.arrays.get("ivf_assign")
+        if centroids is None or assignment is None:
+            return
+        if len(assignment) != stored.count or centroids.shape[1:] != (self._dim,):
+            logger.warning("ivf.restore_mismatch", extra={"rows": stored.count})
+            return
+        self._ivf = _InvertedLists(
+            np.asarray(centroids, dtype=np.float32), np.asarray(assignment)
+        )
+        self._trained_rows = stored.count
+
+
+def _assign(centroids: np.ndarray, rows: np.ndarray) -> np.ndarray:
+    """Index of the closest centroid (by inner product) for every row."""
+    assignment = np.empty(len(rows), dtype=np.int32)
+    for start in range(0, len(rows), _ASSIGN_BATCH):
+        block = np.asarray(rows[start : start + _ASSIGN_BATCH])
+        assignment[start : start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return assignment
+
+
+def make_dense_index(
+    dim: int,
+    index_path: str | None = None,
+    index_type: str | None = None,
+    params: dict[str, Any] | None = None,
+) -> FaissIndex:
+    """Return the dense index selected by ``vector_index_type``.
+
+    *params* are the ``params`` of a saved index (as recorded in an index
+    manifest); entries the selected index type does not take are ignored.
+    """
+
+    kind = (index_type or get_settings().vector_index_type).lower()
+    options = params or {}
+    if kind == IVFIndex.index_type:
+        return IVFIndex(
+            dim, index_path, nlist=options.get("nlist"), nprobe=options.get("nprobe")
+        )
+    if kind == ScalarQuantizedIndex.index_type:
+        return ScalarQuantizedIndex(
+            dim, index_path, rescore_factor=options.get("rescore_factor")
+        )
+    if kind == ProductQuantizedIndex.index_type:
+        return ProductQuantizedIndex(
+            dim,
+            index_path,
+            subvectors=options.get("subvectors"),
+            rescore_factor=options.get("rescore_factor"),
+            ksub=int(options.get("ksub", 256)),
+        )
+    if kind == FaissIndex.index_type:
+        return FaissIndex(dim, index_path)
+    raise ValueError(f"unknown dense index type: {kind}")
+
+
+__all__ = ["IVFIndex", "make_dense_index"]
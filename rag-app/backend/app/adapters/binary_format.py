@@ -0,0 +1,160 @@
+"""Shared container helpers for the binary, memory-mappable index formats.
+
+Dense (:mod:`.vector_format`) and BM25 (:mod:`.sparse_format`) index files
+share one container::
+
+    [struct header: magic, version, ...][64-byte aligned arrays][JSON trailer]
+
+The header layout is format specific but always starts with the 8-byte magic
+and a ``uint32`` format version and ends with the trailer's offset and
+length. The trailer records each array's offset, dtype and shape next to the
+format's own fields. Files are written to a unique sibling temp file and
+renamed into place, and arrays are opened with :class:`numpy.memmap` so
+processes share pages through the OS cache.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import struct
+import tempfile
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+ALIGN = 64
+
+
+def aligned(offset: int) -> int:
+    """Round *offset* up to the next array boundary."""
+    return (offset + ALIGN - 1) // ALIGN * ALIGN
+
+
+def has_magic(path: str | Path, magic: bytes) -> bool:
+    """Return True when *path* starts with *magic*."""
+    try:
+        with Path(path).open("rb") as handle:
+            return handle.read(len(magic)) == magic
+    except OSError:
+        return False
+
+
+def place_arrays(
+    arrays: dict[str, np.ndarray], offset: int
+) -> tuple[dict[str, dict[str, Any]], list[tuple[int, np.ndarray]], int]:
+    """Lay *arrays* out from *offset*; return trailer specs, placements, end."""
+    layout: dict[str, dict[str, Any]] = {}
+    placed: list[tuple[int, np.ndarray]] = []
+    for name, values in arrays.items():
+        array = np.ascontiguousarray(values)
+        offset = aligned(offset)
+        layout[name] = {
+            "offset": offset,
+            "dtype": array.dtype.str,
+            "shape": list(array.shape),
+        }
+        placed.append((offset, array))
+        offset += array.nbytes
+    return layout, placed, offset
+
+
+def encode_trailer(trailer: dict[str, Any]) -> bytes:
+    """Serialise a trailer; its length goes into the header."""
+    return json.dumps(trailer, ensure_ascii=False).encode("utf-8")
+
+
+def write_container(
+    target: Path,
+    header: bytes,
+    placed: list[tuple[int, np.ndarray]],
+    trailer_offset: int,
+    trailer: bytes,
+) -> None:
+    """Atomically write *header*, *placed* arrays and the encoded *trailer*."""
+    target.parent.mkdir(parents=True, exist_ok=True)
+    # Write beside the target and rename so readers holding a mapping of the
+    # previous file never observe a truncated or partially written index.
+    # The temp name is unique per writer, so concurrent saves never share it.
+    fd, temp = tempfile.mkstemp(
+        dir=target.parent, prefix=f".{target.name}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            handle.write(header)
+            for array_offset, array in placed:
+                handle.seek(array_offset)
+                array.tofile(handle)
+            handle.seek(trailer_offset)
+            handle.write(trailer)
+        os.replace(temp, target)
+    except BaseException:
+        Path(temp).unlink(missing_ok=True)
+        raise
+
+
+def read_container(
+    source: Path,
+    header: struct.Struct,
+    magic: bytes,
+    max_version: int,
+    label: str,
+) -> tuple[tuple[Any, ...], dict[str, Any]]:
+    """Validate the header of *source*; return its fields and decoded trailer."""
+    with source.open("rb") as handle:
+        raw = handle.read(header.size)
+        if len(raw) < header.size:
+            raise ValueError(f"truncated {label} header: {source}")
+        fields = header.unpack(raw)
+        if fields[0] != magic:
+            raise ValueError(f"not a binary {label}: {source}")
+        if fields[1] > max_version:
+            raise ValueError(f"unsupported {label} version {fields[1]}")
+        trailer_offset, trailer_length = fields[-2:]
+        handle.seek(trailer_offset)
+        trailer = json.loads(handle.read(trailer_length).decode("utf-8") or "{}")
+    return fields, trailer
+
+
+def load_array(
+    source: Path, offset: int, dtype: Any, shape: tuple[int, ...], mmap: bool
+) -> np.ndarray:
+    """Open one array of *source*; a read-only memory map when *mmap*."""
+    count = int(np.prod(shape))
+    if not count:
+        return np.empty(shape, dtype=dtype)
+    if mmap:
+        return np.memmap(source, dtype=dtype, mode="r", offset=offset, shape=shape)
+    with source.open("rb") as handle:
+        handle.seek(offset)
+        return np.fromfile(handle, dtype=dtype, count=count).reshape(shape)
+
+
+def load_arrays(
+    source: Path, layout: dict[str, dict[str, Any]], mmap: bool
+) -> dict[str, np.ndarray]:
+    """Open every array described by a trailer *layout*."""
+    return {
+        name: load_array(
+            source,
+            int(spec["offset"]),
+            np.dtype(spec["dtype"]),
+            tuple(spec["shape"]),
+            mmap,
+        )
+        for name, spec in layout.items()
+    }
+
+
+__all__ = [
+    "ALIGN",
+    "aligned",
+    "encode_trailer",
+    "has_magic",
+    "load_array",
+    "load_arrays",
+    "place_arrays",
+    "read_container",
+    "write_container",
+]
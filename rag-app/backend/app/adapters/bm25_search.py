@@ -0,0 +1,150 @@
+"""Top-k BM25 scoring over postings lists: exhaustive, MaxScore and batched.
+
+:class:`~.sparse.BM25Index` resolves a query to ``(term, weight, postings)``
+triples and per-document length norms ``k1 * (1 - b + b * dl / avgdl)``; the
+functions here turn those into ranked ``(row, score)`` pairs. Every path
+accumulates a document's score in query-term order, so all three return the
+same floats, and ties resolve towards the earlier row.
+"""
+
+from __future__ import annotations
+
+import heapq
+
+import numpy as np
+
+from ..util.logging import get_logger
+from .postings import PostingList
+
+logger = get_logger(__name__)
+
+QueryTerm = tuple[str, float, PostingList]
+# Per-row length norms; memory-mapped straight from disk for loaded indexes.
+Norms = list[float] | np.ndarray
+
+# Relative slack on pruning decisions so float rounding of upper-bound sums can
+# never discard a document whose exact score reaches the threshold.
+_PRUNE_SLACK = 1e-9
+
+
+def _below(bound: float, threshold: float) -> bool:
+    return bound < threshold - _PRUNE_SLACK * abs(threshold)
+
+
+def search_exhaustive(
+    terms: list[QueryTerm], k: int, norms: Norms, dead: set[int]
+) -> list[tuple[int, float]]:
+    """Score every live posting of *terms* and return the top *k*."""
+    scores: dict[int, float] = {}
+    for _, weight, postings in terms:
+        for doc_id, tf in zip(postings.docs, postings.tfs, strict=True):
+            if doc_id in dead:
+                continue
+            scores[doc_id] = scores.get(doc_id, 0.0) + weight * (
+                tf / (tf + norms[doc_id])
+            )
+    # Ties resolve towards the earlier document, matching insertion order.
+    return heapq.nlargest(k, scores.items(), key=lambda item: (item[1], -item[0]))
+
+
+def search_pruned(
+    terms: list[QueryTerm],
+    bounds: list[float],
+    k: int,
+    norms: Norms,
+    dead: set[int],
+) -> list[tuple[int, float]]:
+    """MaxScore top-*k*; *bounds* caps each term's contribution to one row."""
+    # Score terms from the highest bound down; once the bounds of the
+    # remaining terms cannot lift an unseen document past the k-th best
+    # partial score, those terms are only probed for candidates.
+    order = sorted(range(len(terms)), key=lambda i: -bounds[i])
+    remaining = [0.0] * (len(order) + 1)
+    for position in range(len(order) - 1, -1, -1):
+        remaining[position] = remaining[position + 1] + bounds[order[position]]
+
+    partial: dict[int, float] = {}
+    position = 0
+    while position < len(order):
+        if len(partial) >= k:
+            threshold = heapq.nlargest(k, partial.values())[-1]
+            if _below(remaining[position], threshold):
+                break
+        _, weight, postings = terms[order[position]]
+        for doc_id, tf in zip(postings.docs, postings.tfs, strict=True):
+            if doc_id in dead:
+                continue
+            partial[doc_id] = partial.get(doc_id, 0.0) + weight * (
+                tf / (tf + norms[doc_id])
+            )
+        position += 1
+    skipped = sum(len(terms[i][2]) for i in order[position:])
+
+    candidates = list(partial)
+    while position < len(order) and len(candidates) > k:
+        threshold = heapq.nlargest(k, (partial[d] for d in candidates))[-1]
+        candidates = [
+            doc_id
+            for doc_id in candidates
+            if not _below(partial[doc_id] + remaining[position], threshold)
+        ]
+        _, weight, postings = terms[order[position]]
+        for doc_id in candidates:
+            tf = postings.tf_of(doc_id)
+            if tf:
+                partial[doc_id] += weight * (tf / (tf + norms[doc_id]))
+        position += 1
+
+    # Re-sum survivors in query-term order so floats match exhaustive scoring.
+    scores: dict[int, float] = {}
+    for doc_id in candidates:
+        score = 0.0
+        for _, weight, postings in terms:
+            tf = postings.tf_of(doc_id)
+            if tf:
+                score = score + weight * (tf / (tf + norms[doc_id]))
+        scores[doc_id] = score
+    logger.debug(
+        "bm25.search_pruned",
+        extra={"terms": len(terms), "skipped_postings": skipped, "k": k},
+    )
+    return heapq.nlargest(k, scores.items(), key=lambda item: (item[1], -item[0]))
+
+
+def search_batch(
+    per_query: list[list[QueryTerm]], k: int, norms: np.ndarray, live: np.ndarray
+) -> list[list[tuple[int, float]]]:
+    """Top-*k* for several queries, saturating each distinct term once."""
+    saturated: dict[str, tuple[np.ndarray, np.ndarray]] = {}
+    for terms in per_query:
+        for term, _, postings in terms:
+            if term in saturated:
+                continue
+            docs = np.asarray(postings.docs, dtype=np.int64)
+            tfs = np.asarray(postings.tfs, dtype=np.float64)
+            keep = live[docs]
+            docs, tfs = docs[keep], tfs[keep]
+            saturated[term] = (docs, tfs / (tfs + norms[docs]))
+
+    scores = np.zeros(len(live), dtype=np.float64)
+    touched = np.zeros(len(live), dtype=bool)
+    results: list[list[tuple[int, float]]] = []
+    for terms in per_query:
+        # Accumulate in query-term order, as the single-query paths do.
+        for term, weight, _ in terms:
+            docs, values = saturated[term]
+            scores[docs] += weight * values
+            touched[docs] = True
+        rows = np.flatnonzero(touched)
+        order = np.lexsort((rows, -scores[rows]))[:k]
+        results.append([(int(rows[i]), float(scores[rows[i]])) for i in order])
+        scores[rows] = 0.0
+        touched[rows] = False
+    logger.debug(
+        "bm25.search_batch",
+        extra={"queries": len(per_query), "terms": len(saturated), "k": k},
+    )
+    return results
+
+
+__all__ = ["Norms", "QueryTerm", "search_batch", "search_exhaustive", "search_pruned"]
@@ -0,0 +1,388 @@
+"""Disk-backed cache and request coalescing for deterministic completions.
+
+Completions requested at ``temperature == 0`` are keyed by a sha256 of the
+model, the messages and every sampling parameter, and stored as JSON in a
+SQLite file with a TTL and an LRU entry cap. Cache hits only stamp their
+recency in memory; the stamps are written in batches and before every
+insert, so reads never pay for a write transaction. A singleflight layer sits in
+front of the provider so that concurrent identical requests share one
+upstream call: the first caller computes, the others wait for its result.
+Async callers get the same behaviour per event loop through
+:meth:`CompletionCache.complete_async`, which runs the SQLite I/O in a
+worker thread.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import copy
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections.abc import Awaitable, Callable
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+
+from ..config import get_settings
+from ..util.logging import get_logger
+from ..util.metrics import register_metrics
+
+logger = get_logger(__name__)
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS completions (
+        key TEXT PRIMARY KEY,
+        payload TEXT NOT NULL,
+        expires REAL NOT NULL,
+        used INTEGER NOT NULL
+    ) WITHOUT ROWID
+    """,
+    "CREATE INDEX IF NOT EXISTS completions_used ON completions (used)",
+)
+
+Completion = dict[str, Any]
+
+_TOUCH_BATCH = 64
+
+
+def completion_key(model: str, messages: Any, params: dict[str, Any]) -> str:
+    """Return the cache key of a request (stable across processes)."""
+    raw = json.dumps(
+        {"model": model, "messages": messages, "params": params},
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class _Flight:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Completion | None = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    """Collapse concurrent calls with the same key into one execution."""
+
+    def __init__(self) -> None:
+        self._flights: dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn: Callable[[], Completion]) -> tuple[Completion, bool]:
+        """Run *fn* once per in-flight *key*; return ``(result, shared)``."""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if flight is None:
+                flight = self._flights[key] = _Flight()
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            assert flight.result is not None
+            return copy.deepcopy(flight.result), True
+        try:
+            flight.result = fn()
+            return copy.deepcopy(flight.result), False
+        except BaseException as exc:
+            flight.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+
+class _Abandoned(Exception):
+    """Set on a flight whose leader was cancelled; a follower takes over."""
+
+
+class AsyncSingleFlight:
+    """Collapse concurrent awaits with the same key on one event loop.
+
+    A cancelled leader does not cancel its followers: the flight is
+    abandoned and the first follower to wake up runs *fn* itself.
+    """
+
+    def __init__(self) -> None:
+        self._flights: dict[tuple[int, str], asyncio.Future[Completion]] = {}
+
+    async def do(
+        self, key: str, fn: Callable[[], Awaitable[Completion]]
+    ) -> tuple[Completion, bool]:
+        """Await *fn* once per in-flight *key*; return ``(result, shared)``."""
+        loop = asyncio.get_running_loop()
+        slot = (id(loop), key)
+        while True:
+            flight = self._flights.get(slot)
+            if flight is None:
+                break
+            try:
+                return copy.deepcopy(await asyncio.shield(flight)), True
+            except _Abandoned:
+                continue
+        flight = self._flights[slot] = loop.create_future()
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            flight.set_exception(_Abandoned())
+            flight.exception()
+            raise
+        except BaseException as exc:
+            flight.set_exception(exc)
+            flight.exception()  # retrieved: followers, if any, re-raise it
+            raise
+        else:
+            flight.set_result(result)
+            return copy.deepcopy(result), False
+        finally:
+            del self._flights[slot]
+
+
+class CompletionCache:
+    """Thread-safe SQLite store of completions with TTL and an LRU cap."""
+
+    def __init__(
+        self,
+        path: Path,
+        max_entries: int,
+        ttl_seconds: float,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.path = Path(path)
+        self.max_entries = max(int(max_entries), 0)
+        self.ttl_seconds = float(ttl_seconds)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+        self._used = 0
+        self._touched: dict[str, int] = {}
+        self.flights = SingleFlight()
+        self.async_flights = AsyncSingleFlight()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.expired = 0
+        self.evicted = 0
+        if not self.enabled:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        for statement in _SCHEMA:
+            conn.execute(statement)
+        row = conn.execute("SELECT MAX(used) FROM completions").fetchone()
+        self._used = int(row[0] or 0)
+        self._conn = conn
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def get(self, key: str) -> Completion | None:
+        """Return the live completion for *key* (not counted in the stats)."""
+        if self._conn is None:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, expires FROM completions WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] <= self._clock():
+                self._conn.execute("DELETE FROM completions WHERE key = ?", (key,))
+                self._conn.commit()
+                self.expired += 1
+                return None
+            self._used += 1
+            self._touched[key] = self._used
+            if len(self._touched) >= _TOUCH_BATCH:
+                self._flush_touched()
+                self._conn.commit()
+        payload = json.loads(row[0])
+        return payload if isinstance(payload, dict) else None
+
+    def put(self, key: str, value: Completion) -> None:
+        if self._conn is None:
+            return
+        payload = json.dumps(value, ensure_ascii=False, default=str)
+        with self._lock:
+            self._flush_touched()
+            self._used += 1
+            self._conn.execute(
+                "INSERT OR REPLACE INTO completions VALUES (?, ?, ?, ?)",
+                (key, payload, self._clock() + self.ttl_seconds, self._used),
+            )
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM completions").fetchone()
+            excess = int(count) - self.max_entries
+            if excess > 0:
+                self._conn.execute(
+                    "DELETE FROM completions WHERE key IN ("
+                    "SELECT key FROM completions ORDER BY used LIMIT ?)",
+                    (excess,),
+                )
+                self.evicted += excess
+            self._conn.commit()
+
+    def _flush_touched(self) -> None:
+        """Write pending LRU stamps; the caller holds the lock and commits."""
+        if self._conn is None or not self._touched:
+            return
+        self._conn.executemany(
+            "UPDATE completions SET used = ? WHERE key = ?",
+            [(used, key) for key, used in self._touched.items()],
+        )
+        self._touched.clear()
+
+    def complete(
+        self,
+        model: str,
+        messages: Any,
+        params: dict[str, Any],
+        fetch: Callable[[], Completion],
+    ) -> Completion:
+        """Serve a request from the cache, an in-flight call, or *fetch*.
+
+        Only deterministic requests (``temperature`` of 0) are cached or
+        coalesced; anything else goes straight to *fetch*.
+        """
+        if float(params.get("temperature") or 0.0) != 0.0:
+            return fetch()
+        key = completion_key(model, messages, params)
+        cached = self.get(key)
+        if cached is not None:
+            self._record("hit", model)
+            return cached
+        late_hit = False
+
+        def _fetch_and_store() -> Completion:
+            nonlocal late_hit
+            # A previous leader may have stored the key after our lookup.
+            stored = self.get(key)
+            if stored is not None:
+                late_hit = True
+                return stored
+            value = fetch()
+            self.put(key, value)
+            return value
+
+        value, shared = self.flights.do(key, _fetch_and_store)
+        self._record("coalesced" if shared else "hit" if late_hit else "miss", model)
+        return value
+
+    async def complete_async(
+        self,
+        model: str,
+        messages: Any,
+        params: dict[str, Any],
+        fetch: Callable[[], Awaitable[Completion]],
+    ) -> Completion:
+        """Async :meth:`complete`; identical in-flight awaits share one fetch."""
+        if float(params.get("temperature") or 0.0) != 0.0:
+            return await fetch()
+        key = completion_key(model, messages, params)
+        cached = await asyncio.to_thread(self.get, key)
+        if cached is not None:
+            self._record("hit", model)
+            return cached
+        late_hit = False
+
+        async def _fetch_and_store() -> Completion:
+            nonlocal late_hit
+            stored = await asyncio.to_thread(self.get, key)
+            if stored is not None:
+                late_hit = True
+                return stored
+            value = await fetch()
+            await asyncio.to_thread(self.put, key, value)
+            return value
+
+        value, shared = await self.async_flights.do(key, _fetch_and_store)
+        self._record("coalesced" if shared else "hit" if late_hit else "miss", model)
+        return value
+
+    def _record(self, outcome: str, model: str) -> None:
+        with self._lock:
+            if outcome == "hit":
+                self.hits += 1
+            elif outcome == "coalesced":
+                self.coalesced += 1
+            else:
+                self.misses += 1
+            lookups = self.hits + self.coalesced + self.misses
+            hit_rate = round((self.hits + self.coalesced) / lookups, 4)
+        logger.info(
+            "completion_cache.lookup",
+            extra={"model": model, "outcome": outcome, "hit_rate": hit_rate},
+        )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._touched.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM completions")
+                self._conn.commit()
+            self.hits = self.misses = self.coalesced = 0
+            self.expired = self.evicted = 0
+
+    def stats(self) -> dict[str, Any]:
+        """Return counters for monitoring."""
+        with self._lock:
+            entries = 0
+            if self._conn is not None:
+                (entries,) = self._conn.execute(
+                    "SELECT COUNT(*) FROM completions"
+                ).fetchone()
+            served = self.hits + self.coalesced
+            lookups = served + self.misses
+            return {
+                "path": str(self.path),
+                "entries": int(entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "coalesced": self.coalesced,
+                "misses": self.misses,
+                "hit_rate": round(served / lookups, 4) if lookups else 0.0,
+                "expired": self.expired,
+                "evicted": self.evicted,
+            }
+
+
+_OPEN_LOCK = threading.Lock()
+
+
+@lru_cache(maxsize=4)
+def _open_cache(path: str, max_entries: int, ttl_seconds: float) -> CompletionCache:
+    return CompletionCache(Path(path), max_entries, ttl_seconds)
+
+
+def get_completion_cache() -> CompletionCache:
+    """Return the shared cache for the configured path, size and TTL."""
+    settings = get_settings()
+    path = settings.completion_cache_path or str(
+        settings.artifact_root_path / "cache" / "completions.sqlite3"
+    )
+    # lru_cache does not lock around a miss; concurrent first calls would
+    # each open their own connection and race on the schema setup.
+    with _OPEN_LOCK:
+        return _open_cache(
+            path, settings.completion_cache_size, settings.completion_cache_ttl_seconds
+        )
+
+
+register_metrics("completion_cache", lambda: get_completion_cache().stats())
+
+
+__all__ = [
+    "AsyncSingleFlight",
+    "CompletionCache",
+    "SingleFlight",
+    "completion_key",
+    "get_completion_cache",
+]
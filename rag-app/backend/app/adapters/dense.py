@@ -0,0 +1,265 @@
+"""Exact dense vector index over a NumPy matrix."""
+
+from __future__ import annotations
+
+import json
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from ..util.logging import get_logger
+from .query_cache import next_index_version
+from .vector_format import (
+    VectorFile,
+    is_vector_file,
+    read_vector_file,
+    write_vector_file,
+)
+
+logger = get_logger(__name__)
+
+
+class FaissIndex:
+    """Local dense index over a contiguous, pre-normalised float32 matrix."""
+
+    index_type = "flat"
+
+    def __init__(self, dim: int, index_path: str | None = None) -> None:
+        """Create or load index (binary memory-mapped or legacy JSON)."""
+        self._dim = dim
+        self._matrix: np.ndarray = np.empty((0, dim), dtype=np.float32)
+        self._count = 0
+        self._ids: list[str] = []
+        self._path = Path(index_path) if index_path else None
+        self._version = next_index_version("", self.index_type, dim)
+        if self._path and self._path.exists():
+            try:
+                self._load(self._path)
+            except Exception as exc:  # noqa: BLE001
+                logger.warning("faiss.load_failed", extra={"error": str(exc)})
+                self._matrix = np.empty((0, dim), dtype=np.float32)
+                self._count = 0
+                self._ids = []
+                self._version = next_index_version("", self.index_type, dim)
+
+    def _load(self, path: Path) -> None:
+        if not is_vector_file(path):
+            payload = json.loads(path.read_text(encoding="utf-8"))
+            self.add(payload.get("vectors", []), ids=payload.get("ids") or None)
+            return
+        stored = read_vector_file(path)
+        if stored.dim != self._dim:
+            raise ValueError(f"vector dimensionality {stored.dim} != {self._dim}")
+        # Rows were normalised before they were written; keep the read-only
+        # mapping and only copy into private memory once the index grows.
+        self._matrix = stored.matrix
+        self._count = stored.count
+        self._ids = stored.ids
+        self._restore(stored)
+        saved = stored.meta.get("content_version")
+        self._version = str(saved) if saved else self._content_version(stored)
+
+    def _content_version(self, stored: VectorFile) -> str:
+        """Fingerprint a file saved before versions were stored with it."""
+        extras = [stored.arrays[name] for name in sorted(stored.arrays)]
+        return next_index_version(
+            self._version, "load", stored.matrix, stored.ids, *extras
+        )
+
+    def _restore(self, stored: VectorFile) -> None:
+        """Hook for subclasses to rebuild auxiliary state from a loaded file."""
+
+    def _persisted_arrays(self) -> tuple[dict[str, np.ndarray], dict[str, Any]]:
+        """Hook returning extra arrays and metadata to store with the matrix."""
+        return {}, {}
+
+    def _added(self, start: int, end: int) -> None:
+        """Hook invoked after rows ``start:end`` were appended."""
+
+    def _updated(self, rows: np.ndarray) -> None:
+        """Hook invoked after existing *rows* were overwritten in place."""
+
+    def _allocate(self, capacity: int) -> np.ndarray:
+        """Return uninitialised float storage for *capacity* rows."""
+        return np.empty((capacity, self._dim), dtype=np.float32)
+
+    def _store_rows(self, start: int, rows: np.ndarray) -> None:
+        """Write unit *rows* from row ``start``, growing the matrix as needed."""
+        required = start + len(rows)
+        if required > len(self._matrix):
+            # Grow geometrically so repeated small adds stay amortised O(1).
+            capacity = max(required, 2 * len(self._matrix), 64)
+            grown = self._allocate(capacity)
+            grown[:start] = self._matrix[:start]
+            self._matrix = grown
+        self._matrix[start:required] = rows
+
+    def _overwrite_rows(self, positions: np.ndarray, rows: np.ndarray) -> None:
+        """Replace the float rows at *positions* with unit *rows*."""
+        if not self._matrix.flags.writeable:
+            # Loaded indexes are read-only mappings; detach before mutating.
+            detached = self._allocate(self._count)
+            detached[:] = self._matrix[: self._count]
+            self._matrix = detached
+        self._matrix[positions] = rows
+
+    def _score_rows(self, positions: np.ndarray, query: np.ndarray) -> np.ndarray:
+        """Return the scores of *query* against the rows at *positions*."""
+        return np.asarray(self._matrix[positions] @ query)
+
+    def _float_rows(self) -> np.ndarray:
+        """Return the float rows written by :meth:`save_to`."""
+        return self._matrix[: self._count]
+
+    @property
+    def params(self) -> dict[str, Any]:
+        """Return the parameters recorded alongside the index."""
+        return {}
+
+    def train(self) -> None:
+        """Fit any learned structures; the exact index has none."""
+
+    @property
+    def version(self) -> str:
+        """Return a content fingerprint that changes with the search results."""
+        return self._version
+
+    def _bump_version(self, *parts: Any) -> None:
+        self._version = next_index_version(self._version, *parts)
+
+    @property
+    def dim(self) -> int:
+        """Return the vector dimensionality."""
+        return self._dim
+
+    def __len__(self) -> int:
+        """Return the number of stored vectors."""
+        return self._count
+
+    def _validate(self, vector: Sequence[float]) -> None:
+        if len(vector) != self._dim:
+            raise ValueError(f"vector dimensionality {len(vector)} != {self._dim}")
+
+    def _as_unit_rows(self, vectors: Sequence[Sequence[float]]) -> np.ndarray:
+        """Return *vectors* as L2-normalised float32 rows (zero rows kept)."""
+        for vector in vectors:
+            self._validate(vector)
+        rows = np.asarray(vectors, dtype=np.float32).reshape(len(vectors), self._dim)
+        norms = np.linalg.norm(rows, axis=1, keepdims=True)
+        norms[norms == 0.0] = 1.0
+        return rows / norms
+
+    @property
+    def ids(self) -> list[str]:
+        """Return the row id map (empty when rows were added without ids)."""
+        return list(self._ids)
+
+    def add(self, vectors: list[list[float]], ids: list[str] | None = None) -> None:
+        """Add vectors, optionally labelled with external ids."""
+        if not len(vectors):
+            return
+        if ids is not None and len(ids) != len(vectors):
+            raise ValueError("id count must match vectors")
+        if (ids is None) != (not self._ids) and self._count:
+            raise ValueError("ids must be supplied for all rows or for none")
+        rows = self._as_unit_rows(vectors)
+        required = self._count + len(rows)
+        self._store_rows(self._count, rows)
+        self._count = required
+        if ids is not None:
+            self._ids.extend(str(value) for value in ids)
+        self._added(required - len(rows), required)
+        self._bump_version("add", rows, [] if ids is None else [str(v) for v in ids])
+        logger.debug("faiss.add", extra={"count": len(rows), "total": self._count})
+
+    def update(self, rows: Sequence[int], vectors: list[list[float]]) -> None:
+        """Overwrite existing *rows* with new vectors."""
+        positions = np.asarray(rows, dtype=np.int64)
+        if len(positions) != len(vectors):
+            raise ValueError("row count must match vectors")
+        if not len(positions):
+            return
+        if positions.min() < 0 or positions.max() >= self._count:
+            raise IndexError("row out of range")
+        unit_rows = self._as_unit_rows(vectors)
+        self._overwrite_rows(positions, unit_rows)
+        self._updated(positions)
+        self._bump_version("update", positions, unit_rows)
+
+    def _top_k(self, scores: np.ndarray, k: int) -> list[tuple[int, float]]:
+        """Select the ``k`` best rows, ties broken by ascending row id."""
+        k = min(k, len(scores))
+        if k <= 0:
+            return []
+        if k < len(scores):
+            # Keep every row tied with the k-th score so ties resolve by row id.
+            threshold = np.partition(scores, len(scores) - k)[len(scores) - k]
+            candidates = np.flatnonzero(scores >= threshold)
+        else:
+            candidates = np.arange(len(scores))
+        order = np.lexsort((candidates, -scores[candidates]))[:k]
+        return [(int(candidates[i]), float(scores[candidates[i]])) for i in order]
+
+    def search(self, query_vec: list[float], k: int = 20) -> list[tuple[int, float]]:
+        """Search top-k by cosine similarity with one matrix-vector product."""
+        query = self._as_unit_rows([query_vec])[0]
+        return self._search_unit(query, k)
+
+    def search_batch(
+        self, query_vecs: Sequence[Sequence[float]], k: int = 20
+    ) -> list[list[tuple[int, float]]]:
+        """Search several queries with one matrix-matrix product."""
+        if not len(query_vecs):
+            return []
+        return self._search_units(self._as_unit_rows(query_vecs), k)
+
+    def search_rows(
+        self, query_vec: list[float], rows: Sequence[int], k: int = 20
+    ) -> list[tuple[int, float]]:
+        """Exactly score only *rows* (e.g. a payload-filtered subset)."""
+        positions = np.unique(np.asarray(rows, dtype=np.int64))
+        positions = positions[(positions >= 0) & (positions < self._count)]
+        if not len(positions):
+            return []
+        query = self._as_unit_rows([query_vec])[0]
+        scores = self._score_rows(positions, query)
+        return [(int(positions[i]), score) for i, score in self._top_k(scores, k)]
+
+    def _search_unit(self, query: np.ndarray, k: int) -> list[tuple[int, float]]:
+        """Exhaustively score a normalised *query* against every row."""
+        return self._scan(query[None, :], k)[0]
+
+    def _search_units(
+        self, queries: np.ndarray, k: int
+    ) -> list[list[tuple[int, float]]]:
+        """Score normalised *queries* (one per row) against every row."""
+        return self._scan(queries, k)
+
+    def _scan(self, queries: np.ndarray, k: int) -> list[list[tuple[int, float]]]:
+        scores = queries @ self._matrix[: self._count].T
+        return [self._top_k(row, k) for row in scores]
+
+    def save(self) -> None:
+        """Persist index to the path it was opened with."""
+        if not self._path:
+            return
+        self.save_to(str(self._path))
+
+    def save_to(self, index_path: str) -> None:
+        """Persist index to *index_path*; ``.json`` keeps the legacy text format."""
+        path = Path(index_path)
+        matrix = self._float_rows()
+        if path.suffix == ".json":
+            data: dict[str, Any] = {"vectors": matrix.tolist(), "dim": self._dim}
+            if self._ids:
+                data["ids"] = self._ids
+            path.write_text(json.dumps(data), encoding="utf-8")
+            return
+        arrays, meta = self._persisted_arrays()
+        meta = {**meta, "content_version": self._version}
+        write_vector_file(path, matrix, ids=self._ids or None, arrays=arrays, meta=meta)
+
+
+__all__ = ["FaissIndex"]
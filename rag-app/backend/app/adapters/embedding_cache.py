@@ -0,0 +1,313 @@
+"""Persistent, content-addressed cache of embedding vectors.
+
+Vectors are stored in a SQLite file keyed by ``(model, sha256(text))`` so
+that re-processing an unchanged document, or ranking the same chunks in
+several passes, never re-embeds a text. Vectors are kept as little-endian
+float64 blobs, which round-trips provider floats exactly. Lookups stamp the
+rows they hit in memory; the stamps are written in batches and before every
+insert, and the least recently used rows are evicted once the table grows
+past ``EMBEDDING_CACHE_SIZE`` entries.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import sqlite3
+import threading
+from collections.abc import Awaitable, Callable, Iterator, Sequence
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from ..config import get_settings
+from ..util.logging import get_logger
+from ..util.metrics import register_metrics
+
+logger = get_logger(__name__)
+
+_DTYPE = "<f8"
+_PARAMS_PER_QUERY = 500
+_TOUCH_BATCH = 1024
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS embeddings (
+        model TEXT NOT NULL,
+        digest TEXT NOT NULL,
+        vector BLOB NOT NULL,
+        used INTEGER NOT NULL,
+        PRIMARY KEY (model, digest)
+    ) WITHOUT ROWID
+    """,
+    "CREATE INDEX IF NOT EXISTS embeddings_used ON embeddings (used)",
+)
+
+EmbedBatch = Callable[[list[str]], list[list[float]]]
+AsyncEmbedBatch = Callable[[list[str]], Awaitable[list[list[float]]]]
+
+
+def text_digest(text: str) -> str:
+    """Return the sha256 hex digest identifying *text* in the cache."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _chunked(values: Sequence[str], size: int) -> Iterator[Sequence[str]]:
+    for offset in range(0, len(values), size):
+        yield values[offset : offset + size]
+
+
+class EmbeddingCache:
+    """Thread-safe SQLite store of vectors with an LRU entry cap."""
+
+    def __init__(self, path: Path, max_entries: int) -> None:
+        self.path = Path(path)
+        self.max_entries = max(int(max_entries), 0)
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+        self._clock = 0
+        self._touched: dict[tuple[str, str], int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        if not self.enabled:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        for statement in _SCHEMA:
+            conn.execute(statement)
+        row = conn.execute("SELECT MAX(used) FROM embeddings").fetchone()
+        self._clock = int(row[0] or 0)
+        self._conn = conn
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def _tick(self) -> int:
+        self._clock += 1
+        return self._clock
+
+    def get_many(self, model: str, texts: Sequence[str]) -> list[list[float] | None]:
+        """Return cached vectors aligned with *texts* (None for misses)."""
+        digests = [text_digest(text) for text in texts]
+        found: dict[str, bytes] = {}
+        if self._conn is not None and digests:
+            with self._lock:
+                used = self._tick()
+                for part in _chunked(list(dict.fromkeys(digests)), _PARAMS_PER_QUERY):
+                    marks = ",".join("?" * len(part))
+                    rows = self._conn.execute(
+                        "SELECT digest, vector FROM embeddings "
+                        f"WHERE model = ? AND digest IN ({marks})",
+                        (model, *part),
+                    ).fetchall()
+                    found.update(rows)
+                for digest in found:
+                    self._touched[(model, digest)] = used
+                if len(self._touched) >= _TOUCH_BATCH:
+                    self._flush_touched()
+                    self._conn.commit()
+        hits = sum(digest in found for digest in digests)
+        with self._lock:
+            self.hits += hits
+            self.misses += len(digests) - hits
+        return [
+            np.frombuffer(found[digest], dtype=_DTYPE).tolist()
+            if digest in found
+            else None
+            for digest in digests
+        ]
+
+    def put_many(
+        self, model: str, texts: Sequence[str], vectors: Sequence[Sequence[float]]
+    ) -> None:
+        """Store *vectors* for *texts* and evict past the entry cap."""
+        if self._conn is None or not texts:
+            return
+        with self._lock:
+            self._flush_touched()
+            used = self._tick()
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?)",
+                [
+                    (
+                        model,
+                        text_digest(text),
+                        np.asarray(vector, dtype=_DTYPE).tobytes(),
+                        used,
+                    )
+                    for text, vector in zip(texts, vectors, strict=True)
+                ],
+            )
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+            excess = int(count) - self.max_entries
+            if excess > 0:
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE (model, digest) IN ("
+                    "SELECT model, digest FROM embeddings ORDER BY used LIMIT ?)",
+                    (excess,),
+                )
+                self.evicted += excess
+            self._conn.commit()
+
+    def _flush_touched(self) -> None:
+        """Write pending LRU stamps; the caller holds the lock and commits."""
+        if self._conn is None or not self._touched:
+            return
+        self._conn.executemany(
+            "UPDATE embeddings SET used = ? WHERE model = ? AND digest = ?",
+            [(used, model, digest) for (model, digest), used in self._touched.items()],
+        )
+        self._touched.clear()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._touched.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM embeddings")
+                self._conn.commit()
+            self.hits = self.misses = self.evicted = 0
+
+    def stats(self) -> dict[str, Any]:
+        """Return counters for monitoring."""
+        with self._lock:
+            entries = 0
+            if self._conn is not None:
+                (entries,) = self._conn.execute(
+                    "SELECT COUNT(*) FROM embeddings"
+                ).fetchone()
+            lookups = self.hits + self.misses
+            return {
+                "path": str(self.path),
+                "entries": int(entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evicted": self.evicted,
+            }
+
+
+_OPEN_LOCK = threading.Lock()
+
+
+@lru_cache(maxsize=4)
+def _open_cache(path: str, max_entries: int) -> EmbeddingCache:
+    return EmbeddingCache(Path(path), max_entries)
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Return the shared cache for the configured path and size."""
+    settings = get_settings()
+    path = settings.embedding_cache_path or str(
+        settings.artifact_root_path / "cache" / "embeddings.sqlite3"
+    )
+    # lru_cache does not lock around a miss; concurrent first calls would
+    # each open their own connection and race on the schema setup.
+    with _OPEN_LOCK:
+        return _open_cache(path, settings.embedding_cache_size)
+
+
+class _CacheFill:
+    """One call's cache lookup, filled in with fetched vectors batch by batch."""
+
+    def __init__(self, model: str, texts: list[str], batch_size: int) -> None:
+        self.model = model
+        self.texts = texts
+        self.batch_size = max(batch_size, 1)
+        self.cache = get_embedding_cache()
+        self.cached = self.cache.get_many(model, texts)
+        self.missing = list(
+            dict.fromkeys(
+                t for t, v in zip(texts, self.cached, strict=True) if v is None
+            )
+        )
+        self.fetched: dict[str, list[float]] = {}
+        self.raw: list[list[float]] = []
+        self.aligned = True
+
+    def batches(self) -> list[list[str]]:
+        return [list(batch) for batch in _chunked(self.missing, self.batch_size)]
+
+    def add(self, batch: list[str], vectors: list[list[float]]) -> None:
+        self.raw.extend(vectors)
+        if len(vectors) != len(batch):
+            self.aligned = False
+            logger.warning(
+                "embedding_cache.count_mismatch",
+                extra={
+                    "model": self.model,
+                    "sent": len(batch),
+                    "received": len(vectors),
+                },
+            )
+            return
+        self.cache.put_many(self.model, batch, vectors)
+        self.fetched.update(zip(batch, vectors, strict=True))
+
+    def result(self) -> list[list[float]]:
+        logger.debug(
+            "embedding_cache.lookup",
+            extra={
+                "model": self.model,
+                "texts": len(self.texts),
+                "misses": len(self.missing),
+            },
+        )
+        if not self.aligned:
+            # The raw output only lines up with the inputs when every text
+            # was sent, once, in order.
+            if self.missing == self.texts:
+                return self.raw
+            raise ValueError("embedding response size does not match its inputs")
+        return [
+            vector if vector is not None else self.fetched[text]
+            for text, vector in zip(self.texts, self.cached, strict=True)
+        ]
+
+
+def embed_cached(
+    model: str, texts: list[str], embed_batch: EmbedBatch, batch_size: int
+) -> list[list[float]]:
+    """Embed *texts*, sending only cache misses to *embed_batch*.
+
+    Misses are de-duplicated and sent in batches of *batch_size*; their
+    vectors are written back before returning. A batch whose response does
+    not contain one vector per input is not cached; when every text was sent
+    exactly once the provider output is returned unchanged, otherwise the
+    result cannot be aligned and ``ValueError`` is raised.
+    """
+    fill = _CacheFill(model, texts, batch_size)
+    for batch in fill.batches():
+        fill.add(batch, embed_batch(batch))
+    return fill.result()
+
+
+async def embed_cached_async(
+    model: str, texts: list[str], embed_batch: AsyncEmbedBatch, batch_size: int
+) -> list[list[float]]:
+    """Async :func:`embed_cached`; the miss batches are awaited concurrently.
+
+    The SQLite lookups and writes run in a worker thread, off the event loop.
+    """
+    fill = await asyncio.to_thread(_CacheFill, model, texts, batch_size)
+    batches = fill.batches()
+    results = await asyncio.gather(*(embed_batch(batch) for batch in batches))
+    for batch, vectors in zip(batches, results, strict=True):
+        await asyncio.to_thread(fill.add, batch, vectors)
+    return fill.result()
+
+
+register_metrics("embedding_cache", lambda: get_embedding_cache().stats())
+
+
+__all__ = [
+    "EmbeddingCache",
+    "embed_cached",
+    "embed_cached_async",
+    "get_embedding_cache",
+    "text_digest",
+]
@@ -1,17 +1,58 @@
-"""Offline-friendly LLM adapter."""
+"""Offline-friendly LLM adapter.
+
+Offline, completions and embeddings are synthesised locally. Online, both
+the sync and async methods call OpenRouter through :mod:`..llm.clients`, so
+they use the same models and share completion and embedding cache entries;
+:meth:`LLMClient.chat_stream` forwards the server-sent deltas. Any blocking
+work left on the async path runs in a worker thread.
+"""
 
 from __future__ import annotations
 
+import asyncio
 import hashlib
 import math
+import re
+from collections.abc import AsyncIterator
 from typing import Any
 
 from ..config import get_settings
 from ..util.errors import ExternalServiceError
 from ..util.logging import get_logger, log_span
+from .completion_cache import get_completion_cache
+from .embedding_cache import embed_cached, embed_cached_async
 
 logger = get_logger(__name__)
 
+OFFLINE_CHAT_MODEL = "offline-synth"
+_DELTA_PATTERN = re.compile(r"\s*\S+")
+OFFLINE_EMBED_MODEL = "offline-sha256-16"
+
+
+def _messages(system: str, user: str, context: str) -> list[dict[str, str]]:
+    prompt = user if context in user else f"{user}\n\nContext:\n{context}"
+    return [
+        {"role": "system", "content": system},
+        {"role": "user", "content": prompt},
+    ]
+
+
+def _from_openrouter(data: dict[str, Any], temperature: float) -> dict[str, Any]:
+    """Map an OpenRouter chat response onto the adapter's completion shape."""
+    choices = data.get("choices") or [{}]
+    message = choices[0].get("message") or {}
+    usage = data.get("usage") or {}
+    return {
+        "content": str(message.get("content") or ""),
+        "provider": "openrouter",
+        "model": data.get("model"),
+        "temperature": temperature,
+        "tokens": {
+            "prompt": int(usage.get("prompt_tokens") or 0),
+            "completion": int(usage.get("completion_tokens") or 0),
+        },
+    }
+
 
 def call_llm(system: str, user: str, context: str) -> dict[str, Any]:
     """Call configured LLM provider and return parsed result."""
@@ -52,6 +93,20 @@ class LLMClient:
                 },
             )
 
+    @property
+    def model(self) -> str:
+        """Identifier of the chat model answering :meth:`chat`."""
+        if not self._settings.offline:
+            return self._settings.llm_chat_model
+        return f"{self._provider}/{OFFLINE_CHAT_MODEL}"
+
+    @property
+    def embed_model(self) -> str:
+        """Identifier of the embedding model answering :meth:`embed`."""
+        if not self._settings.offline:
+            return self._settings.llm_embed_model
+        return OFFLINE_EMBED_MODEL
+
     def chat(
         self,
         system: str,
@@ -60,8 +115,149 @@ class LLMClient:
         temperature: float = 0.0,
         max_tokens: int = 1024,
     ) -> dict[str, Any]:
-        """Chat completion with retry policy."""
+        """Chat completion with retry policy, served from the completion cache."""
+
+        if not self._settings.offline:
+            from ..llm.clients import OpenRouterError, chat_sync
+
+            try:
+                data = chat_sync(
+                    self.model,
+                    _messages(system, user, context),
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    timeout=self._timeout,
+                    retries=self._max_retries,
+                )
+            except OpenRouterError as exc:
+                raise ExternalServiceError(str(exc)) from exc
+            return _from_openrouter(data, temperature)
+
+        def _complete() -> dict[str, Any]:
+            return self._chat(system, user, context, temperature, max_tokens)
+
+        return get_completion_cache().complete(
+            self.model,
+            {"system": system, "user": user, "context": context},
+            {"temperature": temperature, "max_tokens": max_tokens},
+            _complete,
+        )
+
+    async def chat_async(
+        self,
+        system: str,
+        user: str,
+        context: str,
+        temperature: float = 0.0,
+        max_tokens: int = 1024,
+    ) -> dict[str, Any]:
+        """Async :meth:`chat`; identical in-flight requests share one result."""
+
+        if not self._settings.offline:
+            from ..llm.clients import OpenRouterError, chat_async
+
+            try:
+                data = await chat_async(
+                    self.model,
+                    _messages(system, user, context),
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    timeout=self._timeout,
+                    retries=self._max_retries,
+                )
+            except OpenRouterError as exc:
+                raise ExternalServiceError(str(exc)) from exc
+            return _from_openrouter(data, temperature)
+
+        async def _complete() -> dict[str, Any]:
+            return await asyncio.to_thread(
+                self._chat, system, user, context, temperature, max_tokens
+            )
+
+        return await get_completion_cache().complete_async(
+            self.model,
+            {"system": system, "user": user, "context": context},
+            {"temperature": temperature, "max_tokens": max_tokens},
+            _complete,
+        )
+
+    async def chat_stream(
+        self,
+        system: str,
+        user: str,
+        context: str,
+        temperature: float = 0.0,
+        max_tokens: int = 1024,
+    ) -> AsyncIterator[dict[str, Any]]:
+        """Stream a chat completion as ``delta`` events followed by ``done``.
+
+        Online, deltas are forwarded as OpenRouter emits them. Offline there is
+        nothing to stream, so the synthesised answer is replayed word by word
+        and each delta is marked ``replayed``.
+        """
 
+        if not self._settings.offline:
+            async for event in self._stream_openrouter(
+                system, user, context, temperature, max_tokens
+            ):
+                yield event
+            return
+        completion = await self.chat_async(
+            system=system,
+            user=user,
+            context=context,
+            temperature=temperature,
+            max_tokens=max_tokens,
+        )
+        for piece in _DELTA_PATTERN.findall(str(completion.get("content", ""))):
+            yield {"type": "delta", "text": piece, "replayed": True}
+            await asyncio.sleep(0)
+        yield {"type": "done", "completion": completion}
+
+    async def _stream_openrouter(
+        self,
+        system: str,
+        user: str,
+        context: str,
+        temperature: float,
+        max_tokens: int,
+    ) -> AsyncIterator[dict[str, Any]]:
+        from ..llm.clients import OpenRouterError, chat_stream_async
+
+        pieces: list[str] = []
+        summary: dict[str, Any] = {"model": self.model}
+        try:
+            async for item in chat_stream_async(
+                self.model,
+                _messages(system, user, context),
+                temperature=temperature,
+                max_tokens=max_tokens,
+                timeout=self._timeout,
+                retries=self._max_retries,
+            ):
+                data = item.get("data") or {}
+                if item["type"] != "delta" or not isinstance(data, dict):
+                    continue
+                summary["model"] = data.get("model") or summary["model"]
+                summary["usage"] = data.get("usage") or summary.get("usage")
+                choices = data.get("choices") or [{}]
+                text = (choices[0].get("delta") or {}).get("content")
+                if text:
+                    pieces.append(text)
+                    yield {"type": "delta", "text": text, "replayed": False}
+        except OpenRouterError as exc:
+            raise ExternalServiceError(str(exc)) from exc
+        summary["choices"] = [{"message": {"content": "".join(pieces)}}]
+        yield {"type": "done", "completion": _from_openrouter(summary, temperature)}
+
+    def _chat(
+        self,
+        system: str,
+        user: str,
+        context: str,
+        temperature: float,
+        max_tokens: int,
+    ) -> dict[str, Any]:
         if self._settings.offline:
             with log_span(
                 "llm.chat.offline",
@@ -82,24 +278,68 @@ class LLMClient:
         raise ExternalServiceError("Remote LLM invocation disabled in this environment")
 
     def embed(self, texts: list[str]) -> list[list[float]]:
-        """Batch embed via provider."""
+        """Batch embed via provider, reusing vectors from the embedding cache."""
+
+        if not self._settings.offline:
+            from ..llm.clients import OpenRouterError, embed_sync
+
+            try:
+                return embed_sync(
+                    self.embed_model,
+                    texts,
+                    timeout=self._timeout,
+                    retries=self._max_retries,
+                )
+            except OpenRouterError as exc:
+                raise ExternalServiceError(str(exc)) from exc
+
+        return embed_cached(
+            OFFLINE_EMBED_MODEL,
+            texts,
+            self._embed_batch,
+            self._settings.vector_batch_size,
+        )
+
+    async def embed_async(self, texts: list[str]) -> list[list[float]]:
+        """Async :meth:`embed`; cache-miss batches are embedded concurrently."""
 
+        if not self._settings.offline:
+            from ..llm.clients import OpenRouterError, embed_async
+
+            try:
+                return await embed_async(
+                    self.embed_model,
+                    texts,
+                    timeout=self._timeout,
+                    retries=self._max_retries,
+                )
+            except OpenRouterError as exc:
+                raise ExternalServiceError(str(exc)) from exc
+
+        async def _embed_batch(batch: list[str]) -> list[list[float]]:
+            return await asyncio.to_thread(self._embed_batch, batch)
+
+        return await embed_cached_async(
+            OFFLINE_EMBED_MODEL,
+            texts,
+            _embed_batch,
+            self._settings.vector_batch_size,
+        )
+
+    def _embed_batch(self, batch: list[str]) -> list[list[float]]:
         dimension = 16
         embeddings: list[list[float]] = []
-        batch_size = max(self._settings.vector_batch_size, 1)
-        for offset in range(0, len(texts), batch_size):
-            batch = texts[offset : offset + batch_size]
-            with log_span(
-                "llm.embed.offline_batch",
-                logger=logger,
-                extra={"size": len(batch)},
-            ):
-                for text in batch:
-                    digest = hashlib.sha256(text.encode("utf-8")).digest()
-                    vector = [
-                        (digest[i] / 255.0) * math.cos(i + 1) for i in range(dimension)
-                    ]
-                    embeddings.append(vector)
+        with log_span(
+            "llm.embed.offline_batch",
+            logger=logger,
+            extra={"size": len(batch)},
+        ):
+            for text in batch:
+                digest = hashlib.sha256(text.encode("utf-8")).digest()
+                vector = [
+                    (digest[i] / 255.0) * math.cos(i + 1) for i in range(dimension)
+                ]
+                embeddings.append(vector)
         return embeddings
 
     def _simulate_completion(
@@ -0,0 +1,216 @@
+"""Postings lists, collection statistics and on-disk packing for BM25."""
+
+from __future__ import annotations
+
+import math
+from bisect import bisect_left
+from collections import Counter
+from collections.abc import Iterable, Mapping, Sequence
+from dataclasses import dataclass
+
+import numpy as np
+
+from .sparse_format import SparseFile
+
+BLOCK_SIZE = 64
+
+
+def bm25_idf(df: int, n: int) -> float:
+    """Okapi BM25 inverse document frequency (always positive)."""
+    return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+
+@dataclass(frozen=True)
+class CorpusStats:
+    """Collection statistics shared by several BM25 shards.
+
+    Scoring every shard against the same ``N``, ``avgdl`` and document
+    frequencies makes their scores comparable, and equal to those of a single
+    index over the union of the shards.
+    """
+
+    docs: int
+    total_length: int
+    df: Mapping[str, int]
+
+    @property
+    def avgdl(self) -> float:
+        return (self.total_length or 1) / max(self.docs, 1)
+
+    @classmethod
+    def merge(cls, parts: Iterable[CorpusStats]) -> CorpusStats:
+        """Sum per-shard statistics into corpus-wide ones."""
+        docs = total_length = 0
+        df: Counter[str] = Counter()
+        for part in parts:
+            docs += part.docs
+            total_length += part.total_length
+            df.update(part.df)
+        return cls(docs=docs, total_length=total_length, df=dict(df))
+
+
+class PostingList:
+    """Doc-ordered postings with per-term and per-block score statistics.
+
+    Each block of ``BLOCK_SIZE`` postings records its largest term frequency
+    and shortest document. Together they bound the BM25 contribution of any
+    posting in the block for every possible ``avgdl``, so the statistics stay
+    valid as the collection grows.
+    """
+
+    __slots__ = ("docs", "tfs", "block_max_tf", "block_min_dl")
+
+    def __init__(self) -> None:
+        self.docs: list[int] = []
+        self.tfs: list[int] = []
+        self.block_max_tf: list[int] = []
+        self.block_min_dl: list[int] = []
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    def append(self, doc_id: int, tf: int, length: int) -> None:
+        self.docs.append(doc_id)
+        self.tfs.append(tf)
+        self._account(len(self.docs) - 1, tf, length)
+
+    def _account(self, position: int, tf: int, length: int) -> None:
+        if position % BLOCK_SIZE == 0:
+            self.block_max_tf.append(tf)
+            self.block_min_dl.append(length)
+        else:
+            self.block_max_tf[-1] = max(self.block_max_tf[-1], tf)
+            self.block_min_dl[-1] = min(self.block_min_dl[-1], length)
+
+    def purge(
+        self, lo: int, hi: int, dead: set[int], lengths: Sequence[int] | np.ndarray
+    ) -> None:
+        """Drop postings of *dead* rows in ``[lo, hi)`` and refresh block stats."""
+        start = bisect_left(self.docs, lo)
+        end = bisect_left(self.docs, hi, start)
+        kept = [
+            (doc_id, tf)
+            for doc_id, tf in zip(
+                self.docs[start:end], self.tfs[start:end], strict=True
+            )
+            if doc_id not in dead
+        ]
+        self.docs[start:end] = [doc_id for doc_id, _ in kept]
+        self.tfs[start:end] = [tf for _, tf in kept]
+        # Positions after ``start`` shifted; rebuild the blocks from there on.
+        first_block = start // BLOCK_SIZE
+        del self.block_max_tf[first_block:]
+        del self.block_min_dl[first_block:]
+        for offset in range(first_block * BLOCK_SIZE, len(self.docs), BLOCK_SIZE):
+            block = slice(offset, offset + BLOCK_SIZE)
+            self.block_max_tf.append(max(self.tfs[block]))
+            self.block_min_dl.append(
+                int(min(lengths[doc_id] for doc_id in self.docs[block]))
+            )
+
+    def tf_of(self, doc_id: int) -> int:
+        """Return the term frequency in ``doc_id`` (0 when absent)."""
+        pos = bisect_left(self.docs, doc_id)
+        if pos < len(self.docs) and self.docs[pos] == doc_id:
+            return self.tfs[pos]
+        return 0
+
+
+class StoredPostings:
+    """Postings and forward index of a saved BM25 file, decoded on demand.
+
+    Only the vocabulary is decoded up front; offsets stay memory-mapped and
+    are read per term or row as postings and document terms are requested.
+    """
+
+    def __init__(self, stored: SparseFile) -> None:
+        arrays = stored.arrays
+        blob = bytes(arrays["vocab_blob"])
+        bounds = arrays["vocab_offsets"].tolist()
+        self.terms = [
+            blob[bounds[i] : bounds[i + 1]].decode("utf-8")
+            for i in range(len(bounds) - 1)
+        ]
+        self.ids = {term: index for index, term in enumerate(self.terms)}
+        self.posting_offsets: np.ndarray = arrays["posting_offsets"]
+        self.block_offsets: np.ndarray = arrays["block_offsets"]
+        self.doc_term_offsets: np.ndarray = arrays["doc_term_offsets"]
+        self._arrays = arrays
+
+    def document_frequencies(self) -> dict[str, int]:
+        """Return every stored term's document frequency."""
+        counts = np.diff(self.posting_offsets).tolist()
+        return dict(zip(self.terms, counts, strict=True))
+
+    def postings(self, term: str) -> PostingList | None:
+        index = self.ids.get(term)
+        if index is None:
+            return None
+        start, end = self.posting_offsets[index : index + 2].tolist()
+        first, last = self.block_offsets[index : index + 2].tolist()
+        postings = PostingList()
+        postings.docs = self._arrays["posting_docs"][start:end].tolist()
+        postings.tfs = self._arrays["posting_tfs"][start:end].tolist()
+        postings.block_max_tf = self._arrays["block_max_tf"][first:last].tolist()
+        postings.block_min_dl = self._arrays["block_min_dl"][first:last].tolist()
+        return postings
+
+    def doc_terms(self, row: int) -> tuple[str, ...]:
+        if row + 1 >= len(self.doc_term_offsets):
+            return ()
+        start, end = self.doc_term_offsets[row : row + 2].tolist()
+        return tuple(
+            self.terms[index]
+            for index in self._arrays["doc_term_ids"][start:end].tolist()
+        )
+
+
+def pack_postings(
+    vocabulary: Sequence[str],
+    postings: Sequence[PostingList | None],
+    doc_terms: Sequence[tuple[str, ...]],
+) -> dict[str, np.ndarray]:
+    """Concatenate *postings* and the forward index into flat arrays."""
+    term_ids = {term: index for index, term in enumerate(vocabulary)}
+    encoded = [term.encode("utf-8") for term in vocabulary]
+    docs: list[int] = []
+    tfs: list[int] = []
+    block_max_tf: list[int] = []
+    block_min_dl: list[int] = []
+    posting_offsets = [0]
+    block_offsets = [0]
+    for entry in postings:
+        if entry is not None:
+            docs.extend(entry.docs)
+            tfs.extend(entry.tfs)
+            block_max_tf.extend(entry.block_max_tf)
+            block_min_dl.extend(entry.block_min_dl)
+        posting_offsets.append(len(docs))
+        block_offsets.append(len(block_max_tf))
+    doc_term_ids: list[int] = []
+    doc_term_offsets = [0]
+    for terms in doc_terms:
+        doc_term_ids.extend(term_ids[term] for term in terms)
+        doc_term_offsets.append(len(doc_term_ids))
+    return {
+        "vocab_blob": np.frombuffer(b"".join(encoded), dtype=np.uint8),
+        "vocab_offsets": np.cumsum([0] + [len(raw) for raw in encoded]),
+        "posting_offsets": np.asarray(posting_offsets, dtype=np.int64),
+        "posting_docs": np.asarray(docs, dtype=np.uint32),
+        "posting_tfs": np.asarray(tfs, dtype=np.uint32),
+        "block_offsets": np.asarray(block_offsets, dtype=np.int64),
+        "block_max_tf": np.asarray(block_max_tf, dtype=np.uint32),
+        "block_min_dl": np.asarray(block_min_dl, dtype=np.uint32),
+        "doc_term_offsets": np.asarray(doc_term_offsets, dtype=np.int64),
+        "doc_term_ids": np.asarray(doc_term_ids, dtype=np.uint32),
+    }
+
+
+__all__ = [
+    "BLOCK_SIZE",
+    "CorpusStats",
+    "PostingList",
+    "StoredPostings",
+    "bm25_idf",
+    "pack_postings",
+]
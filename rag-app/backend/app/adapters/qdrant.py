@@ -0,0 +1,389 @@
+"""Qdrant-style dense collection: in-process engine or REST client."""
+
+from __future__ import annotations
+
+from collections.abc import Iterable, Mapping
+from pathlib import Path
+from typing import Any
+
+import httpx
+import numpy as np
+
+from ..config import get_settings
+from ..util.errors import ExternalServiceError, ValidationError
+from ..util.logging import get_logger
+from .dense import FaissIndex
+from .query_cache import next_index_version
+from .vector_format import VectorFile, read_vector_file
+
+logger = get_logger(__name__)
+
+PointId = int | str
+PayloadFilter = Mapping[str, Any]
+
+INDEXED_FIELDS = ("doc_id", "section_id", "level")
+
+
+class _CollectionVectors(FaissIndex):
+    """Flat index that stores collection metadata in the file trailer."""
+
+    def __init__(self, dim: int, index_path: str | None = None) -> None:
+        self.meta: dict[str, Any] = {}
+        super().__init__(dim, index_path)
+
+    def _restore(self, stored: VectorFile) -> None:
+        self.meta = dict(stored.meta)
+
+    def _persisted_arrays(self) -> tuple[dict[str, np.ndarray], dict[str, Any]]:
+        return {}, self.meta
+
+
+def _filter_values(value: Any) -> list[Any]:
+    if isinstance(value, list | tuple | set | frozenset):
+        return list(value)
+    return [value]
+
+
+def to_qdrant_filter(payload_filter: PayloadFilter | None) -> dict[str, Any] | None:
+    """Translate ``{field: value | [values]}`` into a Qdrant ``must`` filter."""
+
+    if not payload_filter:
+        return None
+    must: list[dict[str, Any]] = []
+    for key, value in payload_filter.items():
+        values = _filter_values(value)
+        match = {"value": values[0]} if len(values) == 1 else {"any": values}
+        must.append({"key": key, "match": match})
+    return {"must": must}
+
+
+def from_qdrant_filter(body: Mapping[str, Any] | None) -> dict[str, Any]:
+    """Inverse of :func:`to_qdrant_filter`; only ``must`` matches are supported."""
+
+    if not body:
+        return {}
+    if set(body) - {"must"}:
+        raise ValidationError("only 'must' payload filters are supported")
+    parsed: dict[str, Any] = {}
+    for condition in body.get("must") or []:
+        match = condition.get("match") or {}
+        if "value" in match:
+            parsed[str(condition["key"])] = match["value"]
+        elif "any" in match:
+            parsed[str(condition["key"])] = list(match["any"])
+        else:
+            raise ValidationError(f"unsupported filter condition: {condition}")
+    return parsed
+
+
+class QdrantIndex:
+    """Dense collection with payload storage, filters and batched upserts.
+
+    In process, vectors live in one growing pre-normalised matrix, payloads in
+    a row-aligned list and ``doc_id``/``section_id``/``level`` in a payload
+    index, so filtered searches score only the matching rows. Given ``url``
+    or ``client`` the same calls are sent to a Qdrant REST endpoint (for
+    example :mod:`.qdrant_standin`).
+    """
+
+    def __init__(
+        self,
+        collection: str,
+        dim: int | None = None,
+        storage_path: str | None = None,
+        url: str | None = None,
+        client: httpx.Client | None = None,
+    ) -> None:
+        """Open a local collection, or bind to a remote one via url/client."""
+        self._collection = collection
+        self._dim = dim
+        self._path = Path(storage_path) if storage_path else None
+        self._vectors: _CollectionVectors | None = None
+        self._payloads: list[dict[str, Any]] = []
+        self._point_ids: list[PointId] = []
+        self._rows: dict[PointId, int] = {}
+        self._field_index: dict[str, dict[Any, set[int]]] = {
+            field: {} for field in INDEXED_FIELDS
+        }
+        if client is None and url:
+            client = httpx.Client(
+                base_url=url.rstrip("/"),
+                timeout=get_settings().qdrant_timeout_seconds,
+            )
+        self._client = client
+        self._remote_ready = False
+        self._version = next_index_version("", "qdrant", collection)
+        if self._client is None and self._path and self._path.exists():
+            self._load(self._path)
+        logger.debug(
+            "qdrant.open",
+            extra={"collection": collection, "remote": self._client is not None},
+        )
+
+    @classmethod
+    def from_settings(
+        cls, collection: str, dim: int | None = None, storage_path: str | None = None
+    ) -> QdrantIndex:
+        """Open *collection* against ``QDRANT_URL`` when set, else in process."""
+        url = get_settings().qdrant_url
+        return cls(collection, dim=dim, storage_path=storage_path, url=url)
+
+    @property
+    def collection(self) -> str:
+        """Return the collection name."""
+        return self._collection
+
+    @property
+    def version(self) -> str | None:
+        """Return the local content fingerprint; None for remote collections."""
+        return None if self._client is not None else self._version
+
+    def __len__(self) -> int:
+        """Return the number of stored points."""
+        if self._client is not None:
+            info = self._request("GET", f"/collections/{self._collection}")
+            return int((info.get("result") or {}).get("points_count", 0))
+        return len(self._point_ids)
+
+    # -- writes ---------------------------------------------------------------
+
+    def add(
+        self, vectors: list[list[float]], payloads: list[dict[str, Any]] | None
+    ) -> None:
+        """Append vectors; point ids are the row numbers they land on."""
+        payloads = payloads or [{} for _ in vectors]
+        if len(payloads) != len(vectors):
+            raise ValueError("payload count must match vectors")
+        start = len(self._point_ids)
+        self.upsert(
+            {"id": start + offset, "vector": vector, "payload": payload}
+            for offset, (vector, payload) in enumerate(
+                zip(vectors, payloads, strict=True)
+            )
+        )
+
+    def upsert(
+        self, points: Iterable[Mapping[str, Any]], batch_size: int | None = None
+    ) -> int:
+        """Insert or replace ``{"id", "vector", "payload"}`` points in batches."""
+        size = max(int(batch_size or get_settings().vector_batch_size), 1)
+        batch: list[Mapping[str, Any]] = []
+        written = 0
+        for point in points:
+            batch.append(point)
+            if len(batch) >= size:
+                written += self._upsert_batch(batch)
+                batch = []
+        if batch:
+            written += self._upsert_batch(batch)
+        return written
+
+    def _upsert_batch(self, batch: list[Mapping[str, Any]]) -> int:
+        if self._client is not None:
+            self._ensure_remote(len(batch[0]["vector"]))
+            body = {
+                "points": [
+                    {
+                        "id": point["id"],
+                        "vector": [float(value) for value in point["vector"]],
+                        "payload": dict(point.get("payload") or {}),
+                    }
+                    for point in batch
+                ]
+            }
+            self._request(
+                "PUT", f"/collections/{self._collection}/points?wait=true", body
+            )
+            return len(batch)
+
+        # Later duplicates win, as they would with sequential upserts.
+        latest: dict[PointId, Mapping[str, Any]] = {}
+        for point in batch:
+            latest[point["id"]] = point
+        vectors = self._ensure_vectors(len(batch[0]["vector"]))
+        fresh = [point for pid, point in latest.items() if pid not in self._rows]
+        stale = [point for pid, point in latest.items() if pid in self._rows]
+        if stale:
+            rows = [self._rows[point["id"]] for point in stale]
+            vectors.update(rows, [list(point["vector"]) for point in stale])
+            for row, point in zip(rows, stale, strict=True):
+                self._set_payload(row, dict(point.get("payload") or {}))
+        if fresh:
+            vectors.add([list(point["vector"]) for point in fresh])
+            for point in fresh:
+                row = len(self._point_ids)
+                self._point_ids.append(point["id"])
+                self._rows[point["id"]] = row
+                self._payloads.append({})
+                self._set_payload(row, dict(point.get("payload") or {}))
+        written = [
+            [pid, list(point["vector"]), point.get("payload") or {}]
+            for pid, point in latest.items()
+        ]
+        self._version = next_index_version(self._version, "upsert", written)
+        logger.debug(
+            "qdrant.upsert",
+            extra={
+                "collection": self._collection,
+                "inserted": len(fresh),
+                "updated": len(stale),
+            },
+        )
+        return len(latest)
+
+    def _ensure_vectors(self, dim: int) -> _CollectionVectors:
+        if self._vectors is None:
+            if self._dim is not None and dim != self._dim:
+                raise ValueError(f"vector dimensionality {dim} != {self._dim}")
+            self._dim = dim
+            self._vectors = _CollectionVectors(dim)
+        return self._vectors
+
+    def _set_payload(self, row: int, payload: dict[str, Any]) -> None:
+        previous = self._payloads[row]
+        for field, values in self._field_index.items():
+            old = previous.get(field)
+            if old is not None and old.__hash__ is not None:
+                values.get(old, set()).discard(row)
+            new = payload.get(field)
+            if new is not None and new.__hash__ is not None:
+                values.setdefault(new, set()).add(row)
+        self._payloads[row] = payload
+
+    # -- reads ----------------------------------------------------------------
+
+    def _filter_rows(self, payload_filter: PayloadFilter) -> list[int]:
+        selected: set[int] | None = None
+        for field, value in payload_filter.items():
+            wanted = _filter_values(value)
+            index = self._field_index.get(field)
+            if index is not None:
+                rows: set[int] = set()
+                for item in wanted:
+                    rows |= index.get(item, set())
+            else:
+                rows = {
+                    row
+                    for row, payload in enumerate(self._payloads)
+                    if payload.get(field) in wanted
+                }
+            selected = rows if selected is None else selected & rows
+            if not selected:
+                return []
+        return sorted(selected or ())
+
+    def search(
+        self,
+        query_vec: list[float],
+        k: int = 20,
+        payload_filter: PayloadFilter | None = None,
+    ) -> list[dict[str, Any]]:
+        """Return ``{"id", "score", "payload"}`` hits, optionally filtered."""
+        if self._client is not None:
+            body: dict[str, Any] = {
+                "vector": [float(value) for value in query_vec],
+                "limit": k,
+                "with_payload": True,
+            }
+            remote_filter = to_qdrant_filter(payload_filter)
+            if remote_filter:
+                body["filter"] = remote_filter
+            response = self._request(
+                "POST", f"/collections/{self._collection}/points/search", body
+            )
+            return [
+                {
+                    "id": hit.get("id"),
+                    "score": float(hit.get("score", 0.0)),
+                    "payload": hit.get("payload") or {},
+                }
+                for hit in response.get("result") or []
+            ]
+
+        if self._vectors is None:
+            return []
+        if payload_filter:
+            rows = self._filter_rows(payload_filter)
+            results = self._vectors.search_rows(query_vec, rows, k=k) if rows else []
+        else:
+            results = self._vectors.search(query_vec, k=k)
+        response_hits: list[dict[str, Any]] = []
+        for row, score in results:
+            payload = self._payloads[row] if row < len(self._payloads) else {}
+            response_hits.append(
+                {"id": self._point_ids[row], "score": score, "payload": payload}
+            )
+        return response_hits
+
+    # -- persistence ----------------------------------------------------------
+
+    def save(self) -> None:
+        """Persist a local collection to its storage path."""
+        if self._client is not None or not self._path or self._vectors is None:
+            return
+        self._vectors.meta = {
+            "collection": self._collection,
+            "point_ids": self._point_ids,
+            "payloads": self._payloads,
+            "collection_version": self._version,
+        }
+        self._vectors.save_to(str(self._path))
+
+    def _load(self, path: Path) -> None:
+        stored = read_vector_file(path)
+        if self._dim is not None and stored.dim != self._dim:
+            raise ValueError(f"vector dimensionality {stored.dim} != {self._dim}")
+        self._dim = stored.dim
+        self._vectors = _CollectionVectors(stored.dim, str(path))
+        meta = self._vectors.meta
+        point_ids = list(meta.get("point_ids") or range(len(self._vectors)))
+        payloads = list(meta.get("payloads") or [{} for _ in point_ids])
+        for row, (point_id, payload) in enumerate(
+            zip(point_ids, payloads, strict=True)
+        ):
+            self._point_ids.append(point_id)
+            self._rows[point_id] = row
+            self._payloads.append({})
+            self._set_payload(row, dict(payload))
+        saved = meta.get("collection_version")
+        self._version = (
+            str(saved)
+            if saved
+            else next_index_version(
+                self._version, "load", self._vectors.version, point_ids, payloads
+            )
+        )
+
+    # -- remote ---------------------------------------------------------------
+
+    def _ensure_remote(self, dim: int) -> None:
+        if self._remote_ready:
+            return
+        body = {"vectors": {"size": self._dim or dim, "distance": "Cosine"}}
+        self._request("PUT", f"/collections/{self._collection}", body, ok=(409,))
+        self._remote_ready = True
+
+    def _request(
+        self,
+        method: str,
+        path: str,
+        body: Mapping[str, Any] | None = None,
+        ok: tuple[int, ...] = (),
+    ) -> dict[str, Any]:
+        assert self._client is not None
+        try:
+            response = self._client.request(method, path, json=body)
+        except httpx.HTTPError as exc:
+            raise ExternalServiceError(f"qdrant {method} {path} failed: {exc}") from exc
+        if response.status_code >= 400 and response.status_code not in ok:
+            raise ExternalServiceError(
+                f"qdrant {method} {path} failed: {response.status_code}"
+            )
+        try:
+            payload = response.json()
+        except ValueError:
+            return {}
+        return payload if isinstance(payload, dict) else {}
+
+
+__all__ = ["QdrantIndex", "from_qdrant_filter", "to_qdrant_filter"]
@@ -0,0 +1,193 @@
+"""Local stand-in for the subset of the Qdrant REST API used by QdrantIndex.
+
+Every collection is served by an in-process :class:`QdrantIndex`, so load tests
+exercise the remote client path (HTTP, JSON, batching) against the same
+engine without a Qdrant deployment. Not intended for production traffic.
+
+Each collection has its own read/write lock, so searches run concurrently and
+only upserts into the same collection exclude them. Upserts just mark the
+collection dirty; it is written to disk by a background flush every
+``flush_interval_seconds``, by ``POST /collections/{name}/snapshots`` and on
+shutdown.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections.abc import AsyncIterator, Iterator
+from contextlib import asynccontextmanager, contextmanager
+from pathlib import Path
+from typing import Any
+
+from fastapi import FastAPI, HTTPException
+
+from ..util.errors import ValidationError
+from .qdrant import QdrantIndex, from_qdrant_filter
+
+
+class _ReadWriteLock:
+    """Many readers or one writer; waiting writers hold off new readers."""
+
+    def __init__(self) -> None:
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+
+    @contextmanager
+    def read(self) -> Iterator[None]:
+        with self._cond:
+            while self._writer or self._waiting_writers:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self) -> Iterator[None]:
+        with self._cond:
+            self._waiting_writers += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._waiting_writers -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
+
+
+class _Collection:
+    """A served index with its lock and unsaved-changes flag."""
+
+    def __init__(self, index: QdrantIndex) -> None:
+        self.index = index
+        self.lock = _ReadWriteLock()
+        self.dirty = False
+        self._save_lock = threading.Lock()
+
+    def flush(self) -> bool:
+        """Save the index if it changed since the last flush."""
+        with self.lock.read(), self._save_lock:
+            if not self.dirty:
+                return False
+            self.index.save()
+            self.dirty = False
+            return True
+
+
+def create_app(
+    storage_dir: str | None = None, flush_interval_seconds: float = 5.0
+) -> FastAPI:
+    """Build the stand-in app; collections persist under *storage_dir* if set."""
+
+    collections: dict[str, _Collection] = {}
+    registry = threading.Lock()
+    root = Path(storage_dir) if storage_dir else None
+    stop = threading.Event()
+
+    def _flush_all() -> None:
+        with registry:
+            served = list(collections.values())
+        for collection in served:
+            collection.flush()
+
+    def _flush_loop() -> None:
+        while not stop.wait(flush_interval_seconds):
+            _flush_all()
+
+    @asynccontextmanager
+    async def lifespan(_app: FastAPI) -> AsyncIterator[None]:
+        flusher = threading.Thread(
+            target=_flush_loop, name="qdrant-standin-flush", daemon=True
+        )
+        if root is not None:
+            flusher.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            if flusher.is_alive():
+                flusher.join()
+            _flush_all()
+
+    app = FastAPI(title="FluidRAG Qdrant stand-in", lifespan=lifespan)
+
+    def _collection(name: str) -> _Collection:
+        with registry:
+            collection = collections.get(name)
+        if collection is None:
+            raise HTTPException(status_code=404, detail=f"collection {name} not found")
+        return collection
+
+    @app.put("/collections/{name}")
+    def create_collection(name: str, body: dict[str, Any]) -> Any:
+        size = int(((body.get("vectors") or {}).get("size")) or 0)
+        if size <= 0:
+            raise HTTPException(status_code=400, detail="vectors.size is required")
+        with registry:
+            if name in collections:
+                raise HTTPException(status_code=409, detail="collection exists")
+            path = str(root / f"{name}.qdrant.bin") if root else None
+            collections[name] = _Collection(
+                QdrantIndex(name, dim=size, storage_path=path)
+            )
+        return {"result": True, "status": "ok"}
+
+    @app.get("/collections/{name}")
+    def get_collection(name: str) -> Any:
+        collection = _collection(name)
+        with collection.lock.read():
+            count = len(collection.index)
+        return {"result": {"points_count": count}, "status": "ok"}
+
+    @app.put("/collections/{name}/points")
+    def upsert_points(name: str, body: dict[str, Any]) -> Any:
+        points = body.get("points") or []
+        collection = _collection(name)
+        with collection.lock.write():
+            try:
+                collection.index.upsert(points, batch_size=max(len(points), 1))
+            except (KeyError, ValueError) as exc:
+                raise HTTPException(status_code=400, detail=str(exc)) from exc
+            finally:
+                collection.dirty = True
+        return {"result": {"status": "completed"}, "status": "ok"}
+
+    @app.post("/collections/{name}/snapshots")
+    def snapshot_collection(name: str) -> Any:
+        collection = _collection(name)
+        saved = collection.flush()
+        return {"result": {"name": name, "saved": saved}, "status": "ok"}
+
+    @app.post("/collections/{name}/points/search")
+    def search_points(name: str, body: dict[str, Any]) -> Any:
+        try:
+            payload_filter = from_qdrant_filter(body.get("filter"))
+        except ValidationError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+        collection = _collection(name)
+        with collection.lock.read():
+            try:
+                hits = collection.index.search(
+                    list(body.get("vector") or []),
+                    k=int(body.get("limit", 10)),
+                    payload_filter=payload_filter,
+                )
+            except ValueError as exc:
+                raise HTTPException(status_code=400, detail=str(exc)) from exc
+        if not body.get("with_payload", False):
+            hits = [{"id": hit["id"], "score": hit["score"]} for hit in hits]
+        return {"result": hits, "status": "ok"}
+
+    return app
+
+
+__all__ = ["create_app"]
@@ -0,0 +1,429 @@
+"""Quantized dense indexes: int8 scalar quantization and product quantization.
+
+Both keep compact codes for scanning and score queries with asymmetric
+distance computation (ADC): the float query is compared against decoded
+codes, never quantized itself. The top ``k * rescore_factor`` candidates can
+then be re-scored exactly against the float rows. After training those rows
+are never resident: with ``rescore_factor`` 0 they are dropped (saved files
+then carry rows decoded from the codes), otherwise they live in a
+memory-mapped file (the index file once saved and re-opened, a temporary
+file before that). Resident memory per vector is ``dim`` bytes (SQ8, 4x
+smaller than float32) or ``m`` bytes (PQ, ``4 * dim / m`` times smaller).
+"""
+
+from __future__ import annotations
+
+import tempfile
+import threading
+from abc import abstractmethod
+from typing import Any
+
+import numpy as np
+
+from ..config import get_settings
+from ..util.logging import get_logger
+from .dense import FaissIndex
+from .vector_format import VectorFile
+
+logger = get_logger(__name__)
+
+_SCAN_BATCH = 65536
+_MIN_TRAIN_ROWS = 256
+_MAX_TRAIN_ROWS = 65536
+_KMEANS_ITERATIONS = 12
+
+
+class _QuantizedIndex(FaissIndex):
+    """Shared training, code storage, ADC scan and re-scoring."""
+
+    code_dtype: Any = np.uint8
+
+    def __init__(
+        self,
+        dim: int,
+        index_path: str | None = None,
+        rescore_factor: int | None = None,
+    ) -> None:
+        if rescore_factor is None:
+            rescore_factor = get_settings().vector_rescore_factor
+        self.rescore_factor = max(int(rescore_factor), 0)
+        self._trained = False
+        self._trained_rows = 0
+        self._lock = threading.Lock()
+        self._codes = np.empty((0, self._code_width(dim)), dtype=self.code_dtype)
+        super().__init__(dim, index_path)
+
+    @property
+    def is_trained(self) -> bool:
+        """Return True once the codebook exists and every row is encoded."""
+        return self._trained
+
+    @property
+    def code_bytes(self) -> int:
+        """Return the resident bytes spent per stored vector."""
+        return int(self._codes.shape[1] * self._codes.dtype.itemsize)
+
+    @property
+    def _has_floats(self) -> bool:
+        return not self._trained or self.rescore_factor > 0
+
+    def train(self) -> None:
+        """Fit the codebook on (a sample of) the stored rows and encode them."""
+        with self._lock:
+            if not self._trained or self._trained_rows != self._count:
+                self._train()
+
+    def _train(self) -> None:
+        if not self._count or not self._has_floats:
+            # Nothing to fit on once the exact rows have been dropped.
+            return
+        rng = np.random.default_rng(0)
+        size = min(self._count, _MAX_TRAIN_ROWS)
+        picks = np.sort(rng.choice(self._count, size, replace=False))
+        self._fit(np.asarray(self._matrix[picks]), rng)
+        codes = np.empty((self._count, self._codes.shape[1]), self.code_dtype)
+        for start in range(0, self._count, _SCAN_BATCH):
+            stop = min(start + _SCAN_BATCH, self._count)
+            codes[start:stop] = self._encode(np.asarray(self._matrix[start:stop]))
+        self._codes = codes
+        self._trained = True
+        self._trained_rows = self._count
+        self._release_floats()
+        self._bump_version("train", self._count)
+        logger.info(
+            "quant.train",
+            extra={"type": self.index_type, "rows": self._count, "sample": size},
+        )
+
+    def _release_floats(self) -> None:
+        """Stop keeping the float rows resident once every row is encoded."""
+        if not self.rescore_factor:
+            self._matrix = np.empty((0, self._dim), dtype=np.float32)
+        elif not isinstance(self._matrix, np.memmap):
+            spilled = self._allocate(self._count)
+            spilled[:] = self._matrix[: self._count]
+            self._matrix = spilled
+
+    def _allocate(self, capacity: int) -> np.ndarray:
+        if not self._trained or not capacity:
+            return super()._allocate(capacity)
+        # Re-scoring reads only a short list per query; let the OS page it.
+        return np.memmap(
+            tempfile.TemporaryFile(),
+            dtype=np.float32,
+            mode="w+",
+            shape=(capacity, self._dim),
+        )
+
+    def _added(self, start: int, end: int) -> None:
+        # Train on the write path so searches never mutate the index: first
+        # once enough rows exist, then whenever the float rows still held
+        # have doubled since the last fit.
+        with self._lock:
+            if self._trained:
+                if self._has_floats and end >= 2 * self._trained_rows:
+                    self._train()
+            elif end >= _MIN_TRAIN_ROWS:
+                self._train()
+
+    def _store_rows(self, start: int, rows: np.ndarray) -> None:
+        if self._trained:
+            end = start + len(rows)
+            if end > len(self._codes) or not self._codes.flags.writeable:
+                capacity = max(end, 2 * len(self._codes), 64)
+                grown = np.empty((capacity, self._codes.shape[1]), self.code_dtype)
+                grown[:start] = self._codes[:start]
+                self._codes = grown
+            self._codes[start:end] = self._encode(rows)
+        if self._has_floats:
+            super()._store_rows(start, rows)
+
+    def _overwrite_rows(self, positions: np.ndarray, rows: np.ndarray) -> None:
+        if self._trained:
+            if not self._codes.flags.writeable:
+                self._codes = np.array(self._codes[: self._count])
+            self._codes[positions] = self._encode(rows)
+        if self._has_floats:
+            super()._overwrite_rows(positions, rows)
+
+    def _score_rows(self, positions: np.ndarray, query: np.ndarray) -> np.ndarray:
+        if self._has_floats:
+            return super()._score_rows(positions, query)
+        codes = np.asarray(self._codes[positions])
+        return self._adc(self._query_tables(query)[None, :], codes)[0]
+
+    def _float_rows(self) -> np.ndarray:
+        if self._has_floats:
+            return super()._float_rows()
+        decoded = np.empty((self._count, self._dim), dtype=np.float32)
+        for start in range(0, self._count, _SCAN_BATCH):
+            stop = min(start + _SCAN_BATCH, self._count)
+            decoded[start:stop] = self._decode(np.asarray(self._codes[start:stop]))
+        return decoded
+
+    def _search_unit(self, query: np.ndarray, k: int) -> list[tuple[int, float]]:
+        return self._search_units(query[None, :], k)[0]
+
+    def _search_units(
+        self, queries: np.ndarray, k: int
+    ) -> list[list[tuple[int, float]]]:
+        if not self._trained:
+            return super()._search_units(queries, k)
+        tables = np.stack([self._query_tables(query) for query in queries])
+        scores = np.empty((len(queries), self._count), dtype=np.float32)
+        for start in range(0, self._count, _SCAN_BATCH):
+            stop = min(start + _SCAN_BATCH, self._count)
+            codes = np.asarray(self._codes[start:stop])
+            scores[:, start:stop] = self._adc(tables, codes)
+        return [
+            self._rescore(query, row_scores, k)
+            for query, row_scores in zip(queries, scores, strict=True)
+        ]
+
+    def _rescore(
+        self, query: np.ndarray, scores: np.ndarray, k: int
+    ) -> list[tuple[int, float]]:
+        if not self.rescore_factor:
+            return self._top_k(scores, k)
+        candidates = self._top_k(scores, k * self.rescore_factor)
+        shortlist = np.sort(np.asarray([row for row, _ in candidates], dtype=np.int64))
+        if not len(shortlist):
+            return []
+        exact = np.asarray(self._matrix[shortlist]) @ query
+        return [(int(shortlist[i]), score) for i, score in self._top_k(exact, k)]
+
+    def _persisted_arrays(self) -> tuple[dict[str, np.ndarray], dict[str, Any]]:
+        meta: dict[str, Any] = {"index_type": self.index_type, **self.params}
+        if not self._trained:
+            return {}, meta
+        meta["float_rows"] = "exact" if self._has_floats else "decoded"
+        arrays = {f"{self.index_type}_codes": self._codes[: self._count]}
+        arrays.update(self._codebook())
+        return arrays, meta
+
+    def _restore(self, stored: VectorFile) -> None:
+        codes = stored.arrays.get(f"{self.index_type}_codes")
+        if codes is None or stored.meta.get("index_type") != self.index_type:
+            return
+        if codes.shape != (stored.count, self._codes.shape[1]) or not (
+            self._load_codebook(stored.arrays, stored.meta, codes)
+        ):
+            logger.warning("quant.restore_mismatch", extra={"rows": stored.count})
+            return
+        self._codes = codes
+        self._trained = True
+        self._trained_rows = stored.count
+        if self.rescore_factor and stored.meta.get("float_rows") == "decoded":
+            logger.warning(
+                "quant.rescore_decoded_rows",
+                extra={"rescore_factor": self.rescore_factor},
+            )
+        self._release_floats()
+
+    @abstractmethod
+    def _code_width(self, dim: int) -> int:
+        """Return the number of code entries per vector."""
+
+    @abstractmethod
+    def _fit(self, sample: np.ndarray, rng: np.random.Generator) -> None:
+        """Fit the codebook on unit-normalised *sample* rows."""
+
+    @abstractmethod
+    def _encode(self, rows: np.ndarray) -> np.ndarray:
+        """Encode unit-normalised *rows*."""
+
+    @abstractmethod
+    def _decode(self, codes: np.ndarray) -> np.ndarray:
+        """Reconstruct approximate float rows from *codes*."""
+
+    @abstractmethod
+    def _query_tables(self, query: np.ndarray) -> np.ndarray:
+        """Precompute per-query state for :meth:`_adc`."""
+
+    @abstractmethod
+    def _adc(self, tables: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        """Approximate inner products, ``(queries, rows)``, from stacked *tables*."""
+
+    @abstractmethod
+    def _codebook(self) -> dict[str, np.ndarray]:
+        """Return codebook arrays to persist."""
+
+    @abstractmethod
+    def _load_codebook(
+        self, arrays: dict[str, np.ndarray], meta: dict[str, Any], codes: np.ndarray
+    ) -> bool:
+        """Restore the codebook; return False when it does not fit the header."""
+
+
+class ScalarQuantizedIndex(_QuantizedIndex):
+    """Per-dimension symmetric int8 codes (one byte per dimension)."""
+
+    index_type = "sq8"
+    code_dtype = np.int8
+
+    def __init__(
+        self,
+        dim: int,
+        index_path: str | None = None,
+        rescore_factor: int | None = None,
+    ) -> None:
+        """Create or load index; ``rescore_factor`` defaults to settings."""
+        self._scale = np.ones(dim, dtype=np.float32)
+        super().__init__(dim, index_path, rescore_factor)
+
+    @property
+    def params(self) -> dict[str, Any]:
+        """Return the parameters recorded alongside the index."""
+        return {"rescore_factor": self.rescore_factor}
+
+    def _code_width(self, dim: int) -> int:
+        return dim
+
+    def _fit(self, sample: np.ndarray, rng: np.random.Generator) -> None:
+        peak = np.abs(sample).max(axis=0)
+        peak[peak == 0.0] = 1.0
+        self._scale = (peak / 127.0).astype(np.float32)
+
+    def _encode(self, rows: np.ndarray) -> np.ndarray:
+        # Rows added after training may exceed the fitted range; clip them.
+        return np.clip(np.rint(rows / self._scale), -127, 127).astype(np.int8)
+
+    def _decode(self, codes: np.ndarray) -> np.ndarray:
+        return codes.astype(np.float32) * self._scale
+
+    def _query_tables(self, query: np.ndarray) -> np.ndarray:
+        return (query * self._scale).astype(np.float32)
+
+    def _adc(self, tables: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        # One decode of the codes serves every query in the batch.
+        return tables @ codes.astype(np.float32).T
+
+    def _codebook(self) -> dict[str, np.ndarray]:
+        return {"sq8_scale": self._scale}
+
+    def _load_codebook(
+        self, arrays: dict[str, np.ndarray], meta: dict[str, Any], codes: np.ndarray
+    ) -> bool:
+        scale = arrays.get("sq8_scale")
+        if scale is None or scale.shape != (self._dim,) or not np.all(scale > 0):
+            return False
+        self._scale = np.asarray(scale, dtype=np.float32)
+        return True
+
+
+class ProductQuantizedIndex(_QuantizedIndex):
+    """Product quantization: ``m`` sub-vectors, each coded by one byte."""
+
+    index_type = "pq"
+
+    def __init__(
+        self,
+        dim: int,
+        index_path: str | None = None,
+        subvectors: int | None = None,
+        rescore_factor: int | None = None,
+        ksub: int = 256,
+    ) -> None:
+        """Create or load index; ``subvectors`` must divide ``dim``."""
+        m = int(subvectors or get_settings().vector_pq_subvectors)
+        if m < 1 or dim % m:
+            raise ValueError(f"pq subvectors {m} must divide dimensionality {dim}")
+        if not 1 <= ksub <= 256:
+            raise ValueError("pq ksub must be between 1 and 256")
+        self.subvectors = m
+        self.ksub = ksub
+        self._centroids = np.empty((m, 0, dim // m), dtype=np.float32)
+        super().__init__(dim, index_path, rescore_factor)
+
+    @property
+    def params(self) -> dict[str, Any]:
+        """Return the parameters recorded alongside the index."""
+        return {
+            "subvectors": self.subvectors,
+            "ksub": self.ksub,
+            "rescore_factor": self.rescore_factor,
+        }
+
+    def _code_width(self, dim: int) -> int:
+        return self.subvectors
+
+    def _split(self, rows: np.ndarray) -> np.ndarray:
+        return rows.reshape(len(rows), self.subvectors, -1)
+
+    def _fit(self, sample: np.ndarray, rng: np.random.Generator) -> None:
+        parts = self._split(sample)
+        ksub = min(self.ksub, len(sample))
+        centroids = np.empty((self.subvectors, ksub, parts.shape[2]), np.float32)
+        for sub in range(self.subvectors):
+            centroids[sub] = _kmeans(parts[:, sub, :], ksub, rng)
+        self._centroids = centroids
+
+    def _encode(self, rows: np.ndarray) -> np.ndarray:
+        parts = self._split(rows)
+        codes = np.empty((len(rows), self.subvectors), dtype=np.uint8)
+        for sub in range(self.subvectors):
+            codes[:, sub] = _nearest(parts[:, sub, :], self._centroids[sub])
+        return codes
+
+    def _decode(self, codes: np.ndarray) -> np.ndarray:
+        parts = self._centroids[np.arange(self.subvectors), codes]
+        return parts.reshape(len(codes), self._dim)
+
+    def _query_tables(self, query: np.ndarray) -> np.ndarray:
+        # (m, ksub) inner products of each query sub-vector with its centroids.
+        return np.einsum("md,mkd->mk", self._split(query[None, :])[0], self._centroids)
+
+    def _adc(self, tables: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        return tables[:, np.arange(self.subvectors), codes].sum(axis=2)
+
+    def _codebook(self) -> dict[str, np.ndarray]:
+        return {"pq_centroids": self._centroids}
+
+    def _load_codebook(
+        self, arrays: dict[str, np.ndarray], meta: dict[str, Any], codes: np.ndarray
+    ) -> bool:
+        centroids = arrays.get("pq_centroids")
+        if centroids is None or centroids.ndim != 3:
+            return False
+        if (meta.get("subvectors"), meta.get("ksub")) != (self.subvectors, self.ksub):
+            return False
+        # Training caps the codebook at the sample size, so it may hold fewer
+        # than ``ksub`` centroids; every stored code must still address one.
+        m, trained_ksub, dsub = centroids.shape
+        if (m, dsub) != (self.subvectors, self._dim // self.subvectors):
+            return False
+        if not 1 <= trained_ksub <= self.ksub:
+            return False
+        if len(codes) and int(np.asarray(codes).max()) >= trained_ksub:
+            return False
+        self._centroids = np.asarray(centroids, dtype=np.float32)
+        return True
+
+
+def _nearest(points: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Index of the closest (Euclidean) centroid for every point."""
+    distances = (
+        (points * points).sum(axis=1, keepdims=True)
+        - 2.0 * points @ centroids.T
+        + (centroids * centroids).sum(axis=1)
+    )
+    return np.argmin(distances, axis=1)
+
+
+def _kmeans(points: np.ndarray, k: int, rng: np.random.Generator) -> np.ndarray:
+    """Plain Lloyd iterations; empty clusters are re-seeded from the data."""
+    centroids = points[rng.choice(len(points), k, replace=False)].copy()
+    for _ in range(_KMEANS_ITERATIONS):
+        assignment = _nearest(points, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, points)
+        counts = np.bincount(assignment, minlength=k)
+        empty = counts == 0
+        if empty.any():
+            sums[empty] = points[rng.choice(len(points), int(empty.sum()))]
+            counts[empty] = 1
+        centroids = (sums / counts[:, None]).astype(np.float32)
+    return centroids
+
+
+__all__ = ["ProductQuantizedIndex", "ScalarQuantizedIndex"]
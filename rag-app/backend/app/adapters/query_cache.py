@@ -0,0 +1,135 @@
+"""LRU + TTL cache for fused retrieval results.
+
+Entries are keyed by the query text, a hash of the query vector, ``alpha``,
+``k`` and the versions of the indexes that produced them. A version is a
+content fingerprint: every index folds each change into it with
+:func:`next_index_version` and saves it alongside its files. A mutated index
+can therefore never be served results computed before the change, while an
+index rebuilt from the same chunks, or reopened from disk, shares the
+entries of the original. Stale entries simply age out of the LRU.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from functools import lru_cache
+from typing import Any
+
+import numpy as np
+
+from ..config import get_settings
+from ..util.metrics import register_metrics
+
+
+def next_index_version(previous: str = "", *parts: Any) -> str:
+    """Return the version following *previous* after a change made of *parts*.
+
+    Parts are arrays (hashed by dtype, shape and bytes) or JSON-serialisable
+    values, so equal histories of changes produce equal versions.
+    """
+    digest = hashlib.blake2b(previous.encode("utf-8"), digest_size=16)
+    for part in parts:
+        if isinstance(part, np.ndarray):
+            array = np.ascontiguousarray(part)
+            digest.update(f"{array.dtype.str}{array.shape}".encode())
+            if array.size:
+                digest.update(array.data)
+        else:
+            encoded = json.dumps(part, sort_keys=True, default=str)
+            digest.update(encoded.encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+def vector_digest(vector: list[float] | None) -> str | None:
+    """Hash a query vector as float32 so equal vectors share a key."""
+    if vector is None:
+        return None
+    raw = np.asarray(vector, dtype=np.float32).tobytes()
+    return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+
+class QueryCache:
+    """Thread-safe LRU cache whose entries expire after ``ttl_seconds``."""
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_entries = max(int(max_entries), 0)
+        self.ttl_seconds = float(ttl_seconds)
+        self._clock = clock
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def get(self, key: Hashable) -> Any | None:
+        """Return the live value for *key*, or None (counted as a miss)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= self._clock():
+                del self._entries[key]
+                self.expired += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evicted += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.expired = self.evicted = 0
+
+    def stats(self) -> dict[str, Any]:
+        """Return counters for monitoring."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "expired": self.expired,
+                "evicted": self.evicted,
+            }
+
+
+@lru_cache(maxsize=1)
+def get_query_cache() -> QueryCache:
+    """Return the process-wide hybrid search cache (sized from settings)."""
+    settings = get_settings()
+    return QueryCache(settings.query_cache_size, settings.query_cache_ttl_seconds)
+
+
+register_metrics("query_cache", lambda: get_query_cache().stats())
+
+
+__all__ = ["QueryCache", "get_query_cache", "next_index_version", "vector_digest"]
@@ -0,0 +1,408 @@
+"""Sparse lexical retrieval: BM25 over an inverted index."""
+
+from __future__ import annotations
+
+from collections import Counter
+from collections.abc import Iterable, Sequence
+from pathlib import Path
+
+import numpy as np
+
+from ..config import get_settings
+from ..util.logging import get_logger
+from .analyzer import ANALYZER_NAME, get_analyzer
+from .bm25_search import (
+    Norms,
+    QueryTerm,
+    search_batch,
+    search_exhaustive,
+    search_pruned,
+)
+from .postings import (
+    CorpusStats,
+    PostingList,
+    StoredPostings,
+    bm25_idf,
+    pack_postings,
+)
+from .query_cache import next_index_version
+from .sparse_format import read_sparse_file, write_sparse_file
+
+logger = get_logger(__name__)
+
+# Rows are grouped into fixed segments; compaction rewrites one segment's
+# postings once enough of its rows are tombstoned.
+_SEGMENT_SIZE = 1024
+# Below this many postings across the query terms, pruning costs more than the
+# exhaustive pass it would save.
+_PRUNE_MIN_POSTINGS = 1024
+
+
+class BM25Index:
+    """Sparse BM25 index over chunks backed by per-term postings lists.
+
+    Documents are keyed by chunk id. :meth:`upsert` and :meth:`delete`
+    tombstone the old row and keep ``N``, document frequencies and the total
+    length current, so scores always equal those of a fresh index over the
+    live documents. Once a segment's tombstones pass the compaction threshold
+    its postings are rewritten without the dead rows.
+
+    Long queries use MaxScore (see :mod:`.bm25_search`): each postings list
+    keeps per-block ``max_tf`` and ``min_dl`` from which an upper bound on the
+    term's contribution is derived, and terms whose remaining bounds cannot
+    lift a new document into the top-k are only probed for surviving
+    candidates instead of scanned. Results are identical to exhaustive
+    scoring, including float values and tie order.
+    """
+
+    def __init__(self, compaction_threshold: float | None = None) -> None:
+        """Init BM25 index; the threshold defaults to settings."""
+        if compaction_threshold is None:
+            compaction_threshold = get_settings().bm25_compaction_threshold
+        self._compaction_threshold = compaction_threshold
+        self._analyzer = get_analyzer()
+        self._postings: dict[str, PostingList] = {}
+        self._df: dict[str, int] = {}
+        # Loaded indexes keep lengths and norms memory-mapped until a write.
+        self._doc_lengths: list[int] | np.ndarray = []
+        self._doc_terms: list[tuple[str, ...] | None] = []
+        self._keys: list[str | None] = []
+        self._rows: dict[str, int] = {}
+        self._dead: set[int] = set()
+        self._segment_dead: Counter[int] = Counter()
+        self._live = 0
+        self._total_length = 0
+        self._avgdl: float = 0.0
+        self._k1 = 1.5
+        self._b = 0.75
+        self._norms: Norms | None = None
+        self._foreign_norms: tuple[float, list[float]] | None = None
+        self._idf_cache: dict[str, float] = {}
+        self._bound_cache: dict[tuple[str, float], float] = {}
+        self._stored: StoredPostings | None = None
+        self._version = next_index_version("", "bm25", self._k1, self._b)
+
+    def __len__(self) -> int:
+        """Return the number of live documents."""
+        return self._live
+
+    @property
+    def version(self) -> str:
+        """Return a content fingerprint that changes with the search results."""
+        return self._version
+
+    @property
+    def tombstones(self) -> int:
+        """Return the number of deleted rows still present in postings."""
+        return len(self._dead)
+
+    def stats(self, query: str | None = None) -> CorpusStats:
+        """Return this index's statistics, with ``df`` for *query*'s terms."""
+        terms = set(self._analyzer.terms(query)) if query is not None else self._df
+        df = {term: self._df[term] for term in terms if self._df.get(term)}
+        return CorpusStats(docs=self._live, total_length=self._total_length, df=df)
+
+    def chunk_id(self, row: int) -> str | None:
+        """Return the chunk id stored at *row* (None once deleted)."""
+        if row in self._dead or not 0 <= row < len(self._keys):
+            return None
+        return self._keys[row]
+
+    def add(self, docs: list[str], ids: list[str] | None = None) -> None:
+        """Add docs; ids default to the row numbers the docs land on."""
+        if ids is not None and len(ids) != len(docs):
+            raise ValueError("id count must match docs")
+        if ids is None:
+            start = len(self._keys)
+            ids = [str(start + offset) for offset in range(len(docs))]
+        self.upsert(zip(ids, docs, strict=True))
+
+    def upsert(self, items: Iterable[tuple[str, str]]) -> int:
+        """Insert or replace ``(chunk_id, text)`` documents."""
+        written: list[tuple[str, str]] = []
+        replaced = 0
+        for chunk_id, text in items:
+            previous = self._rows.get(chunk_id)
+            if previous is not None:
+                self._tombstone(previous)
+                replaced += 1
+            self._append(chunk_id, text)
+            written.append((chunk_id, text))
+        if written:
+            self._version = next_index_version(self._version, "upsert", written)
+            self._stats_changed()
+        logger.debug(
+            "bm25.upsert",
+            extra={
+                "docs": len(written),
+                "replaced": replaced,
+                "total_docs": self._live,
+            },
+        )
+        return len(written)
+
+    def delete(self, chunk_ids: Iterable[str]) -> int:
+        """Tombstone documents by chunk id; unknown ids are ignored."""
+        removed: list[str] = []
+        for chunk_id in chunk_ids:
+            row = self._rows.get(chunk_id)
+            if row is not None:
+                self._tombstone(row)
+                removed.append(chunk_id)
+        if removed:
+            self._version = next_index_version(self._version, "delete", removed)
+            self._stats_changed()
+        logger.debug(
+            "bm25.delete", extra={"docs": len(removed), "total_docs": self._live}
+        )
+        return len(removed)
+
+    def compact(self) -> int:
+        """Rewrite every segment holding tombstones; return rows purged."""
+        if not self._dead:
+            return 0
+        return self._compact_rows(0, len(self._keys))
+
+    def _append(self, chunk_id: str, text: str) -> None:
+        tokens = self._analyzer.terms(text)
+        lengths = self._doc_lengths
+        if not isinstance(lengths, list):
+            lengths = self._doc_lengths = list(lengths.tolist())
+        row = len(self._keys)
+        counts = Counter(tokens)
+        self._keys.append(chunk_id)
+        self._rows[chunk_id] = row
+        lengths.append(len(tokens))
+        self._doc_terms.append(tuple(counts))
+        self._total_length += len(tokens)
+        self._live += 1
+        for token, tf in counts.items():
+            postings = self._postings_of(token)
+            if postings is None:
+                postings = self._postings[token] = PostingList()
+            postings.append(row, tf, len(tokens))
+            self._df[token] = self._df.get(token, 0) + 1
+
+    def _tombstone(self, row: int) -> None:
+        key = self._keys[row]
+        if key is not None and self._rows.get(key) == row:
+            del self._rows[key]
+        self._dead.add(row)
+        self._segment_dead[row // _SEGMENT_SIZE] += 1
+        self._live -= 1
+        self._total_length -= int(self._doc_lengths[row])
+        for term in self._terms_of(row):
+            self._df[term] -= 1
+
+    def _postings_of(self, term: str) -> PostingList | None:
+        postings = self._postings.get(term)
+        if postings is None and self._stored is not None:
+            postings = self._stored.postings(term)
+            if postings is not None:
+                self._postings[term] = postings
+        return postings
+
+    def _terms_of(self, row: int) -> tuple[str, ...]:
+        terms = self._doc_terms[row]
+        if terms is None and self._stored is not None and self._keys[row] is not None:
+            terms = self._doc_terms[row] = self._stored.doc_terms(row)
+        return terms or ()
+
+    def save_to(self, path: str) -> None:
+        """Compact, then write vocabulary, postings and norms to *path*."""
+        self.compact()
+        vocabulary = sorted(term for term, df in self._df.items() if df)
+        arrays = pack_postings(
+            vocabulary,
+            [self._postings_of(term) for term in vocabulary],
+            [self._terms_of(row) for row in range(len(self._keys))],
+        )
+        arrays["doc_lengths"] = np.asarray(self._doc_lengths, dtype=np.uint32)
+        arrays["norms"] = np.asarray(self._doc_norms(), dtype=np.float64)
+        meta = {
+            "k1": self._k1,
+            "b": self._b,
+            "live": self._live,
+            "total_length": self._total_length,
+            "keys": self._keys,
+            "analyzer": ANALYZER_NAME,
+            "content_version": self._version,
+        }
+        write_sparse_file(path, arrays, meta)
+        logger.debug(
+            "bm25.save",
+            extra={"path": path, "docs": self._live, "terms": len(vocabulary)},
+        )
+
+    @classmethod
+    def load(cls, path: str, compaction_threshold: float | None = None) -> BM25Index:
+        """Open an index written by :meth:`save_to`; postings load lazily."""
+        stored = read_sparse_file(Path(path))
+        meta = stored.meta
+        if meta.get("analyzer", ANALYZER_NAME) != ANALYZER_NAME:
+            # Queries would be tokenized differently from the stored postings.
+            logger.warning(
+                "bm25.analyzer_mismatch",
+                extra={"path": path, "analyzer": meta.get("analyzer")},
+            )
+        index = cls(compaction_threshold)
+        index._k1 = float(meta.get("k1", index._k1))
+        index._b = float(meta.get("b", index._b))
+        index._keys = list(meta.get("keys") or [])
+        index._rows = {
+            key: row for row, key in enumerate(index._keys) if key is not None
+        }
+        index._doc_lengths = stored.arrays["doc_lengths"]
+        index._doc_terms = [None] * len(index._keys)
+        index._live = int(meta.get("live", len(index._rows)))
+        index._total_length = int(meta.get("total_length", 0))
+        index._avgdl = (index._total_length or 1) / max(index._live, 1)
+        index._stored = StoredPostings(stored)
+        index._df = index._stored.document_frequencies()
+        index._norms = stored.arrays["norms"]
+        saved = meta.get("content_version")
+        if saved:
+            index._version = str(saved)
+        else:
+            extras = [stored.arrays[name] for name in sorted(stored.arrays)]
+            index._version = next_index_version(index._version, "load", meta, *extras)
+        return index
+
+    def _stats_changed(self) -> None:
+        self._avgdl = (self._total_length or 1) / max(self._live, 1)
+        # Collection statistics changed; derived caches are rebuilt lazily.
+        self._norms = None
+        self._foreign_norms = None
+        self._idf_cache.clear()
+        self._bound_cache.clear()
+        for seg, dead in list(self._segment_dead.items()):
+            rows = min(_SEGMENT_SIZE, len(self._keys) - seg * _SEGMENT_SIZE)
+            if dead >= self._compaction_threshold * rows:
+                self._compact_rows(seg * _SEGMENT_SIZE, (seg + 1) * _SEGMENT_SIZE)
+
+    def _compact_rows(self, lo: int, hi: int) -> int:
+        """Purge tombstoned rows in ``[lo, hi)`` from every affected posting."""
+        dead = {row for row in self._dead if lo <= row < hi}
+        terms = {term for row in dead for term in self._terms_of(row)}
+        for term in terms:
+            postings = self._postings_of(term)
+            assert postings is not None
+            postings.purge(lo, hi, dead, self._doc_lengths)
+            if not postings.docs:
+                del self._df[term]
+                if self._stored is None:
+                    # Loaded indexes keep the empty list so the stale stored
+                    # postings are never materialised again.
+                    del self._postings[term]
+        self._bound_cache.clear()
+        for row in dead:
+            self._doc_terms[row] = None
+            self._keys[row] = None
+        self._dead -= dead
+        for seg in range(lo // _SEGMENT_SIZE, -(-hi // _SEGMENT_SIZE)):
+            self._segment_dead.pop(seg, None)
+        logger.debug(
+            "bm25.compact",
+            extra={"rows": len(dead), "terms": len(terms), "range": [lo, hi]},
+        )
+        return len(dead)
+
+    def _idf(self, term: str) -> float:
+        cached = self._idf_cache.get(term)
+        if cached is not None:
+            return cached
+        df = self._df.get(term, 0)
+        if df == 0:
+            return 0.0
+        idf = bm25_idf(df, self._live)
+        self._idf_cache[term] = idf
+        return idf
+
+    def _norm(self, length: int, avgdl: float) -> float:
+        return self._k1 * (1 - self._b + self._b * (length / (avgdl or 1)))
+
+    def _doc_norms(self, avgdl: float | None = None) -> Norms:
+        """Return cached ``k1 * (1 - b + b * dl / avgdl)`` per document."""
+        if avgdl is None or avgdl == self._avgdl:
+            if self._norms is None:
+                self._norms = self._compute_norms(self._avgdl)
+            return self._norms
+        # Norms against corpus-wide statistics; kept until the next change.
+        if self._foreign_norms is None or self._foreign_norms[0] != avgdl:
+            self._foreign_norms = (avgdl, self._compute_norms(avgdl))
+        return self._foreign_norms[1]
+
+    def _compute_norms(self, avgdl: float) -> list[float]:
+        # Same operation order as _norm, so values match it bit for bit.
+        ratio = np.asarray(self._doc_lengths, dtype=np.float64) / (avgdl or 1)
+        return (self._k1 * ((1 - self._b) + self._b * ratio)).tolist()
+
+    def _query_terms(
+        self, query: str, stats: CorpusStats | None = None
+    ) -> list[QueryTerm]:
+        terms: list[QueryTerm] = []
+        for term, query_tf in Counter(self._analyzer.terms(query)).items():
+            postings = self._postings_of(term)
+            if not postings or not self._df.get(term):
+                continue
+            if stats is None:
+                idf = self._idf(term)
+            else:
+                idf = bm25_idf(stats.df.get(term) or self._df[term], stats.docs)
+            terms.append((term, idf * query_tf * (self._k1 + 1), postings))
+        return terms
+
+    def search(
+        self, query: str, k: int = 20, stats: CorpusStats | None = None
+    ) -> list[tuple[int, float]]:
+        """Search top-k, touching only the postings of query terms.
+
+        *stats* replaces this index's own ``N``, ``avgdl`` and document
+        frequencies, so shards of one corpus produce comparable scores.
+        """
+        if not self._live or k <= 0:
+            return []
+        terms = self._query_terms(query, stats)
+        avgdl = self._avgdl if stats is None else stats.avgdl
+        total_postings = sum(len(postings) for _, _, postings in terms)
+        norms = self._doc_norms(avgdl)
+        if k >= self._live or total_postings < _PRUNE_MIN_POSTINGS:
+            return search_exhaustive(terms, k, norms, self._dead)
+        bounds = [self._term_bound(*term, avgdl) for term in terms]
+        return search_pruned(terms, bounds, k, norms, self._dead)
+
+    def search_batch(
+        self, queries: Sequence[str], k: int = 20, stats: CorpusStats | None = None
+    ) -> list[list[tuple[int, float]]]:
+        """Search several queries, traversing each distinct term's postings once.
+
+        Saturated term frequencies ``tf / (tf + norm)`` are computed once per
+        term and shared by every query containing it. Results equal those of
+        :meth:`search`, scores included.
+        """
+        if not self._live or k <= 0:
+            return [[] for _ in queries]
+        avgdl = self._avgdl if stats is None else stats.avgdl
+        norms = np.asarray(self._doc_norms(avgdl), dtype=np.float64)
+        live = np.ones(len(self._keys), dtype=bool)
+        live[list(self._dead)] = False
+        per_query = [self._query_terms(query, stats) for query in queries]
+        return search_batch(per_query, k, norms, live)
+
+    def _term_bound(
+        self, term: str, weight: float, postings: PostingList, avgdl: float
+    ) -> float:
+        """Upper bound of *term*'s contribution, from its block statistics."""
+        cached = self._bound_cache.get((term, avgdl))
+        if cached is None:
+            cached = max(
+                max_tf / (max_tf + self._norm(min_dl, avgdl))
+                for max_tf, min_dl in zip(
+                    postings.block_max_tf, postings.block_min_dl, strict=True
+                )
+            )
+            self._bound_cache[(term, avgdl)] = cached
+        return weight * cached
+
+
+__all__ = ["BM25Index", "CorpusStats"]
@@ -0,0 +1,90 @@
+"""Binary, memory-mappable on-disk format for BM25 indexes.
+
+Layout (little endian)::
+
+    [32-byte header][aligned arrays ...][JSON trailer]
+
+The header carries the magic, format version and the trailer location. The
+trailer records every array's offset, dtype and shape plus free-form
+metadata (collection statistics, chunk ids). Arrays are 64-byte aligned and
+opened with :class:`numpy.memmap`, so loading an index only parses the
+trailer and the vocabulary; postings, offsets, document lengths and norms
+stay mapped and are paged in on demand.
+The container itself is read and written by :mod:`.binary_format`.
+"""
+
+from __future__ import annotations
+
+import struct
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from .binary_format import (
+    aligned,
+    encode_trailer,
+    has_magic,
+    load_arrays,
+    place_arrays,
+    read_container,
+    write_container,
+)
+
+MAGIC = b"FRAGBM25"
+FORMAT_NAME = "fluidrag-bm25"
+FORMAT_VERSION = 1
+
+_HEADER = struct.Struct("<8sIIQQ")
+
+
+@dataclass(frozen=True)
+class SparseFile:
+    """Decoded view over a binary BM25 index file."""
+
+    version: int
+    arrays: dict[str, np.ndarray] = field(default_factory=dict)
+    meta: dict[str, Any] = field(default_factory=dict)
+
+
+def is_sparse_file(path: str | Path) -> bool:
+    """Return True when *path* starts with the BM25 index magic."""
+
+    return has_magic(path, MAGIC)
+
+
+def write_sparse_file(
+    path: str | Path, arrays: dict[str, np.ndarray], meta: dict[str, Any]
+) -> None:
+    """Atomically write named *arrays* and *meta* to *path*."""
+
+    layout, placed, end = place_arrays(arrays, _HEADER.size)
+    trailer = encode_trailer({"arrays": layout, "meta": meta})
+    trailer_offset = aligned(end)
+    header = _HEADER.pack(MAGIC, FORMAT_VERSION, 0, trailer_offset, len(trailer))
+    write_container(Path(path), header, placed, trailer_offset, trailer)
+
+
+def read_sparse_file(path: str | Path, mmap: bool = True) -> SparseFile:
+    """Open a BM25 index file; arrays are read-only memory maps when *mmap*."""
+
+    source = Path(path)
+    fields, trailer = read_container(
+        source, _HEADER, MAGIC, FORMAT_VERSION, "BM25 index"
+    )
+    return SparseFile(
+        version=fields[1],
+        arrays=load_arrays(source, trailer.get("arrays") or {}, mmap),
+        meta=dict(trailer.get("meta") or {}),
+    )
+
+
+__all__ = [
+    "FORMAT_NAME",
+    "FORMAT_VERSION",
+    "SparseFile",
+    "is_sparse_file",
+    "read_sparse_file",
+    "write_sparse_file",
+]
@@ -4,6 +4,8 @@ from __future__ import annotations
 
 import asyncio
 import json
+import os
+import tempfile
 from collections.abc import AsyncIterator, Iterable
 from dataclasses import dataclass
 from pathlib import Path
@@ -135,13 +137,26 @@ def ensure_parent_dirs(path: str) -> None:
 
 
 def write_json(path: str, payload: dict[str, Any]) -> None:
-    """Write a JSON file with directories ensured."""
+    """Write a JSON file with directories ensured.
+
+    The file is written to a sibling temp file and renamed into place, so
+    concurrent readers see either the previous or the new document, never a
+    partially written one.
+    """
 
     ensure_parent_dirs(path)
     target = Path(path)
-    target.write_text(
-        json.dumps(payload, indent=2, ensure_ascii=False), encoding="utf-8"
+    text = json.dumps(payload, indent=2, ensure_ascii=False)
+    fd, temp = tempfile.mkstemp(
+        dir=target.parent, prefix=f".{target.name}.", suffix=".tmp"
     )
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as handle:
+            handle.write(text)
+        os.replace(temp, target)
+    except BaseException:
+        Path(temp).unlink(missing_ok=True)
+        raise
     logger.debug("storage.write_json", extra={"path": str(target)})
 
 
@@ -0,0 +1,80 @@
+"""Cached model-token counting for prompt budgeting.
+
+Prompt budgets are spent in model tokens, not words. The configured
+``tiktoken`` encoding (``CONTEXT_TOKENIZER``) is used when it can be loaded;
+otherwise (package missing, or offline without a local copy of the encoding)
+a warning is logged and counts are estimated from the text length, calibrated
+to BPE encodings and never below the shared analyzer's word count. Counts are
+memoized per text, so a chunk offered to five passes is encoded once.
+"""
+
+from __future__ import annotations
+
+import math
+from collections.abc import Callable
+from functools import lru_cache
+
+from ..config import get_settings
+from ..util.logging import get_logger
+from .analyzer import get_analyzer
+
+logger = get_logger(__name__)
+
+ESTIMATOR_NAME = "chars-per-token-v1"
+# cl100k_base and o200k_base average about four characters per token on
+# English prose; part numbers, units and punctuation split finer, which the
+# word-count floor covers.
+_CHARS_PER_TOKEN = 4.0
+
+
+def _load_encoding(name: str) -> Callable[[str], int] | None:
+    try:
+        import tiktoken  # type: ignore[import-not-found]
+    except ModuleNotFoundError:
+        logger.warning(
+            "tokenizer.encoding_unavailable",
+            extra={"encoding": name, "error": "tiktoken is not installed"},
+        )
+        return None
+    try:
+        encoding = tiktoken.get_encoding(name)
+    except Exception as exc:  # noqa: BLE001 - missing/unreachable encoding files
+        logger.warning(
+            "tokenizer.encoding_unavailable",
+            extra={"encoding": name, "error": str(exc)},
+        )
+        return None
+    return lambda text: len(encoding.encode(text, disallowed_special=()))
+
+
+class TokenCounter:
+    """Count tokens of texts with an LRU memo keyed by the text."""
+
+    def __init__(self, encoding: str, cache_size: int = 65536) -> None:
+        counter = _load_encoding(encoding)
+        if counter is None:
+            self.name = ESTIMATOR_NAME
+            counter = _estimate
+        else:
+            self.name = encoding
+        self._count = lru_cache(maxsize=max(int(cache_size), 0))(counter)
+
+    def count(self, text: str) -> int:
+        """Return the number of model tokens in *text*."""
+        return int(self._count(text))
+
+
+def _estimate(text: str) -> int:
+    """Approximate BPE token count of *text* without an encoding."""
+    by_length = math.ceil(len(text) / _CHARS_PER_TOKEN)
+    return max(by_length, get_analyzer().count(text))
+
+
+@lru_cache(maxsize=1)
+def get_token_counter() -> TokenCounter:
+    """Return the process-wide token counter."""
+    settings = get_settings()
+    return TokenCounter(settings.context_tokenizer, settings.analyzer_cache_size)
+
+
+__all__ = ["ESTIMATOR_NAME", "TokenCounter", "get_token_counter"]
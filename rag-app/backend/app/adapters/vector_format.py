@@ -0,0 +1,122 @@
+"""Binary, memory-mappable on-disk format for dense vector indexes.
+
+Layout (little endian)::
+
+    [64-byte header][float32 matrix, row-major][extra arrays][JSON trailer]
+
+The header carries the magic, format version, dimensionality, row count and
+the offsets of the matrix and trailer. The trailer holds the row id map,
+free-form metadata and the location of any extra named arrays, so index
+variants can persist auxiliary structures in the same file. Every array is
+64-byte aligned and opened with :class:`numpy.memmap`, letting worker
+processes share pages through the OS cache instead of parsing floats.
+The container itself is read and written by :mod:`.binary_format`.
+"""
+
+from __future__ import annotations
+
+import struct
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from .binary_format import (
+    aligned,
+    encode_trailer,
+    has_magic,
+    load_array,
+    load_arrays,
+    place_arrays,
+    read_container,
+    write_container,
+)
+
+MAGIC = b"FRAGVEC1"
+FORMAT_NAME = "fluidrag-f32"
+FORMAT_VERSION = 1
+
+_HEADER = struct.Struct("<8sIIQQQQ")
+_HEADER_BYTES = 64
+
+
+@dataclass(frozen=True)
+class VectorFile:
+    """Decoded view over a binary vector index file."""
+
+    dim: int
+    count: int
+    version: int
+    matrix: np.ndarray
+    ids: list[str] = field(default_factory=list)
+    arrays: dict[str, np.ndarray] = field(default_factory=dict)
+    meta: dict[str, Any] = field(default_factory=dict)
+
+
+def is_vector_file(path: str | Path) -> bool:
+    """Return True when *path* starts with the binary index magic."""
+
+    return has_magic(path, MAGIC)
+
+
+def write_vector_file(
+    path: str | Path,
+    matrix: np.ndarray,
+    ids: list[str] | None = None,
+    arrays: dict[str, np.ndarray] | None = None,
+    meta: dict[str, Any] | None = None,
+) -> None:
+    """Atomically write *matrix* (and optional extras) to *path*."""
+
+    rows = np.ascontiguousarray(matrix, dtype=np.float32)
+    if rows.ndim != 2:
+        raise ValueError("vector matrix must be two-dimensional")
+    count, dim = rows.shape
+    if ids is not None and len(ids) != count:
+        raise ValueError("id map length must match vector count")
+
+    layout, placed, end = place_arrays(arrays or {}, _HEADER_BYTES + rows.nbytes)
+    trailer = encode_trailer(
+        {"ids": list(ids or []), "arrays": layout, "meta": dict(meta or {})}
+    )
+    trailer_offset = aligned(end)
+    header = _HEADER.pack(
+        MAGIC, FORMAT_VERSION, dim, count, _HEADER_BYTES, trailer_offset, len(trailer)
+    )
+    write_container(
+        Path(path),
+        header.ljust(_HEADER_BYTES, b"\0"),
+        [(_HEADER_BYTES, rows), *placed],
+        trailer_offset,
+        trailer,
+    )
+
+
+def read_vector_file(path: str | Path, mmap: bool = True) -> VectorFile:
+    """Open a binary index; arrays are read-only memory maps when *mmap*."""
+
+    source = Path(path)
+    fields, trailer = read_container(
+        source, _HEADER, MAGIC, FORMAT_VERSION, "vector index"
+    )
+    _, version, dim, count, data_offset, _, _ = fields
+    return VectorFile(
+        dim=dim,
+        count=count,
+        version=version,
+        matrix=load_array(source, data_offset, np.float32, (count, dim), mmap),
+        ids=[str(value) for value in trailer.get("ids") or []],
+        arrays=load_arrays(source, trailer.get("arrays") or {}, mmap),
+        meta=dict(trailer.get("meta") or {}),
+    )
+
+
+__all__ = [
+    "FORMAT_NAME",
+    "FORMAT_VERSION",
+    "VectorFile",
+    "is_vector_file",
+    "read_vector_file",
+    "write_vector_file",
+]
@@ -2,22 +2,13 @@
 
 from __future__ import annotations
 
-import json
-import math
 from abc import ABC, abstractmethod
-from collections.abc import Sequence
-from pathlib import Path
 from typing import Any
 
-from ..config import get_settings
-from ..util.logging import get_logger
-
-logger = get_logger(__name__)
-
-
-def _tokenize(text: str) -> list[str]:
-    """Lowercase whitespace tokenizer used for sparse retrieval."""
-    return [token for token in text.lower().split() if token]
+from .dense import FaissIndex
+from .qdrant import QdrantIndex
+from .query_cache import get_query_cache, vector_digest
+from .sparse import BM25Index, CorpusStats
 
 
 class EmbeddingModel(ABC):
@@ -33,160 +24,84 @@ class EmbeddingModel(ABC):
         """Return embedding dimensionality."""
 
 
-class BM25Index:
-    """Sparse BM25 index over chunks."""
-
-    def __init__(self) -> None:
-        """Init BM25 index."""
-        self._doc_freqs: dict[str, int] = {}
-        self._documents: list[list[str]] = []
-        self._doc_lengths: list[int] = []
-        self._avgdl: float = 0.0
-        self._k1 = 1.5
-        self._b = 0.75
-
-    def add(self, docs: list[str]) -> None:
-        """Add docs."""
-        for doc in docs:
-            tokens = _tokenize(doc)
-            self._documents.append(tokens)
-            self._doc_lengths.append(len(tokens))
-            for token in set(tokens):
-                self._doc_freqs[token] = self._doc_freqs.get(token, 0) + 1
-        total_len = sum(self._doc_lengths) or 1
-        self._avgdl = total_len / max(len(self._documents), 1)
-        logger.debug(
-            "bm25.add", extra={"docs": len(docs), "total_docs": len(self._documents)}
-        )
+def _fuse(
+    sparse_scores: dict[int, float],
+    dense_scores: dict[int, float],
+    alpha: float,
+    k: int,
+) -> list[dict[str, Any]]:
+    combined: dict[int, dict[str, float]] = {}
+    for idx in set(sparse_scores) | set(dense_scores):
+        combined[idx] = {
+            "sparse": sparse_scores.get(idx, 0.0),
+            "dense": dense_scores.get(idx, 0.0),
+        }
+    fused: list[tuple[int, float, dict[str, float]]] = []
+    for idx, parts in combined.items():
+        score = alpha * parts["dense"] + (1 - alpha) * parts["sparse"]
+        fused.append((idx, score, parts))
+    fused.sort(key=lambda item: item[1], reverse=True)
+    top = fused[:k]
+    return [
+        {"id": idx, "score": score, "dense": parts["dense"], "sparse": parts["sparse"]}
+        for idx, score, parts in top
+    ]
 
-    def _idf(self, term: str) -> float:
-        df = self._doc_freqs.get(term, 0)
-        if df == 0:
-            return 0.0
-        n = len(self._documents)
-        return math.log(1 + (n - df + 0.5) / (df + 0.5))
-
-    def search(self, query: str, k: int = 20) -> list[tuple[int, float]]:
-        """Search top-k."""
-        if not self._documents:
-            return []
-        query_tokens = _tokenize(query)
-        scores: list[tuple[int, float]] = []
-        for idx, doc_tokens in enumerate(self._documents):
-            score = 0.0
-            freq: dict[str, int] = {}
-            for token in doc_tokens:
-                freq[token] = freq.get(token, 0) + 1
-            for token in query_tokens:
-                if token not in freq:
-                    continue
-                tf = freq[token]
-                numerator = tf * (self._k1 + 1)
-                denominator = tf + self._k1 * (
-                    1
-                    - self._b
-                    + self._b * (self._doc_lengths[idx] / (self._avgdl or 1))
-                )
-                score += self._idf(token) * (numerator / (denominator or 1))
-            scores.append((idx, score))
-        scores.sort(key=lambda item: item[1], reverse=True)
-        return scores[:k]
-
-
-class FaissIndex:
-    """Local FAISS dense vector index."""
-
-    def __init__(self, dim: int, index_path: str | None = None) -> None:
-        """Create or load index."""
-        self._dim = dim
-        self._vectors: list[list[float]] = []
-        self._path = Path(index_path) if index_path else None
-        if self._path and self._path.exists():
-            try:
-                payload = json.loads(self._path.read_text(encoding="utf-8"))
-                self._vectors = [
-                    [float(value) for value in vector]
-                    for vector in payload.get("vectors", [])
-                ]
-            except Exception as exc:  # noqa: BLE001
-                logger.warning("faiss.load_failed", extra={"error": str(exc)})
-                self._vectors = []
-
-    def _validate(self, vector: Sequence[float]) -> None:
-        if len(vector) != self._dim:
-            raise ValueError(f"vector dimensionality {len(vector)} != {self._dim}")
-
-    def add(self, vectors: list[list[float]]) -> None:
-        """Add vectors."""
-        for vector in vectors:
-            self._validate(vector)
-            self._vectors.append([float(v) for v in vector])
-        logger.debug(
-            "faiss.add", extra={"count": len(vectors), "total": len(self._vectors)}
-        )
 
-    def _cosine(self, a: Sequence[float], b: Sequence[float]) -> float:
-        dot = sum(x * y for x, y in zip(a, b, strict=False))
-        norm_a = math.sqrt(sum(x * x for x in a)) or 1.0
-        norm_b = math.sqrt(sum(y * y for y in b)) or 1.0
-        return dot / (norm_a * norm_b)
-
-    def search(self, query_vec: list[float], k: int = 20) -> list[tuple[int, float]]:
-        """Search top-k."""
-        self._validate(query_vec)
-        scored = [
-            (idx, self._cosine(query_vec, vector))
-            for idx, vector in enumerate(self._vectors)
-        ]
-        scored.sort(key=lambda item: item[1], reverse=True)
-        return scored[:k]
-
-    def save(self) -> None:
-        """Persist index."""
-        if not self._path:
-            return
-        data = {"vectors": self._vectors, "dim": self._dim}
-        self._path.write_text(json.dumps(data), encoding="utf-8")
-
-
-class QdrantIndex:
-    """Qdrant remote dense vector index."""
-
-    def __init__(self, collection: str) -> None:
-        """Init client/collection."""
-        self._collection = collection
-        self._vectors: list[list[float]] = []
-        self._payloads: list[dict[str, Any]] = []
-        if get_settings().offline is False:
-            logger.warning(
-                "qdrant.offline_stub",
-                extra={"collection": collection, "mode": "offline"},
-            )
+def _dense_scores(
+    dense: FaissIndex | QdrantIndex, query_vec: list[float], k: int
+) -> dict[int, float]:
+    if isinstance(dense, FaissIndex):
+        return dict(dense.search(query_vec, k=k))
+    return {
+        int(item.get("id", 0)): float(item.get("score", 0.0))
+        for item in dense.search(query_vec, k=k)
+    }
 
-    def add(
-        self, vectors: list[list[float]], payloads: list[dict[str, Any]] | None
-    ) -> None:
-        """Add vectors."""
-        self._vectors.extend([list(map(float, vector)) for vector in vectors])
-        payloads = payloads or [{} for _ in vectors]
-        if len(payloads) != len(vectors):
-            raise ValueError("payload count must match vectors")
-        self._payloads.extend(payloads)
-
-    def search(self, query_vec: list[float], k: int = 20) -> list[dict[str, Any]]:
-        """Search."""
-        faiss = FaissIndex(len(query_vec))
-        faiss.add(self._vectors)
-        results = faiss.search(query_vec, k=k)
-        response: list[dict[str, Any]] = []
-        for idx, score in results:
-            payload: dict[str, Any]
-            if idx < len(self._payloads):
-                payload = self._payloads[idx]
-            else:
-                payload = {}
-            response.append({"id": idx, "score": score, "payload": payload})
-        return response
+
+def _cache_key(
+    bm25: BM25Index | None,
+    dense: FaissIndex | QdrantIndex | None,
+    query: str,
+    query_vec: list[float] | None,
+    alpha: float,
+    k: int,
+    sparse_stats: CorpusStats | None,
+) -> tuple[Any, ...] | None:
+    """Key for the result cache; None when the result must not be cached."""
+    if not get_query_cache().enabled:
+        return None
+    dense_version = dense.version if dense is not None else None
+    if dense is not None and dense_version is None:
+        # Remote collections can change without this process noticing.
+        return None
+    stats_key = None
+    if sparse_stats is not None:
+        stats_key = (
+            sparse_stats.docs,
+            sparse_stats.total_length,
+            tuple(sorted(sparse_stats.df.items())),
+        )
+    # Equal content searched with different parameters (e.g. ``nprobe``)
+    # can rank differently, so the dense index's settings are part of the key.
+    dense_kind = (
+        getattr(dense, "index_type", None),
+        tuple(sorted(getattr(dense, "params", {}).items())),
+    )
+    return (
+        query,
+        vector_digest(query_vec),
+        float(alpha),
+        int(k),
+        bm25.version if bm25 is not None else None,
+        dense_version,
+        dense_kind,
+        stats_key,
+    )
+
+
+def _copy_hits(hits: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    return [dict(hit) for hit in hits]
 
 
 def hybrid_search(
@@ -196,41 +111,89 @@ def hybrid_search(
     query_vec: list[float] | None,
     alpha: float = 0.5,
     k: int = 20,
+    sparse_stats: CorpusStats | None = None,
 ) -> list[dict[str, Any]]:
-    """Fuse sparse+dense scores"""
+    """Fuse sparse+dense scores; *sparse_stats* scores BM25 corpus-wide.
+
+    Results are served from the process-wide :class:`QueryCache` while both
+    indexes keep the version they had when the entry was stored.
+    """
+    cache = get_query_cache()
+    key = _cache_key(bm25, dense, query, query_vec, alpha, k, sparse_stats)
+    if key is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            return _copy_hits(cached)
+
     sparse_scores: dict[int, float] = {}
     if bm25 is not None:
-        for idx, score in bm25.search(query, k=k):
+        for idx, score in bm25.search(query, k=k, stats=sparse_stats):
             if score > 0:
                 sparse_scores[idx] = score
 
     dense_scores: dict[int, float] = {}
     if dense is not None and query_vec is not None:
-        if isinstance(dense, FaissIndex):
-            faiss_results = dense.search(query_vec, k=k)
-            for idx, score in faiss_results:
-                dense_scores[idx] = score
-        else:
-            qdrant_results = dense.search(query_vec, k=k)
-            for item in qdrant_results:
-                dense_scores[int(item.get("id", 0))] = float(item.get("score", 0.0))
+        dense_scores = _dense_scores(dense, query_vec, k)
+    fused = _fuse(sparse_scores, dense_scores, alpha, k)
+    if key is not None:
+        cache.put(key, _copy_hits(fused))
+    return fused
 
-    combined: dict[int, dict[str, float]] = {}
-    for idx in set(sparse_scores) | set(dense_scores):
-        combined[idx] = {
-            "sparse": sparse_scores.get(idx, 0.0),
-            "dense": dense_scores.get(idx, 0.0),
-        }
-    fused: list[tuple[int, float, dict[str, float]]] = []
-    for idx, parts in combined.items():
-        score = alpha * parts["dense"] + (1 - alpha) * parts["sparse"]
-        fused.append((idx, score, parts))
-    fused.sort(key=lambda item: item[1], reverse=True)
-    top = fused[:k]
-    return [
-        {"id": idx, "score": score, "dense": parts["dense"], "sparse": parts["sparse"]}
-        for idx, score, parts in top
+
+def hybrid_search_batch(
+    bm25: BM25Index | None,
+    dense: FaissIndex | QdrantIndex | None,
+    queries: list[str],
+    query_vecs: list[list[float]] | None,
+    alpha: float = 0.5,
+    k: int = 20,
+    sparse_stats: CorpusStats | None = None,
+) -> list[list[dict[str, Any]]]:
+    """Run :func:`hybrid_search` for many queries with batched index scans.
+
+    Cached queries are answered from the result cache; only the rest are
+    scanned, together.
+    """
+    if query_vecs is not None and len(query_vecs) != len(queries):
+        raise ValueError("query vector count must match queries")
+    vecs: list[list[float] | None] = [None] * len(queries)
+    if query_vecs is not None:
+        vecs = list(query_vecs)
+    cache = get_query_cache()
+    keys = [
+        _cache_key(bm25, dense, query, vec, alpha, k, sparse_stats)
+        for query, vec in zip(queries, vecs, strict=True)
+    ]
+    results: list[list[dict[str, Any]] | None] = [
+        cache.get(key) if key is not None else None for key in keys
     ]
+    missing = [i for i, hits in enumerate(results) if hits is None]
+    if missing:
+        pending = [queries[i] for i in missing]
+        sparse_batch: list[list[tuple[int, float]]] = [[] for _ in pending]
+        if bm25 is not None:
+            sparse_batch = bm25.search_batch(pending, k=k, stats=sparse_stats)
+
+        dense_batch: list[dict[int, float]] = [{} for _ in pending]
+        if dense is not None and query_vecs is not None:
+            pending_vecs = [query_vecs[i] for i in missing]
+            if isinstance(dense, FaissIndex):
+                dense_batch = [
+                    dict(hits) for hits in dense.search_batch(pending_vecs, k=k)
+                ]
+            else:
+                dense_batch = [_dense_scores(dense, vec, k) for vec in pending_vecs]
+        for i, sparse, dense_scores in zip(
+            missing, sparse_batch, dense_batch, strict=True
+        ):
+            fused = _fuse(
+                {idx: s for idx, s in sparse if s > 0}, dense_scores, alpha, k
+            )
+            results[i] = fused
+            key = keys[i]
+            if key is not None:
+                cache.put(key, _copy_hits(fused))
+    return [_copy_hits(hits or []) for hits in results]
 
 
 __all__ = [
@@ -239,4 +202,5 @@ __all__ = [
     "FaissIndex",
     "QdrantIndex",
     "hybrid_search",
+    "hybrid_search_batch",
 ]
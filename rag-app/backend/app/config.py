@@ -11,13 +11,15 @@ from pydantic import AliasChoices, Field
 from pydantic.fields import FieldInfo
 from pydantic_settings import BaseSettings, PydanticBaseSettingsSource, SettingsConfigDict
 
+from .config_sections import LLMTransportSettings, RetrievalSettings
+
 try:  # pragma: no cover - Python <3.11 fallback
     import tomllib  # type: ignore[attr-defined]
 except ModuleNotFoundError:  # pragma: no cover
     import tomli as tomllib  # type: ignore[import-not-found]
 
 
-class Settings(BaseSettings):
+class Settings(RetrievalSettings, LLMTransportSettings, BaseSettings):
     """Application settings resolved from environment."""
 
     model_config = SettingsConfigDict(
@@ -278,14 +280,6 @@ class Settings(BaseSettings):
             "openrouter_stream_idle_timeout_seconds",
         ),
     )
-    vector_batch_size: int = Field(
-        default=128,
-        ge=1,
-        validation_alias=AliasChoices(
-            "VECTOR_BATCH_SIZE",
-            "vector_batch_size",
-        ),
-    )
     llm_batch_size: int = Field(
         default=4,
         ge=1,
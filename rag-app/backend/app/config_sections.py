@@ -0,0 +1,203 @@
+"""Settings groups mixed into :class:`~backend.app.config.Settings`.
+
+Kept apart from ``config.py`` so each group stays readable; every field is
+still resolved through the main settings class and its sources.
+"""
+
+from __future__ import annotations
+
+from pydantic import AliasChoices, Field
+from pydantic_settings import BaseSettings
+
+
+class RetrievalSettings(BaseSettings):
+    """Vector indexing and retrieval knobs."""
+
+    vector_batch_size: int = Field(
+        default=128,
+        ge=1,
+        validation_alias=AliasChoices("VECTOR_BATCH_SIZE", "vector_batch_size"),
+    )
+    vector_index_type: str = Field(
+        default="flat",
+        pattern="^(flat|ivf|sq8|pq)$",
+        validation_alias=AliasChoices("VECTOR_INDEX_TYPE", "vector_index_type"),
+    )
+    vector_ivf_nlist: int = Field(
+        default=64,
+        ge=1,
+        validation_alias=AliasChoices("VECTOR_IVF_NLIST", "vector_ivf_nlist"),
+    )
+    vector_ivf_nprobe: int = Field(
+        default=8,
+        ge=1,
+        validation_alias=AliasChoices("VECTOR_IVF_NPROBE", "vector_ivf_nprobe"),
+    )
+    vector_pq_subvectors: int = Field(
+        default=8,
+        ge=1,
+        validation_alias=AliasChoices("VECTOR_PQ_SUBVECTORS", "vector_pq_subvectors"),
+    )
+    vector_rescore_factor: int = Field(
+        default=4,
+        ge=0,
+        validation_alias=AliasChoices("VECTOR_RESCORE_FACTOR", "vector_rescore_factor"),
+    )
+    bm25_compaction_threshold: float = Field(
+        default=0.25,
+        gt=0.0,
+        le=1.0,
+        validation_alias=AliasChoices(
+            "BM25_COMPACTION_THRESHOLD", "bm25_compaction_threshold"
+        ),
+    )
+    qdrant_url: str | None = Field(
+        default=None,
+        validation_alias=AliasChoices("QDRANT_URL", "qdrant_url", "qdrant.url"),
+    )
+    qdrant_timeout_seconds: float = Field(
+        default=10.0,
+        gt=0.0,
+        validation_alias=AliasChoices(
+            "QDRANT_TIMEOUT_SECONDS", "qdrant_timeout_seconds"
+        ),
+    )
+    analyzer_cache_size: int = Field(
+        default=65536,
+        ge=0,
+        validation_alias=AliasChoices("ANALYZER_CACHE_SIZE", "analyzer_cache_size"),
+    )
+    analyzer_max_terms: int = Field(
+        default=1_000_000,
+        ge=1,
+        validation_alias=AliasChoices("ANALYZER_MAX_TERMS", "analyzer_max_terms"),
+    )
+    query_cache_size: int = Field(
+        default=1024,
+        ge=0,
+        validation_alias=AliasChoices("QUERY_CACHE_SIZE", "query_cache_size"),
+    )
+    query_cache_ttl_seconds: float = Field(
+        default=300.0,
+        gt=0.0,
+        validation_alias=AliasChoices(
+            "QUERY_CACHE_TTL_SECONDS", "query_cache_ttl_seconds"
+        ),
+    )
+    embedding_cache_size: int = Field(
+        default=50000,
+        ge=0,
+        validation_alias=AliasChoices("EMBEDDING_CACHE_SIZE", "embedding_cache_size"),
+    )
+    embedding_cache_path: str | None = Field(
+        default=None,
+        validation_alias=AliasChoices("EMBEDDING_CACHE_PATH", "embedding_cache_path"),
+    )
+    completion_cache_size: int = Field(
+        default=10000,
+        ge=0,
+        validation_alias=AliasChoices("COMPLETION_CACHE_SIZE", "completion_cache_size"),
+    )
+    completion_cache_ttl_seconds: float = Field(
+        default=86400.0,
+        gt=0.0,
+        validation_alias=AliasChoices(
+            "COMPLETION_CACHE_TTL_SECONDS", "completion_cache_ttl_seconds"
+        ),
+    )
+    completion_cache_path: str | None = Field(
+        default=None,
+        validation_alias=AliasChoices("COMPLETION_CACHE_PATH", "completion_cache_path"),
+    )
+    context_packing: str = Field(
+        default="knapsack",
+        pattern="^(greedy|knapsack)$",
+        validation_alias=AliasChoices("CONTEXT_PACKING", "context_packing"),
+    )
+    context_tokenizer: str = Field(
+        default="cl100k_base",
+        validation_alias=AliasChoices("CONTEXT_TOKENIZER", "context_tokenizer"),
+    )
+    corpus_search_workers: int = Field(
+        default=4,
+        ge=1,
+        validation_alias=AliasChoices("CORPUS_SEARCH_WORKERS", "corpus_search_workers"),
+    )
+
+
+class LLMTransportSettings(BaseSettings):
+    """Models, connection pooling and rate limits for LLM provider calls."""
+
+    llm_chat_model: str = Field(
+        default="openai/gpt-4o-mini",
+        validation_alias=AliasChoices("LLM_CHAT_MODEL", "llm_chat_model"),
+    )
+    llm_embed_model: str = Field(
+        default="openai/text-embedding-3-small",
+        validation_alias=AliasChoices("LLM_EMBED_MODEL", "llm_embed_model"),
+    )
+    llm_max_concurrency: int = Field(
+        default=64,
+        ge=1,
+        validation_alias=AliasChoices("LLM_MAX_CONCURRENCY", "llm_max_concurrency"),
+    )
+
+    openrouter_http2: bool = Field(
+        default=True,
+        validation_alias=AliasChoices("OPENROUTER_HTTP2", "openrouter_http2"),
+    )
+    openrouter_max_connections: int = Field(
+        default=20,
+        ge=1,
+        validation_alias=AliasChoices(
+            "OPENROUTER_MAX_CONNECTIONS", "openrouter_max_connections"
+        ),
+    )
+    openrouter_max_keepalive_connections: int = Field(
+        default=10,
+        ge=0,
+        validation_alias=AliasChoices(
+            "OPENROUTER_MAX_KEEPALIVE_CONNECTIONS",
+            "openrouter_max_keepalive_connections",
+        ),
+    )
+    openrouter_keepalive_expiry_seconds: float = Field(
+        default=30.0,
+        ge=0.0,
+        validation_alias=AliasChoices(
+            "OPENROUTER_KEEPALIVE_EXPIRY_SECONDS",
+            "openrouter_keepalive_expiry_seconds",
+        ),
+    )
+
+    openrouter_requests_per_minute: float = Field(
+        default=120.0,
+        ge=0.0,
+        validation_alias=AliasChoices(
+            "OPENROUTER_REQUESTS_PER_MINUTE", "openrouter_requests_per_minute"
+        ),
+    )
+    openrouter_tokens_per_minute: float = Field(
+        default=200_000.0,
+        ge=0.0,
+        validation_alias=AliasChoices(
+            "OPENROUTER_TOKENS_PER_MINUTE", "openrouter_tokens_per_minute"
+        ),
+    )
+    openrouter_retry_budget_ratio: float = Field(
+        default=0.2,
+        ge=0.0,
+        validation_alias=AliasChoices(
+            "OPENROUTER_RETRY_BUDGET_RATIO", "openrouter_retry_budget_ratio"
+        ),
+    )
+    openrouter_retry_budget_min: float = Field(
+        default=10.0,
+        ge=0.0,
+        validation_alias=AliasChoices(
+            "OPENROUTER_RETRY_BUDGET_MIN", "openrouter_retry_budget_min"
+        ),
+    )
+
+
+__all__ = ["LLMTransportSettings", "RetrievalSettings"]
@@ -48,6 +48,8 @@ class PassManifest(BaseModel):
 
     doc_id: str
     passes: dict[str, str] = Field(default_factory=dict)
+    failures: dict[str, str] = Field(default_factory=dict)
+    fingerprints: dict[str, str] = Field(default_factory=dict)
 
 
 __all__ = [
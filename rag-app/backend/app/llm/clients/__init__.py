@@ -9,13 +9,22 @@ from .openrouter import (
     chat_sync,
     embed_sync,
 )
+from .openrouter_async import chat_async, embed_async
+from .ratelimit import RateLimiter, get_rate_limiter
+from .transport import HttpClientPool, get_http_pool
 
 __all__ = [
+    "HttpClientPool",
     "OpenRouterError",
     "OpenRouterAuthError",
     "OpenRouterHTTPError",
     "OpenRouterStreamError",
+    "RateLimiter",
+    "chat_async",
     "chat_sync",
     "chat_stream_async",
+    "embed_async",
     "embed_sync",
+    "get_http_pool",
+    "get_rate_limiter",
 ]
@@ -12,10 +12,14 @@ from typing import Any
 
 import httpx
 
+from ...adapters.completion_cache import get_completion_cache
+from ...adapters.embedding_cache import embed_cached
 from ...config import get_settings
 from ...util.logging import get_logger, log_span
 from ..utils import log_prompt, windows_curl
 from ..utils.envsafe import masked_headers, openrouter_headers
+from .ratelimit import estimate_tokens, get_rate_limiter
+from .transport import get_http_pool
 
 logger = get_logger(__name__)
 
@@ -89,6 +93,46 @@ def _should_retry(status_code: int) -> bool:
     return status_code in _RETRY_STATUS or 500 <= status_code < 600
 
 
+def _raise_for_status(response: httpx.Response) -> None:
+    """Map an error status to the client's exception types.
+
+    Every :class:`OpenRouterHTTPError` is retried by the callers' backoff
+    loops; :class:`OpenRouterAuthError` is not.
+    """
+
+    if response.status_code == 401:
+        raise OpenRouterAuthError(_parse_error(response))
+    if _should_retry(response.status_code):
+        raise OpenRouterHTTPError(
+            f"Retryable status {response.status_code}: {_parse_error(response)}"
+        )
+    if response.status_code >= 400:
+        raise OpenRouterHTTPError(
+            f"OpenRouter error {response.status_code}: {_parse_error(response)}"
+        )
+
+
+def _parse_chat(response: httpx.Response) -> dict[str, Any]:
+    data = response.json()
+    if not isinstance(data, dict):
+        raise OpenRouterHTTPError("Unexpected OpenRouter response payload.")
+    return data
+
+
+def _parse_embeddings(response: httpx.Response) -> list[list[float]]:
+    body = response.json()
+    if not isinstance(body, dict):
+        raise OpenRouterHTTPError("Unexpected embeddings response payload.")
+    embeddings: list[list[float]] = []
+    for row in body.get("data", []):
+        if not isinstance(row, Mapping):
+            continue
+        embedding = row.get("embedding")
+        if isinstance(embedding, list):
+            embeddings.append([float(val) for val in embedding])
+    return embeddings
+
+
 def _decorate_headers(headers: dict[str, str]) -> dict[str, str]:
     merged = {"Accept": "application/json"}
     merged.update(headers)
@@ -131,9 +175,38 @@ def chat_sync(
     timeout: float | None = None,
     retries: int | None = None,
 ) -> dict[str, Any]:
-    """Sync chat with retries and masked logging."""
+    """Sync chat with retries and masked logging, behind the completion cache."""
 
     _ensure_online()
+
+    def _fetch() -> dict[str, Any]:
+        return _post_chat(
+            model, messages, temperature, top_p, max_tokens, extra, timeout, retries
+        )
+
+    return get_completion_cache().complete(
+        model,
+        messages,
+        {
+            "temperature": temperature,
+            "top_p": top_p,
+            "max_tokens": max_tokens,
+            "extra": extra,
+        },
+        _fetch,
+    )
+
+
+def _post_chat(
+    model: str,
+    messages: list[dict[str, str]],
+    temperature: float,
+    top_p: float | None,
+    max_tokens: int | None,
+    extra: dict[str, Any] | None,
+    timeout: float | None,
+    retries: int | None,
+) -> dict[str, Any]:
     settings = get_settings()
     effective_timeout = (
         timeout if timeout is not None else settings.openrouter_timeout_seconds
@@ -149,6 +222,8 @@ def chat_sync(
     except RuntimeError as exc:
         raise OpenRouterHTTPError(str(exc)) from exc
     url = f"{_base_url()}/chat/completions"
+    limiter = get_rate_limiter()
+    tokens = estimate_tokens(payload)
     last_error: Exception | None = None
 
     with log_span(
@@ -160,8 +235,12 @@ def chat_sync(
             "timeout": effective_timeout,
         },
     ):
-        for delay in _backoff(effective_retries, backoff_base, backoff_cap):
+        for attempt, delay in enumerate(
+            _backoff(effective_retries, backoff_base, backoff_cap)
+        ):
             _sleep(delay)
+            if not limiter.acquire(tokens, retry=attempt > 0):
+                break
             try:
                 logger.info(
                     "openrouter.chat_sync.request",
@@ -170,23 +249,16 @@ def chat_sync(
                         "attempt_delay": round(delay, 3),
                     },
                 )
-                with httpx.Client(timeout=effective_timeout) as client:
-                    response = client.post(url, headers=headers, json=payload)
-                if response.status_code == 401:
-                    raise OpenRouterAuthError(_parse_error(response))
-                if _should_retry(response.status_code):
-                    last_error = OpenRouterHTTPError(
-                        f"Retryable status {response.status_code}: {_parse_error(response)}"
-                    )
-                    continue
-                if response.status_code >= 400:
-                    raise OpenRouterHTTPError(
-                        f"OpenRouter error {response.status_code}: {_parse_error(response)}"
-                    )
-                data = response.json()
-                if not isinstance(data, dict):
-                    raise OpenRouterHTTPError("Unexpected OpenRouter response payload.")
-                return data
+                response = (
+                    get_http_pool()
+                    .sync_client()
+                    .post(url, headers=headers, json=payload, timeout=effective_timeout)
+                )
+                limiter.observe(response.status_code, response.headers)
+                _raise_for_status(response)
+                result = _parse_chat(response)
+                limiter.settle(tokens, result.get("usage"))
+                return result
             except OpenRouterAuthError:
                 raise
             except httpx.HTTPError as exc:
@@ -271,22 +343,35 @@ async def chat_stream_async(
         if idle_timeout is not None
         else settings.openrouter_stream_idle_timeout_seconds
     )
+    limiter = get_rate_limiter()
+    tokens = estimate_tokens(payload)
 
-    for delay in _backoff(
-        effective_retries,
-        settings.openrouter_backoff_base_seconds,
-        settings.openrouter_backoff_cap_seconds,
+    for attempt, delay in enumerate(
+        _backoff(
+            effective_retries,
+            settings.openrouter_backoff_base_seconds,
+            settings.openrouter_backoff_cap_seconds,
+        )
     ):
         await _async_sleep(delay)
+        if not await limiter.acquire_async(tokens, retry=attempt > 0):
+            break
         try:
             logger.info(
                 "openrouter.chat_stream.start",
                 extra=log_prompt("chat_stream", payload, headers),
             )
-            async with httpx.AsyncClient(timeout=effective_timeout) as client:
+            pool = get_http_pool()
+            async with pool.slot():
+                client = pool.async_client()
                 async with client.stream(
-                    "POST", url, headers=headers, json=payload
+                    "POST",
+                    url,
+                    headers=headers,
+                    json=payload,
+                    timeout=effective_timeout,
                 ) as response:
+                    limiter.observe(response.status_code, response.headers)
                     if response.status_code == 401:
                         raise OpenRouterAuthError(_parse_error(response))
                     if _should_retry(response.status_code):
@@ -326,10 +411,27 @@ def embed_sync(
     timeout: float | None = None,
     retries: int | None = None,
 ) -> list[list[float]]:
-    """Sync embeddings with retries."""
+    """Sync embeddings with retries, sending only inputs missing from the cache."""
 
     _ensure_online()
     settings = get_settings()
+
+    def _embed_batch(batch: list[str]) -> list[list[float]]:
+        return _post_embeddings(model, batch, timeout=timeout, retries=retries)
+
+    try:
+        return embed_cached(model, inputs, _embed_batch, settings.vector_batch_size)
+    except ValueError as exc:
+        raise OpenRouterHTTPError(str(exc)) from exc
+
+
+def _post_embeddings(
+    model: str,
+    inputs: list[str],
+    timeout: float | None,
+    retries: int | None,
+) -> list[list[float]]:
+    settings = get_settings()
     effective_timeout = (
         timeout if timeout is not None else settings.openrouter_timeout_seconds
     )
@@ -342,6 +444,8 @@ def embed_sync(
         raise OpenRouterHTTPError(str(exc)) from exc
     url = f"{_base_url()}/embeddings"
     payload = {"model": model, "input": inputs}
+    limiter = get_rate_limiter()
+    tokens = estimate_tokens(payload)
     last_error: Exception | None = None
 
     with log_span(
@@ -349,38 +453,25 @@ def embed_sync(
         logger=logger,
         extra={"model": model, "count": len(inputs)},
     ):
-        for delay in _backoff(
-            effective_retries,
-            settings.openrouter_backoff_base_seconds,
-            settings.openrouter_backoff_cap_seconds,
+        for attempt, delay in enumerate(
+            _backoff(
+                effective_retries,
+                settings.openrouter_backoff_base_seconds,
+                settings.openrouter_backoff_cap_seconds,
+            )
         ):
             _sleep(delay)
+            if not limiter.acquire(tokens, retry=attempt > 0):
+                break
             try:
-                with httpx.Client(timeout=effective_timeout) as client:
-                    response = client.post(url, headers=headers, json=payload)
-                if response.status_code == 401:
-                    raise OpenRouterAuthError(_parse_error(response))
-                if _should_retry(response.status_code):
-                    last_error = OpenRouterHTTPError(
-                        f"Retryable status {response.status_code}: {_parse_error(response)}"
-                    )
-                    continue
-                if response.status_code >= 400:
-                    raise OpenRouterHTTPError(
-                        f"OpenRouter error {response.status_code}: {_parse_error(response)}"
-                    )
-                body = response.json()
-                if not isinstance(body, dict):
-                    raise OpenRouterHTTPError("Unexpected embeddings response payload.")
-                data = body.get("data", [])
-                embeddings: list[list[float]] = []
-                for row in data:
-                    if not isinstance(row, Mapping):
-                        continue
-                    embedding = row.get("embedding")
-                    if isinstance(embedding, list):
-                        embeddings.append([float(val) for val in embedding])
-                return embeddings
+                response = (
+                    get_http_pool()
+                    .sync_client()
+                    .post(url, headers=headers, json=payload, timeout=effective_timeout)
+                )
+                limiter.observe(response.status_code, response.headers)
+                _raise_for_status(response)
+                return _parse_embeddings(response)
             except OpenRouterAuthError:
                 raise
             except httpx.HTTPError as exc:
@@ -0,0 +1,178 @@
+"""Native async OpenRouter chat and embedding calls.
+
+Same caching, retry, backoff and error mapping as the sync calls in
+:mod:`.openrouter`, but awaiting the pooled async client instead of blocking
+a worker thread for the round trip. Every upstream attempt holds one of the
+pool's ``LLM_MAX_CONCURRENCY`` slots, so a single event loop can fan out
+hundreds of calls without overrunning the provider.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+from typing import Any, TypeVar
+
+import httpx
+
+from ...adapters.completion_cache import get_completion_cache
+from ...adapters.embedding_cache import embed_cached_async
+from ...config import get_settings
+from ...util.logging import get_logger, log_span
+from ..utils import log_prompt
+from ..utils.envsafe import openrouter_headers
+from . import openrouter as sync_client
+from .openrouter import OpenRouterAuthError, OpenRouterHTTPError
+from .ratelimit import estimate_tokens, get_rate_limiter
+from .transport import get_http_pool
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+
+async def chat_async(
+    model: str,
+    messages: list[dict[str, str]],
+    temperature: float = 0.0,
+    top_p: float | None = None,
+    max_tokens: int | None = None,
+    extra: dict[str, Any] | None = None,
+    timeout: float | None = None,
+    retries: int | None = None,
+) -> dict[str, Any]:
+    """Async chat with retries, behind the completion cache."""
+
+    sync_client._ensure_online()
+    payload = sync_client._compose_payload(
+        model, messages, temperature, top_p, max_tokens, extra
+    )
+
+    async def _fetch() -> dict[str, Any]:
+        return await _post(
+            "chat_async",
+            "/chat/completions",
+            payload,
+            sync_client._parse_chat,
+            timeout=timeout,
+            retries=retries,
+            extra={"model": model},
+        )
+
+    return await get_completion_cache().complete_async(
+        model,
+        messages,
+        {
+            "temperature": temperature,
+            "top_p": top_p,
+            "max_tokens": max_tokens,
+            "extra": extra,
+        },
+        _fetch,
+    )
+
+
+async def embed_async(
+    model: str,
+    inputs: list[str],
+    timeout: float | None = None,
+    retries: int | None = None,
+) -> list[list[float]]:
+    """Async embeddings; only cache misses are sent, batches concurrently."""
+
+    sync_client._ensure_online()
+    settings = get_settings()
+
+    async def _embed_batch(batch: list[str]) -> list[list[float]]:
+        return await _post(
+            "embed_async",
+            "/embeddings",
+            {"model": model, "input": batch},
+            sync_client._parse_embeddings,
+            timeout=timeout,
+            retries=retries,
+            extra={"model": model, "count": len(batch)},
+        )
+
+    try:
+        return await embed_cached_async(
+            model, inputs, _embed_batch, settings.vector_batch_size
+        )
+    except ValueError as exc:
+        raise OpenRouterHTTPError(str(exc)) from exc
+
+
+async def _post(
+    name: str,
+    path: str,
+    payload: dict[str, Any],
+    parse: Callable[[httpx.Response], T],
+    *,
+    timeout: float | None,
+    retries: int | None,
+    extra: dict[str, Any],
+) -> T:
+    settings = get_settings()
+    effective_timeout = (
+        timeout if timeout is not None else settings.openrouter_timeout_seconds
+    )
+    effective_retries = (
+        retries if retries is not None else settings.openrouter_max_retries
+    )
+    try:
+        headers = sync_client._decorate_headers(openrouter_headers())
+    except RuntimeError as exc:
+        raise OpenRouterHTTPError(str(exc)) from exc
+    url = f"{sync_client._base_url()}{path}"
+    pool = get_http_pool()
+    limiter = get_rate_limiter()
+    tokens = estimate_tokens(payload)
+    last_error: Exception | None = None
+
+    with log_span(
+        f"openrouter.{name}",
+        logger=logger,
+        extra={**extra, "retries": effective_retries, "timeout": effective_timeout},
+    ):
+        for attempt, delay in enumerate(
+            sync_client._backoff(
+                effective_retries,
+                settings.openrouter_backoff_base_seconds,
+                settings.openrouter_backoff_cap_seconds,
+            )
+        ):
+            await sync_client._async_sleep(delay)
+            if not await limiter.acquire_async(tokens, retry=attempt > 0):
+                break
+            try:
+                logger.info(
+                    f"openrouter.{name}.request",
+                    extra={
+                        **log_prompt(name, payload, headers),
+                        "attempt_delay": round(delay, 3),
+                    },
+                )
+                async with pool.slot():
+                    response = await pool.async_client().post(
+                        url, headers=headers, json=payload, timeout=effective_timeout
+                    )
+                limiter.observe(response.status_code, response.headers)
+                sync_client._raise_for_status(response)
+                result = parse(response)
+                if isinstance(result, dict):
+                    limiter.settle(tokens, result.get("usage"))
+                return result
+            except OpenRouterAuthError:
+                raise
+            except httpx.HTTPError as exc:
+                last_error = OpenRouterHTTPError(f"HTTP error: {exc}")
+            except OpenRouterHTTPError as exc:
+                last_error = exc
+    if last_error:
+        logger.error(
+            f"openrouter.{name}.failure", extra={**extra, "error": str(last_error)}
+        )
+        raise last_error
+    raise OpenRouterHTTPError(f"OpenRouter {name} failed without explicit error.")
+
+
+__all__ = ["chat_async", "embed_async"]
@@ -0,0 +1,302 @@
+"""Adaptive client-side rate limiting shared by all OpenRouter calls.
+
+Two token buckets gate every upstream attempt: one for requests per minute
+and one for estimated tokens per minute. Callers are never failed for
+exceeding them. A caller reserves capacity and sleeps until its reservation
+is due, so queued callers are served in arrival order. Responses adapt the
+limiter:
+
+* ``Retry-After`` pauses every caller until the given time.
+* ``x-ratelimit-remaining-*`` / ``x-ratelimit-reset-*`` (OpenAI style) and
+  ``X-RateLimit-Remaining`` / ``X-RateLimit-Reset`` (OpenRouter, epoch ms)
+  align the buckets with the provider's count and pause when it runs out.
+* A 429 halves the request rate, which recovers additively with each
+  successful response until it is back at the configured rate.
+
+Retries draw from a global budget. Each first attempt deposits
+``OPENROUTER_RETRY_BUDGET_RATIO`` of a retry, and at most
+``OPENROUTER_RETRY_BUDGET_MIN`` retries are banked. When the budget is empty
+a failing call gives up instead of retrying, so parallel workers cannot
+stampede a struggling provider.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import re
+import threading
+import time
+from collections.abc import Callable, Mapping
+from email.utils import parsedate_to_datetime
+from typing import Any
+
+from ...adapters.tokenizer import get_token_counter
+from ...config import get_settings
+from ...util.logging import get_logger
+from ...util.metrics import register_metrics
+
+logger = get_logger(__name__)
+
+_MAX_PAUSE_SECONDS = 300.0
+_MIN_RATE_SCALE = 0.1
+_RATE_RECOVERY = 0.05
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_UNIT_SECONDS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def _sleep(delay: float) -> None:
+    if delay > 0:
+        time.sleep(delay)
+
+
+async def _async_sleep(delay: float) -> None:
+    if delay > 0:
+        await asyncio.sleep(delay)
+
+
+def _number(value: str | None) -> float | None:
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _duration(value: str | None) -> float | None:
+    """Parse ``"1.5"``, ``"20ms"`` or ``"6m0s"`` into seconds."""
+    plain = _number(value)
+    if plain is not None or not value:
+        return plain
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _UNIT_SECONDS[unit] for amount, unit in parts)
+
+
+def _retry_after(value: str | None, now: float) -> float | None:
+    """Seconds to wait per a ``Retry-After`` of delta-seconds or HTTP-date."""
+    delay = _number(value)
+    if delay is not None or not value:
+        return delay
+    try:
+        return parsedate_to_datetime(value).timestamp() - now
+    except (TypeError, ValueError):
+        return None
+
+
+def estimate_tokens(payload: Mapping[str, Any]) -> int:
+    """Estimate the tokens a chat or embeddings request will consume."""
+    counter = get_token_counter()
+    texts: list[str] = [
+        str(message.get("content", ""))
+        for message in payload.get("messages") or []
+        if isinstance(message, Mapping)
+    ]
+    inputs = payload.get("input")
+    if isinstance(inputs, str):
+        texts.append(inputs)
+    elif isinstance(inputs, list):
+        texts.extend(str(item) for item in inputs)
+    return sum(counter.count(text) for text in texts) + int(
+        payload.get("max_tokens") or 0
+    )
+
+
+class TokenBucket:
+    """Refilling bucket whose balance may go negative to queue reservations."""
+
+    def __init__(self, per_minute: float, now: float) -> None:
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.level = self.capacity
+        self.stamp = now
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.stamp) * self.rate)
+        self.stamp = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        """Take *amount* and return the seconds until it is covered."""
+        if not self.enabled:
+            return 0.0
+        self._refill(now)
+        self.level -= min(amount, self.capacity)
+        return max(-self.level / self.rate, 0.0)
+
+    def align(self, remaining: float, now: float) -> None:
+        """Lower the balance to the provider's *remaining* count."""
+        if self.enabled:
+            self._refill(now)
+            self.level = min(self.level, remaining)
+
+    def refund(self, amount: float) -> None:
+        if self.enabled:
+            self.level = min(self.capacity, self.level + amount)
+
+
+class RateLimiter:
+    """Process-wide request/token buckets, provider pauses and retry budget."""
+
+    def __init__(
+        self,
+        clock: Callable[[], float] = time.monotonic,
+        wall: Callable[[], float] = time.time,
+    ) -> None:
+        self._clock = clock
+        self._wall = wall
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Drop all state; the next call re-reads the settings."""
+        with self._lock:
+            self._config: tuple[float, ...] | None = None
+            self._paused_until = 0.0
+            self._scale = 1.0
+            self.calls = self.retries = self.retries_denied = 0
+            self.throttled = self.waits = 0
+            self.waited_seconds = 0.0
+
+    def _configure(self, now: float) -> None:
+        settings = get_settings()
+        config = (
+            float(settings.openrouter_requests_per_minute),
+            float(settings.openrouter_tokens_per_minute),
+            float(settings.openrouter_retry_budget_ratio),
+            float(settings.openrouter_retry_budget_min),
+        )
+        if config == self._config:
+            return
+        self._config = config
+        self._rpm, tpm, self._budget_ratio, self._budget_cap = config
+        self.requests = TokenBucket(self._rpm, now)
+        self.tokens = TokenBucket(tpm, now)
+        self._budget = self._budget_cap
+        self._scale = 1.0
+
+    def _reserve(self, tokens: int, retry: bool) -> float | None:
+        with self._lock:
+            now = self._clock()
+            self._configure(now)
+            if retry:
+                if self._budget < 1.0:
+                    self.retries_denied += 1
+                    logger.warning(
+                        "rate_limiter.retry_budget_exhausted",
+                        extra={"budget": round(self._budget, 3)},
+                    )
+                    return None
+                self._budget -= 1.0
+                self.retries += 1
+            else:
+                self.calls += 1
+                self._budget = min(self._budget + self._budget_ratio, self._budget_cap)
+            wait = max(
+                self.requests.reserve(1.0, now),
+                self.tokens.reserve(float(tokens), now),
+                self._paused_until - now,
+                0.0,
+            )
+            if wait > 0:
+                self.waits += 1
+                self.waited_seconds += wait
+            return wait
+
+    def acquire(self, tokens: int, *, retry: bool = False) -> bool:
+        """Wait for capacity; return False when a retry is over budget."""
+        wait = self._reserve(tokens, retry)
+        if wait is None:
+            return False
+        if wait:
+            _sleep(wait)
+        return True
+
+    async def acquire_async(self, tokens: int, *, retry: bool = False) -> bool:
+        """Async :meth:`acquire`."""
+        wait = self._reserve(tokens, retry)
+        if wait is None:
+            return False
+        if wait:
+            await _async_sleep(wait)
+        return True
+
+    def observe(self, status_code: int, headers: Mapping[str, str]) -> None:
+        """Adapt to a response's status and rate-limit headers."""
+        values = {str(key).lower(): str(value) for key, value in headers.items()}
+        with self._lock:
+            now = self._clock()
+            self._configure(now)
+            if status_code == 429:
+                self.throttled += 1
+                self._scale = max(self._scale / 2.0, _MIN_RATE_SCALE)
+            elif status_code < 400:
+                self._scale = min(self._scale + _RATE_RECOVERY, 1.0)
+            self.requests.rate = self._rpm / 60.0 * self._scale
+            pause = _retry_after(values.get("retry-after"), self._wall())
+            for kind, bucket in (("requests", self.requests), ("tokens", self.tokens)):
+                remaining = _number(values.get(f"x-ratelimit-remaining-{kind}"))
+                if remaining is None:
+                    continue
+                bucket.align(remaining, now)
+                if remaining <= 0:
+                    reset = _duration(values.get(f"x-ratelimit-reset-{kind}"))
+                    pause = max(pause or 0.0, reset or 0.0)
+            if _number(values.get("x-ratelimit-remaining")) == 0:
+                reset_ms = _number(values.get("x-ratelimit-reset"))
+                if reset_ms is not None:
+                    pause = max(pause or 0.0, reset_ms / 1000.0 - self._wall())
+            if pause and pause > 0:
+                until = now + min(pause, _MAX_PAUSE_SECONDS)
+                self._paused_until = max(self._paused_until, until)
+                logger.info(
+                    "rate_limiter.pause",
+                    extra={"status": status_code, "seconds": round(until - now, 3)},
+                )
+
+    def settle(self, estimated: int, usage: Any) -> None:
+        """Refund or charge the gap between estimated and reported token use."""
+        actual = usage.get("total_tokens") if isinstance(usage, Mapping) else None
+        if not isinstance(actual, int | float):
+            return
+        with self._lock:
+            if self._config is not None:
+                self.tokens.refund(float(estimated) - float(actual))
+
+    def stats(self) -> dict[str, Any]:
+        """Return bucket levels, pauses, waits and retry-budget counters."""
+        with self._lock:
+            if self._config is None:
+                return {"configured": False, "calls": self.calls}
+            now = self._clock()
+            self.requests._refill(now)
+            self.tokens._refill(now)
+            return {
+                "configured": True,
+                "requests_per_minute": round(self.requests.rate * 60.0, 3),
+                "requests_available": round(self.requests.level, 3),
+                "tokens_per_minute": round(self.tokens.rate * 60.0, 3),
+                "tokens_available": round(self.tokens.level, 3),
+                "paused_for_seconds": round(max(self._paused_until - now, 0.0), 3),
+                "calls": self.calls,
+                "throttled": self.throttled,
+                "waits": self.waits,
+                "waited_seconds": round(self.waited_seconds, 3),
+                "retries": self.retries,
+                "retries_denied": self.retries_denied,
+                "retry_budget": round(self._budget, 3),
+            }
+
+
+_LIMITER = RateLimiter()
+register_metrics("rate_limiter", _LIMITER.stats)
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Return the process-wide rate limiter."""
+    return _LIMITER
+
+
+__all__ = ["RateLimiter", "TokenBucket", "estimate_tokens", "get_rate_limiter"]
@@ -0,0 +1,184 @@
+"""Process-wide pooled HTTP clients shared by all OpenRouter calls.
+
+Opening an ``httpx`` client per request pays TCP and TLS setup on every
+call. The pool keeps one sync client and one async client per event loop,
+with keep-alive limits from settings and HTTP/2 when the ``h2`` package is
+installed. New connections are counted through httpcore's ``trace`` request
+extension, so ``/metrics`` can report how many requests reused a connection.
+
+Async upstream calls also take a :meth:`HttpClientPool.slot`, which caps the
+calls in flight on an event loop at ``LLM_MAX_CONCURRENCY``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import importlib.util
+import threading
+import weakref
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import Any
+
+import httpx
+
+from ...config import get_settings
+from ...util.logging import get_logger
+from ...util.metrics import register_metrics
+
+logger = get_logger(__name__)
+
+_CONNECT_EVENT = "connection.connect_tcp.complete"
+
+
+def _http2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+
+class HttpClientPool:
+    """Lazily created keep-alive clients, per-loop call slots and counters."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._sync: httpx.Client | None = None
+        self._async: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, httpx.AsyncClient
+        ] = weakref.WeakKeyDictionary()
+        self._limits: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, asyncio.Semaphore
+        ] = weakref.WeakKeyDictionary()
+        self._requests = 0
+        self._connections = 0
+        self._in_flight = 0
+        self._peak_in_flight = 0
+        self._throttled = 0
+
+    def _options(self) -> dict[str, Any]:
+        settings = get_settings()
+        http2 = settings.openrouter_http2 and _http2_available()
+        return {
+            "timeout": settings.openrouter_timeout_seconds,
+            "limits": httpx.Limits(
+                max_connections=settings.openrouter_max_connections,
+                max_keepalive_connections=settings.openrouter_max_keepalive_connections,
+                keepalive_expiry=settings.openrouter_keepalive_expiry_seconds,
+            ),
+            "http2": http2,
+        }
+
+    def _count_request(self) -> None:
+        with self._lock:
+            self._requests += 1
+
+    def _count_event(self, name: str) -> None:
+        if name == _CONNECT_EVENT:
+            with self._lock:
+                self._connections += 1
+
+    def _on_request(self, request: httpx.Request) -> None:
+        self._count_request()
+
+        def trace(name: str, info: dict[str, Any]) -> None:
+            self._count_event(name)
+
+        request.extensions["trace"] = trace
+
+    async def _on_async_request(self, request: httpx.Request) -> None:
+        self._count_request()
+
+        async def trace(name: str, info: dict[str, Any]) -> None:
+            self._count_event(name)
+
+        request.extensions["trace"] = trace
+
+    def sync_client(self) -> httpx.Client:
+        """Return the shared sync client, creating it on first use."""
+        with self._lock:
+            if self._sync is None:
+                options = self._options()
+                self._sync = httpx.Client(
+                    **options, event_hooks={"request": [self._on_request]}
+                )
+                logger.info("http_pool.open", extra={"http2": options["http2"]})
+            return self._sync
+
+    def async_client(self) -> httpx.AsyncClient:
+        """Return the shared async client of the running event loop."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._async.get(loop)
+            if client is None:
+                client = httpx.AsyncClient(
+                    **self._options(),
+                    event_hooks={"request": [self._on_async_request]},
+                )
+                self._async[loop] = client
+            return client
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold one of the running loop's ``LLM_MAX_CONCURRENCY`` call slots."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            limit = self._limits.get(loop)
+            if limit is None:
+                limit = asyncio.Semaphore(get_settings().llm_max_concurrency)
+                self._limits[loop] = limit
+            if limit.locked():
+                self._throttled += 1
+        async with limit:
+            with self._lock:
+                self._in_flight += 1
+                self._peak_in_flight = max(self._peak_in_flight, self._in_flight)
+            try:
+                yield
+            finally:
+                with self._lock:
+                    self._in_flight -= 1
+
+    def close(self) -> None:
+        """Close the sync client; the next call opens a new one."""
+        with self._lock:
+            client, self._sync = self._sync, None
+        if client is not None:
+            client.close()
+
+    async def aclose(self) -> None:
+        """Close the sync client and the running loop's async client."""
+        self.close()
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._async.pop(loop, None)
+        if client is not None:
+            await client.aclose()
+
+    def stats(self) -> dict[str, Any]:
+        """Return request, connection-reuse and concurrency counters."""
+        with self._lock:
+            requests, connections = self._requests, self._connections
+            open_clients = int(self._sync is not None) + len(self._async)
+            in_flight, peak = self._in_flight, self._peak_in_flight
+            throttled = self._throttled
+        reused = max(requests - connections, 0)
+        return {
+            "requests": requests,
+            "connections_opened": connections,
+            "reused": reused,
+            "reuse_rate": round(reused / requests, 4) if requests else 0.0,
+            "open_clients": open_clients,
+            "in_flight": in_flight,
+            "peak_in_flight": peak,
+            "throttled": throttled,
+        }
+
+
+_POOL = HttpClientPool()
+register_metrics("http_pool", _POOL.stats)
+
+
+def get_http_pool() -> HttpClientPool:
+    """Return the process-wide client pool."""
+    return _POOL
+
+
+__all__ = ["HttpClientPool", "get_http_pool"]
@@ -3,12 +3,14 @@ from __future__ import annotations
 from collections.abc import AsyncIterator
 from contextlib import asynccontextmanager
 from time import perf_counter
+from typing import Any
 
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.base import BaseHTTPMiddleware
 
 from .config import get_settings
+from .llm.clients import get_http_pool
 from .routes import (
     chunk_router,
     docs_router,
@@ -20,6 +22,7 @@ from .routes import (
     upload_router,
 )
 from .util.logging import correlation_context, generate_correlation_id, get_logger
+from .util.metrics import collect_metrics
 
 logger = get_logger(__name__)
 
@@ -76,6 +79,7 @@ def create_app() -> FastAPI:
         try:
             yield
         finally:
+            await get_http_pool().aclose()
             logger.info("backend.shutdown")
 
     app = FastAPI(title=settings.app_name, lifespan=lifespan)
@@ -103,6 +107,11 @@ def create_app() -> FastAPI:
         """Simple readiness probe."""
         return {"status": "ok", "service": settings.app_name}
 
+    @app.get("/metrics", tags=["system"])
+    async def metrics() -> dict[str, dict[str, Any]]:
+        """Process-local cache and client counters."""
+        return collect_metrics()
+
     return app
 
 
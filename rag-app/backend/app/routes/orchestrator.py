@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import inspect
 import json
 from collections.abc import Callable
 from pathlib import Path
@@ -22,7 +23,7 @@ from ..services.chunk_service import run_uf_chunking
 from ..services.header_service import join_and_rechunk
 from ..services.parser_service import parse_and_enrich
 from ..services.rag_pass_service import PassJobs
-from ..services.rag_pass_service import run_all as run_passes
+from ..services.rag_pass_service import run_all_async as run_passes
 from ..services.upload_service import NormalizedDoc, ensure_normalized
 from ..util.audit import stage_record
 from ..util.errors import AppError, NotFoundError, ValidationError
@@ -74,11 +75,17 @@ async def _run_stage(
     extra: dict[str, Any] | None = None,
     success_extra: Callable[[Any], dict[str, Any]] | None = None,
 ) -> Any:
-    """Execute a stage with timing, logging, and audit emission."""
+    """Execute a stage with timing, logging, and audit emission.
+
+    Coroutine functions are awaited on the loop; others run in a worker thread.
+    """
 
     start = perf_counter()
     try:
-        result = await run_in_threadpool(func, *args)
+        if inspect.iscoroutinefunction(func):
+            result = await func(*args)
+        else:
+            result = await run_in_threadpool(func, *args)
     except Exception:
         duration_ms = (perf_counter() - start) * 1000.0
         failure_payload = dict(extra or {})
@@ -3,15 +3,23 @@
 from __future__ import annotations
 
 import json
+from collections.abc import AsyncIterator
 from pathlib import Path
 from typing import Any
 
 from fastapi import APIRouter, HTTPException
 from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
 from ..config import get_settings
-from ..services.rag_pass_service import PassJobs, run_all
+from ..services.rag_pass_service import (
+    CorpusHit,
+    PassJobs,
+    run_all_async,
+    search_corpus,
+    stream_all,
+)
 from ..util.errors import AppError, NotFoundError, ValidationError
 from ..util.logging import get_logger
 
@@ -26,10 +34,34 @@ def _passes_dir(doc_id: str) -> Path:
 
 
 class RunPassesRequest(BaseModel):
-    """Request payload for executing passes."""
+    """Request payload for executing passes.
+
+    ``passes`` selects a subset of passes to run (all by default); ``force``
+    re-executes passes whose inputs are unchanged since the last run.
+    """
 
     doc_id: str
     rechunk_artifact: str
+    passes: list[str] | None = None
+    force: bool = False
+
+    def options(self) -> dict[str, Any]:
+        """Return the run options that differ from their defaults."""
+        return self.model_dump(include={"passes", "force"}, exclude_defaults=True)
+
+
+class CorpusSearchRequest(BaseModel):
+    """Request payload for searching chunks across documents.
+
+    ``project_id`` limits the search to one project's documents; ``query_vec``
+    adds dense scores, weighted by ``alpha``, to the BM25 ranking.
+    """
+
+    query: str
+    project_id: str | None = None
+    query_vec: list[float] | None = None
+    alpha: float = 0.5
+    k: int = 10
 
 
 @router.get("/{doc_id}", response_model=dict[str, Any])
@@ -88,16 +120,66 @@ async def get_pass(doc_id: str, pass_name: str) -> dict[str, Any]:
 async def run_passes(request: RunPassesRequest) -> PassJobs:
     """Execute the suite of structured passes for a document."""
 
+    try:
+        return await run_all_async(
+            request.doc_id, request.rechunk_artifact, **request.options()
+        )
+    except AppError as exc:
+        raise _http_error(exc) from exc
+
+
+@router.post("/stream")
+async def stream_passes(request: RunPassesRequest) -> StreamingResponse:
+    """Stream pass answers as server-sent events while they are generated."""
+
+    try:
+        events = await run_in_threadpool(
+            stream_all, request.doc_id, request.rechunk_artifact, **request.options()
+        )
+    except AppError as exc:
+        raise _http_error(exc) from exc
+
+    async def _sse() -> AsyncIterator[str]:
+        async for event in events:
+            payload = json.dumps(event.data, ensure_ascii=False)
+            yield f"event: {event.event}\ndata: {payload}\n\n"
+
+    return StreamingResponse(
+        _sse(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post("/search", response_model=list[CorpusHit])
+async def corpus_search(request: CorpusSearchRequest) -> list[CorpusHit]:
+    """Return the top chunks for a query across every indexed document."""
+
     try:
         return await run_in_threadpool(
-            run_all, request.doc_id, request.rechunk_artifact
+            search_corpus,
+            request.query,
+            project_id=request.project_id,
+            query_vec=request.query_vec,
+            alpha=request.alpha,
+            k=request.k,
         )
-    except ValidationError as exc:
-        raise HTTPException(status_code=400, detail=str(exc)) from exc
-    except NotFoundError as exc:
-        raise HTTPException(status_code=404, detail=str(exc)) from exc
     except AppError as exc:
-        raise HTTPException(status_code=500, detail=str(exc)) from exc
+        raise _http_error(exc) from exc
+
+
+def _http_error(exc: AppError) -> HTTPException:
+    if isinstance(exc, ValidationError):
+        return HTTPException(status_code=400, detail=str(exc))
+    if isinstance(exc, NotFoundError):
+        return HTTPException(status_code=404, detail=str(exc))
+    return HTTPException(status_code=500, detail=str(exc))
 
 
-__all__ = ["list_passes", "get_pass", "run_passes"]
+__all__ = [
+    "list_passes",
+    "get_pass",
+    "run_passes",
+    "stream_passes",
+    "corpus_search",
+]
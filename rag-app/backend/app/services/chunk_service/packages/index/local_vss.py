@@ -3,30 +3,31 @@
 from __future__ import annotations
 
 import json
-import math
-import re
 from pathlib import Path
 from typing import Any
 
-from .....adapters.vectors import BM25Index, FaissIndex
+import numpy as np
+
+from .....adapters import sparse_format
+from .....adapters.analyzer import get_analyzer
+from .....adapters.ann import make_dense_index
+from .....adapters.vector_format import FORMAT_NAME, FORMAT_VERSION
+from .....adapters.vectors import BM25Index
 from .....util.logging import get_logger
 
 logger = get_logger(__name__)
 
 _HASH_DIMENSION = 16
-_TOKEN_PATTERN = re.compile(r"\w+")
 
 
 def _hash_embed(text: str, dim: int = _HASH_DIMENSION) -> list[float]:
-    vector = [0.0] * dim
-    tokens = _TOKEN_PATTERN.findall(text.lower())
-    if not tokens:
-        return vector
-    for token in tokens:
-        index = hash(token) % dim
-        vector[index] += 1.0
-    norm = math.sqrt(sum(value * value for value in vector)) or 1.0
-    return [value / norm for value in vector]
+    # Stable term hashes keep vectors identical across processes.
+    hashes = get_analyzer().token_hashes(text)
+    if not len(hashes):
+        return [0.0] * dim
+    buckets = hashes % dim
+    vector = np.bincount(buckets, minlength=dim).astype(np.float64)
+    return (vector / np.linalg.norm(vector)).tolist()
 
 
 def build_local_index(
@@ -40,6 +41,7 @@ def build_local_index(
         logger.warning("chunk.index.missing_chunks", extra={"path": chunks_path})
         return
 
+    chunk_ids: list[str] = []
     chunk_texts: list[str] = []
     chunk_vectors: list[list[float]] = []
     with path.open("r", encoding="utf-8") as handle:
@@ -48,28 +50,42 @@ def build_local_index(
                 continue
             record = json.loads(line)
             text = record.get("text", "")
+            chunk_ids.append(str(record.get("chunk_id") or len(chunk_ids)))
             chunk_texts.append(text)
             chunk_vectors.append(_hash_embed(text))
 
-    bm25 = BM25Index()
-    if chunk_texts:
-        bm25.add(chunk_texts)
     index_dir = path.parent
     index_dir.mkdir(parents=True, exist_ok=True)
+    bm25_path = index_dir / "bm25.index.bin"
+    bm25 = BM25Index()
+    bm25.add(chunk_texts, ids=chunk_ids)
+    bm25.save_to(str(bm25_path))
 
     manifest: dict[str, Any] = {
         "doc_id": doc_id,
         "chunk_count": len(chunk_texts),
-        "bm25_docs": len(chunk_texts),
+        "bm25_docs": len(bm25),
+        "bm25_index_path": str(bm25_path),
+        "bm25_index_format": sparse_format.FORMAT_NAME,
+        "bm25_index_version": sparse_format.FORMAT_VERSION,
         "dense_index_path": None,
+        "dense_index_format": None,
+        "dense_index_version": None,
     }
 
     if chunk_vectors:
-        dense_path = index_dir / "vectors.faiss.json"
-        faiss = FaissIndex(len(chunk_vectors[0]), str(dense_path))
-        faiss.add(chunk_vectors)
-        faiss.save()
+        dense_path = index_dir / "vectors.faiss.bin"
+        dense = make_dense_index(len(chunk_vectors[0]))
+        dense.add(chunk_vectors, ids=chunk_ids)
+        dense.train()
+        if dense.params:
+            manifest["dense_index_params"] = dense.params
+        dense.save_to(str(dense_path))
         manifest["dense_index_path"] = str(dense_path)
+        manifest["dense_index_format"] = FORMAT_NAME
+        manifest["dense_index_version"] = FORMAT_VERSION
+        manifest["dense_index_type"] = dense.index_type
+        manifest["dense_dim"] = len(chunk_vectors[0])
 
     manifest_path = index_dir / "index.manifest.json"
     manifest_path.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
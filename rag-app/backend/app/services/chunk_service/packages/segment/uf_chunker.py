@@ -4,15 +4,12 @@ from __future__ import annotations
 
 from typing import Any
 
+from .....adapters.analyzer import get_analyzer
 from .....util.logging import get_logger
 
 logger = get_logger(__name__)
 
 
-def _sentence_token_count(sentence: str) -> int:
-    return len(sentence.split())
-
-
 def _is_heading_sentence(sentence: str) -> bool:
     text = sentence.strip()
     if not text:
@@ -36,9 +33,9 @@ def uf_chunk(
         return []
     target_tokens = max(target_tokens or 90, 10)
     overlap_tokens = max(overlap or 12, 0)
-    avg_tokens = sum(_sentence_token_count(s) for s in sentences) / max(
-        len(sentences), 1
-    )
+    analyzer = get_analyzer()
+    counts = [analyzer.count(sentence) for sentence in sentences]
+    avg_tokens = sum(counts) / max(len(sentences), 1)
     overlap_sentences = int(round(overlap_tokens / max(avg_tokens or 1, 1)))
     overlap_sentences = max(0, min(overlap_sentences, len(sentences) - 1))
     chunks: list[dict[str, Any]] = []
@@ -47,7 +44,7 @@ def uf_chunk(
         end = start
         token_total = 0
         while end < len(sentences) and token_total < target_tokens:
-            token_total += _sentence_token_count(sentences[end])
+            token_total += counts[end]
             end += 1
             if end < len(sentences) and _is_heading_sentence(sentences[end]):
                 break
@@ -58,7 +55,7 @@ def uf_chunk(
             "text": " ".join(chunk_sentences),
             "sentence_start": start,
             "sentence_end": end - 1,
-            "token_count": sum(_sentence_token_count(s) for s in chunk_sentences),
+            "token_count": sum(counts[start:end]),
             "typography": {
                 "avg_size": (typography or {}).get("avg_size", 0.0),
                 "avg_weight": (typography or {}).get("avg_weight", 0.0),
@@ -71,6 +71,25 @@ def _persist_jsonl(path: Path, rows: list[dict[str, Any]]) -> None:
     path.write_text("\n".join(lines) + ("\n" if lines else ""), encoding="utf-8")
 
 
+def _persist_retrieval_state(path: Path, rows: list[dict[str, Any]]) -> None:
+    """Save the rank features and retrieval indexes the passes load."""
+    # Imported lazily: the pass service imports the upload service, which
+    # imports this one.
+    from ..rag_pass_service.packages.rank import RankFeatures, features_path
+    from ..rag_pass_service.packages.retrieval import RetrievalSession
+
+    features = RankFeatures.compute(rows)
+    features.save(features_path(path))
+    try:
+        RetrievalSession(rows, features=features).save(path)
+    except AppError as exc:
+        # Passes build the indexes themselves when none were saved.
+        logger.warning(
+            "headers.retrieval_indexes_skipped",
+            extra={"path": str(path), "error": str(exc)},
+        )
+
+
 def _build_section_map(chunks: list[HeaderChunk]) -> list[dict[str, Any]]:
     assignments: list[dict[str, Any]] = []
     order = 0
@@ -144,9 +163,9 @@ def join_and_rechunk(doc_id: str, chunks_artifact: str) -> HeaderJoinInternal:
 
             _persist_json(headers_path, headers_payload)
             _persist_json(section_map_path, section_map)
-            _persist_jsonl(
-                header_chunks_path, [chunk.model_dump() for chunk in header_chunks]
-            )
+            header_rows = [chunk.model_dump() for chunk in header_chunks]
+            _persist_jsonl(header_chunks_path, header_rows)
+            _persist_retrieval_state(header_chunks_path, header_rows)
             recovered_count = sum(1 for header in header_models if header.recovered)
             duration_ms = (time.perf_counter() - stage_start) * 1000.0
             span_meta["headers"] = len(header_models)
@@ -1,5 +1,21 @@
 """Public exports for the retrieval pass service."""
 
-from .main import PassJobs, run_all
+from .main import (
+    CorpusHit,
+    PassJobs,
+    PassStreamEvent,
+    run_all,
+    run_all_async,
+    search_corpus,
+    stream_all,
+)
 
-__all__ = ["PassJobs", "run_all"]
+__all__ = [
+    "CorpusHit",
+    "PassJobs",
+    "PassStreamEvent",
+    "run_all",
+    "run_all_async",
+    "search_corpus",
+    "stream_all",
+]
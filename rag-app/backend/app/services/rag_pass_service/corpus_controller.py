@@ -0,0 +1,64 @@
+"""Controller for cross-document corpus search."""
+
+from __future__ import annotations
+
+from pydantic import BaseModel
+
+from backend.app.services.upload_service import list_document_ids
+from backend.app.util.errors import ValidationError
+from backend.app.util.logging import get_logger, log_span
+
+from .packages.retrieval import load_shards, search_shards
+
+logger = get_logger(__name__)
+
+
+class CorpusHitInternal(BaseModel):
+    """Internal corpus search hit."""
+
+    doc_id: str
+    chunk_id: str | None
+    row: int
+    score: float
+    sparse: float
+    dense: float
+
+
+def search_corpus(
+    query: str,
+    *,
+    project_id: str | None = None,
+    query_vec: list[float] | None = None,
+    alpha: float = 0.5,
+    k: int = 10,
+) -> list[CorpusHitInternal]:
+    """Search every indexed document, or only those of *project_id*."""
+
+    if not query or not query.strip():
+        raise ValidationError("query is required for corpus search")
+    if k < 1:
+        raise ValidationError("k must be positive")
+    doc_ids = list_document_ids(project_id) if project_id is not None else None
+    with log_span(
+        "passes.search_corpus",
+        logger=logger,
+        extra={"project_id": project_id, "k": k},
+    ) as span_meta:
+        shards = load_shards(doc_ids)
+        hits = search_shards(shards, query, query_vec=query_vec, alpha=alpha, k=k)
+        span_meta["shards"] = len(shards)
+        span_meta["hits"] = len(hits)
+    return [
+        CorpusHitInternal(
+            doc_id=hit["doc_id"],
+            chunk_id=hit["chunk_id"],
+            row=int(hit["id"]),
+            score=float(hit["score"]),
+            sparse=float(hit["sparse"]),
+            dense=float(hit["dense"]),
+        )
+        for hit in hits
+    ]
+
+
+__all__ = ["CorpusHitInternal", "search_corpus"]
@@ -2,10 +2,18 @@
 
 from __future__ import annotations
 
-from pydantic import BaseModel
+from collections.abc import AsyncIterator
+from typing import Any
 
-from .passes_controller import PassJobsInternal
+from pydantic import BaseModel, Field
+
+from .corpus_controller import CorpusHitInternal
+from .corpus_controller import search_corpus as controller_search_corpus
+from .pass_steps import PassJobsInternal
 from .passes_controller import run_all as controller_run_all
+from .passes_controller import run_all_async as controller_run_all_async
+from .stream_controller import PassStreamEventInternal
+from .stream_controller import stream_all as controller_stream_all
 
 
 class PassJobs(BaseModel):
@@ -14,15 +22,104 @@ class PassJobs(BaseModel):
     doc_id: str
     manifest_path: str
     passes: dict[str, str]
+    failures: dict[str, str] = Field(default_factory=dict)
+    reused: list[str] = Field(default_factory=list)
+
 
+def run_all(
+    doc_id: str,
+    rechunk_artifact: str,
+    *,
+    passes: list[str] | None = None,
+    force: bool = False,
+) -> PassJobs:
+    """Execute the domain passes, reusing results whose inputs are unchanged.
 
-def run_all(doc_id: str, rechunk_artifact: str) -> PassJobs:
-    """Execute five domain passes asynchronously."""
+    *passes* restricts the run to a subset of passes; *force* re-executes
+    them even when their input fingerprint matches the previous run.
+    """
 
     internal: PassJobsInternal = controller_run_all(
-        doc_id=doc_id, rechunk_artifact=rechunk_artifact
+        doc_id=doc_id, rechunk_artifact=rechunk_artifact, passes=passes, force=force
+    )
+    return PassJobs(**internal.model_dump())
+
+
+async def run_all_async(
+    doc_id: str,
+    rechunk_artifact: str,
+    *,
+    passes: list[str] | None = None,
+    force: bool = False,
+) -> PassJobs:
+    """Async :func:`run_all` for callers already on an event loop."""
+
+    internal: PassJobsInternal = await controller_run_all_async(
+        doc_id=doc_id, rechunk_artifact=rechunk_artifact, passes=passes, force=force
     )
     return PassJobs(**internal.model_dump())
 
 
-__all__ = ["PassJobs", "run_all"]
+class PassStreamEvent(BaseModel):
+    """Server-sent event emitted while passes stream."""
+
+    event: str
+    data: dict[str, Any]
+
+
+def stream_all(
+    doc_id: str,
+    rechunk_artifact: str,
+    *,
+    passes: list[str] | None = None,
+    force: bool = False,
+) -> AsyncIterator[PassStreamEvent]:
+    """Run retrieval, then stream every pass answer as it is generated."""
+
+    events: AsyncIterator[PassStreamEventInternal] = controller_stream_all(
+        doc_id=doc_id, rechunk_artifact=rechunk_artifact, passes=passes, force=force
+    )
+
+    async def _public() -> AsyncIterator[PassStreamEvent]:
+        async for event in events:
+            yield PassStreamEvent(**event.model_dump())
+
+    return _public()
+
+
+class CorpusHit(BaseModel):
+    """One chunk returned by cross-document search."""
+
+    doc_id: str
+    chunk_id: str | None
+    row: int
+    score: float
+    sparse: float
+    dense: float
+
+
+def search_corpus(
+    query: str,
+    *,
+    project_id: str | None = None,
+    query_vec: list[float] | None = None,
+    alpha: float = 0.5,
+    k: int = 10,
+) -> list[CorpusHit]:
+    """Search chunks across all documents, optionally within one project."""
+
+    internal: list[CorpusHitInternal] = controller_search_corpus(
+        query, project_id=project_id, query_vec=query_vec, alpha=alpha, k=k
+    )
+    return [CorpusHit(**hit.model_dump()) for hit in internal]
+
+
+__all__ = [
+    "CorpusHit",
+    "PassJobs",
+    "PassStreamEvent",
+    "run_all",
+    "run_all_async",
+    "search_corpus",
+    "stream_all",
+]
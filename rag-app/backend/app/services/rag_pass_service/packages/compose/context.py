@@ -2,12 +2,37 @@
 
 from __future__ import annotations
 
+import re
+from dataclasses import dataclass
 from typing import Any
 
+from backend.app.adapters.tokenizer import TokenCounter, get_token_counter
 
-def compose_window(ranked_chunks: list[dict[str, Any]], budget_tokens: int) -> str:
-    """Assemble ordered, de-duped chunk window respecting token budget."""
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?;])\s+")
+_SEPARATOR = "\n\n"
+# Keeps zero-score chunks worth packing into otherwise unused budget.
+_MIN_VALUE_PER_TOKEN = 1e-6
 
+
+def compose_window(
+    ranked_chunks: list[dict[str, Any]],
+    budget_tokens: int,
+    packing: str = "greedy",
+) -> str:
+    """Assemble ordered, de-duped chunk window respecting token budget.
+
+    ``greedy`` appends chunks in rank order until the next one would exceed
+    the budget. ``knapsack`` always keeps the top chunk, then fills the rest
+    of the budget with the set of chunks (or sentence-bounded prefixes of
+    them) that maximizes total score. Both count exact model tokens, headers
+    and separators included, and cut a top chunk that alone exceeds the
+    budget at the last word that fits.
+    """
+
+    if packing == "knapsack":
+        return _compose_knapsack(ranked_chunks, budget_tokens)
+    counter = get_token_counter()
+    separator = counter.count(_SEPARATOR)
     seen: set[str] = set()
     pieces: list[str] = []
     token_total = 0
@@ -18,17 +43,123 @@ def compose_window(ranked_chunks: list[dict[str, Any]], budget_tokens: int) -> s
         text = str(chunk.get("text", "")).strip()
         if not text:
             continue
-        tokens = len(text.split())
-        if pieces and token_total + tokens > budget_tokens:
-            break
         header = chunk.get("header_path") or chunk.get("header") or ""
-        prefix = f"[{header}] " if header else ""
-        pieces.append(prefix + text)
+        piece = (f"[{header}] " if header else "") + text
+        tokens = counter.count(piece) + (separator if pieces else 0)
+        if token_total + tokens > budget_tokens:
+            if pieces:
+                break
+            piece = _truncate(piece, budget_tokens, counter)
+            if not piece:
+                break
+            tokens = counter.count(piece)
+        pieces.append(piece)
         seen.add(chunk_id)
         token_total += tokens
         if token_total >= budget_tokens:
             break
-    return "\n\n".join(pieces)
+    return _SEPARATOR.join(pieces)
+
+
+def _truncate(piece: str, budget: int, counter: TokenCounter) -> str:
+    """Return the longest word prefix of *piece* within *budget* tokens."""
+
+    words = piece.split()
+    low, high = 0, len(words)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if counter.count(" ".join(words[:middle])) <= budget:
+            low = middle
+        else:
+            high = middle - 1
+    return " ".join(words[:low])
+
+
+@dataclass(frozen=True)
+class _Option:
+    text: str
+    cost: int
+    value: float
+
+
+def _options(chunk: dict[str, Any], budget: int, separator: int) -> list[_Option]:
+    """Full chunk first, then shorter sentence-bounded prefixes that fit.
+
+    When not even the first sentence fits, the only option is the chunk cut
+    at the last word that does (none if no word fits).
+    """
+
+    counter = get_token_counter()
+    text = str(chunk.get("text", "")).strip()
+    header = chunk.get("header_path") or chunk.get("header") or ""
+    prefix = f"[{header}] " if header else ""
+    score = float(chunk.get("total_score", chunk.get("score", 0.0)) or 0.0)
+    full_cost = counter.count(prefix + text) + separator
+    density = max(score, 0.0) / max(full_cost, 1) + _MIN_VALUE_PER_TOKEN
+    options = [_Option(prefix + text, full_cost, density * full_cost)]
+    sentences = _SENTENCE_BREAK.split(text)
+    for end in range(len(sentences) - 1, 0, -1):
+        piece = prefix + " ".join(sentences[:end])
+        cost = counter.count(piece) + separator
+        options.append(_Option(piece, cost, density * cost))
+    fitting = [option for option in options if option.cost <= budget]
+    if fitting:
+        return fitting
+    piece = _truncate(prefix + text, budget - separator, counter)
+    if not piece:
+        return []
+    cost = counter.count(piece) + separator
+    return [_Option(piece, cost, density * cost)]
+
+
+def _compose_knapsack(ranked_chunks: list[dict[str, Any]], budget_tokens: int) -> str:
+    separator = get_token_counter().count(_SEPARATOR)
+    seen: set[str] = set()
+    candidates: list[list[_Option]] = []
+    for chunk in ranked_chunks:
+        chunk_id = str(chunk.get("chunk_id"))
+        if not chunk_id or chunk_id in seen or not str(chunk.get("text", "")).strip():
+            continue
+        seen.add(chunk_id)
+        candidates.append(_options(chunk, budget_tokens, separator))
+    if not candidates or not candidates[0]:
+        return ""
+
+    # The top-ranked chunk anchors the window, trimmed if it does not fit; it
+    # is not preceded by a separator, so its cost excludes one.
+    head = candidates[0][0]
+    capacity = max(budget_tokens - head.cost + separator, 0)
+    chosen = _pack(candidates[1:], capacity)
+    pieces = [head.text] + [option.text for option in chosen if option is not None]
+    return _SEPARATOR.join(pieces)
+
+
+def _pack(candidates: list[list[_Option]], capacity: int) -> list[_Option | None]:
+    """Multiple-choice 0/1 knapsack: at most one option per candidate."""
+
+    best = [0.0] * (capacity + 1)
+    picks: list[list[int]] = []
+    for options in candidates:
+        row = best[:]
+        pick = [-1] * (capacity + 1)
+        for index, option in enumerate(options):
+            for room in range(capacity, option.cost - 1, -1):
+                value = best[room - option.cost] + option.value
+                if value > row[room]:
+                    row[room] = value
+                    pick[room] = index
+        picks.append(pick)
+        best = row
+
+    chosen: list[_Option | None] = [None] * len(candidates)
+    room = capacity
+    for position in range(len(candidates) - 1, -1, -1):
+        index = picks[position][room]
+        if index >= 0:
+            option = candidates[position][index]
+            chosen[position] = option
+            room -= option.cost
+    return chosen
 
 
 __all__ = ["compose_window"]
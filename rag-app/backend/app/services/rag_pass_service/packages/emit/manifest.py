@@ -0,0 +1,130 @@
+"""Single-commit writer for a document's pass manifest.
+
+Passes record their artifacts and failures in memory; :meth:`commit` then
+merges them into ``passes/manifest.json`` under a per-document lock and
+writes the file once, atomically. Entries of passes that were not part of
+the run are kept, so concurrent callers running different passes of the
+same document do not overwrite each other. Each successful pass also
+records the fingerprint of its inputs, which lets a later run reuse it.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+from pathlib import Path
+
+from backend.app.adapters.storage import write_json
+from backend.app.config import get_settings
+from backend.app.contracts.passes import PassManifest
+from backend.app.util.logging import get_logger
+
+logger = get_logger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+
+_DOC_LOCKS: dict[str, threading.Lock] = {}
+_DOC_LOCKS_GUARD = threading.Lock()
+
+
+def doc_lock(doc_id: str) -> threading.Lock:
+    """Return the process-wide lock guarding *doc_id*'s pass manifest."""
+    with _DOC_LOCKS_GUARD:
+        return _DOC_LOCKS.setdefault(doc_id, threading.Lock())
+
+
+def manifest_path(doc_id: str) -> Path:
+    """Return the path of *doc_id*'s pass manifest."""
+    settings = get_settings()
+    return Path(settings.artifact_root_path) / doc_id / "passes" / MANIFEST_NAME
+
+
+def read_pass_manifest(doc_id: str) -> PassManifest:
+    """Return the persisted manifest, or an empty one if absent or corrupt."""
+
+    path = manifest_path(doc_id)
+    if not path.exists():
+        return PassManifest(doc_id=doc_id)
+    try:
+        return PassManifest(**json.loads(path.read_text(encoding="utf-8")))
+    except Exception:  # noqa: BLE001
+        logger.warning("passes.manifest_corrupt", extra={"path": str(path)})
+        return PassManifest(doc_id=doc_id)
+
+
+class PassManifestWriter:
+    """Accumulate one run's pass entries and commit them in a single write."""
+
+    def __init__(self, doc_id: str) -> None:
+        self.doc_id = doc_id
+        self.passes: dict[str, str] = {}
+        self.failures: dict[str, str] = {}
+        self.fingerprints: dict[str, str] = {}
+
+    @property
+    def path(self) -> Path:
+        return manifest_path(self.doc_id)
+
+    def record(self, name: str, artifact: str, fingerprint: str | None = None) -> None:
+        """Record a successful pass, its artifact path and input fingerprint."""
+        self.failures.pop(name, None)
+        self.passes[name] = artifact
+        if fingerprint is not None:
+            self.fingerprints[name] = fingerprint
+
+    def fail(self, name: str, error: str) -> None:
+        """Record a failed pass."""
+        self.passes.pop(name, None)
+        self.fingerprints.pop(name, None)
+        self.failures[name] = error
+
+    def commit(self, order: list[str] | None = None) -> PassManifest:
+        """Merge the run's entries into the manifest and write it atomically.
+
+        Passes already in the manifest keep their position; new ones follow
+        *order*, then recording order. Passes named in *order* without an
+        entry are cleared, and passes outside the run are left untouched.
+        """
+
+        recorded = [*self.passes, *self.failures]
+        names = list(dict.fromkeys([*(order or []), *recorded]))
+        with doc_lock(self.doc_id):
+            current = read_pass_manifest(self.doc_id)
+            passes = dict(current.passes)
+            failures = dict(current.failures)
+            fingerprints = dict(current.fingerprints)
+            for name in names:
+                for merged, entries in (
+                    (passes, self.passes),
+                    (failures, self.failures),
+                    (fingerprints, self.fingerprints),
+                ):
+                    if name in entries:
+                        merged[name] = entries[name]
+                    else:
+                        merged.pop(name, None)
+            manifest = PassManifest(
+                doc_id=self.doc_id,
+                passes=passes,
+                failures=failures,
+                fingerprints=fingerprints,
+            )
+            write_json(str(self.path), manifest.model_dump())
+        logger.info(
+            "passes.manifest.commit",
+            extra={
+                "doc_id": self.doc_id,
+                "passes": len(self.passes),
+                "failed": len(self.failures),
+            },
+        )
+        return manifest
+
+
+__all__ = [
+    "MANIFEST_NAME",
+    "PassManifestWriter",
+    "doc_lock",
+    "manifest_path",
+    "read_pass_manifest",
+]
@@ -2,7 +2,6 @@
 
 from __future__ import annotations
 
-import json
 from pathlib import Path
 from typing import Any
 
@@ -11,7 +10,6 @@ from backend.app.config import get_settings
 from backend.app.contracts.ids import make_pass_id, pass_artifact_name
 from backend.app.contracts.passes import (
     Citation,
-    PassManifest,
     PassResult,
     RetrievalTrace,
 )
@@ -23,7 +21,11 @@ logger = get_logger(__name__)
 def write_pass_results(
     doc_id: str, pass_name: str, answer: Any, ranked: list[dict[str, Any]]
 ) -> str:
-    """Persist pass outputs with retrieval debug."""
+    """Persist pass outputs with retrieval debug.
+
+    Only the pass artifact is written; the caller records it in the pass
+    manifest through a :class:`~.manifest.PassManifestWriter`.
+    """
 
     settings = get_settings()
     passes_dir = Path(settings.artifact_root_path) / doc_id / "passes"
@@ -78,19 +80,6 @@ def write_pass_results(
     )
     write_json(str(artifact_path), result.model_dump())
 
-    manifest_path = passes_dir / "manifest.json"
-    manifest = PassManifest(doc_id=doc_id, passes={})
-    if manifest_path.exists():
-        try:
-            payload = json.loads(manifest_path.read_text(encoding="utf-8"))
-            manifest = PassManifest(**payload)
-        except Exception:  # noqa: BLE001
-            logger.warning(
-                "passes.manifest_corrupt", extra={"path": str(manifest_path)}
-            )
-    manifest.passes[pass_name] = str(artifact_path)
-    write_json(str(manifest_path), manifest.model_dump())
-
     logger.info(
         "passes.emit.success",
         extra={"doc_id": doc_id, "pass": pass_name, "path": str(artifact_path)},
@@ -1,7 +1,21 @@
 """Ranking heuristics for hybrid retrieval."""
 
+from .features import (
+    RankFeatures,
+    features_path,
+    load_rank_features,
+    write_rank_features,
+)
 from .fluid import flow_score
 from .graph import graph_score
 from .hep import energy_score
 
-__all__ = ["flow_score", "energy_score", "graph_score"]
+__all__ = [
+    "RankFeatures",
+    "flow_score",
+    "energy_score",
+    "features_path",
+    "graph_score",
+    "load_rank_features",
+    "write_rank_features",
+]
@@ -0,0 +1,155 @@
+"""Columnar, precomputed rank features for header chunks.
+
+Flow, energy and graph scores depend only on a chunk, never on the domain
+being ranked, so they are computed once when header chunks are written and
+stored next to ``header_chunks.jsonl`` as ``.features.npz`` arrays aligned
+with the chunk rows. A digest of every chunk field the scorers read (text,
+token count, sentence span and header or section path) guards against a
+stale sidecar; :func:`load_rank_features` returns None when it does not match or
+cannot be read, and the sidecar is replaced atomically when rewritten.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import zipfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from .....util.logging import get_logger
+from .fluid import flow_score
+from .graph import graph_score
+from .hep import energy_score
+
+logger = get_logger(__name__)
+
+FEATURES_SUFFIX = ".features.npz"
+# Weights of the flow, energy and graph features added to the fused score.
+PRIOR_WEIGHTS = (0.3, 0.2, 0.1)
+
+
+def _scored_fields(chunk: dict[str, Any]) -> list[Any]:
+    # Every input of flow_score, energy_score and graph_score, resolved the
+    # way they read it, so defaulted and missing fields hash alike.
+    return [
+        str(chunk.get("text", "")),
+        chunk.get("token_count"),
+        int(chunk.get("sentence_start", 0)),
+        int(chunk.get("sentence_end", 0)),
+        str(chunk.get("header_path") or chunk.get("section_path") or ""),
+    ]
+
+
+def _chunks_digest(chunks: list[dict[str, Any]]) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    for chunk in chunks:
+        digest.update(json.dumps(_scored_fields(chunk), default=str).encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+@dataclass(frozen=True)
+class RankFeatures:
+    """Per-chunk flow, energy and graph scores as aligned float64 columns."""
+
+    flow: np.ndarray
+    energy: np.ndarray
+    graph: np.ndarray
+    digest: str
+
+    def __len__(self) -> int:
+        return len(self.flow)
+
+    @classmethod
+    def compute(cls, chunks: list[dict[str, Any]]) -> RankFeatures:
+        """Score every chunk once."""
+        count = len(chunks)
+        return cls(
+            flow=np.fromiter(map(flow_score, chunks), np.float64, count),
+            energy=np.fromiter(map(energy_score, chunks), np.float64, count),
+            graph=np.fromiter(map(graph_score, chunks), np.float64, count),
+            digest=_chunks_digest(chunks),
+        )
+
+    def prior(self, rows: np.ndarray, scores: np.ndarray) -> np.ndarray:
+        """Return ``total_score`` for fused *scores* of chunk *rows*."""
+        flow, energy, graph = PRIOR_WEIGHTS
+        return (
+            scores
+            + flow * self.flow[rows]
+            + energy * self.energy[rows]
+            + graph * self.graph[rows]
+        )
+
+    def save(self, path: Path) -> None:
+        """Write the columns to *path* via a sibling temp file and rename."""
+        fd, temp = tempfile.mkstemp(
+            dir=path.parent, prefix=f".{path.name}.", suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                np.savez(
+                    handle,
+                    flow=self.flow,
+                    energy=self.energy,
+                    graph=self.graph,
+                    digest=np.array(self.digest),
+                )
+            os.replace(temp, path)
+        except BaseException:
+            Path(temp).unlink(missing_ok=True)
+            raise
+
+
+def features_path(chunks_path: str | Path) -> Path:
+    """Return the sidecar path of the features of a chunks artifact."""
+    path = Path(chunks_path)
+    return path.with_name(path.stem + FEATURES_SUFFIX)
+
+
+def write_rank_features(chunks_path: str | Path, chunks: list[dict[str, Any]]) -> Path:
+    """Compute and persist the rank features of *chunks*."""
+    target = features_path(chunks_path)
+    RankFeatures.compute(chunks).save(target)
+    return target
+
+
+def load_rank_features(
+    chunks_path: str | Path, chunks: list[dict[str, Any]]
+) -> RankFeatures | None:
+    """Load the persisted features of *chunks*, or None if absent or stale."""
+    path = features_path(chunks_path)
+    if not path.exists():
+        return None
+    try:
+        with np.load(path) as data:
+            features = RankFeatures(
+                flow=data["flow"],
+                energy=data["energy"],
+                graph=data["graph"],
+                digest=str(data["digest"]),
+            )
+    except (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile) as exc:
+        logger.warning(
+            "rank.features.unreadable", extra={"path": str(path), "error": str(exc)}
+        )
+        return None
+    if len(features) != len(chunks) or features.digest != _chunks_digest(chunks):
+        return None
+    return features
+
+
+__all__ = [
+    "FEATURES_SUFFIX",
+    "PRIOR_WEIGHTS",
+    "RankFeatures",
+    "features_path",
+    "load_rank_features",
+    "write_rank_features",
+]
@@ -4,11 +4,15 @@ from __future__ import annotations
 
 from typing import Any
 
+from backend.app.adapters.analyzer import get_analyzer
+
 
 def flow_score(chunk: dict[str, Any]) -> float:
     """Fluid-inspired flow scoring based on continuity & gradients."""
 
-    length = float(chunk.get("token_count") or len(str(chunk.get("text", "")).split()))
+    length = float(
+        chunk.get("token_count") or get_analyzer().count(str(chunk.get("text", "")))
+    )
     sentence_span = (
         int(chunk.get("sentence_end", 0)) - int(chunk.get("sentence_start", 0)) + 1
     )
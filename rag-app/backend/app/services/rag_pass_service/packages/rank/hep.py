@@ -11,9 +11,9 @@ def energy_score(chunk: dict[str, Any]) -> float:
     text = str(chunk.get("text", ""))
     if not text:
         return 0.0
-    digits = sum(char.isdigit() for char in text)
-    capitals = sum(char.isupper() for char in text)
-    specials = sum(char in {"%", "°", "±"} for char in text)
+    digits = sum(map(str.isdigit, text))
+    capitals = sum(map(str.isupper, text))
+    specials = text.count("%") + text.count("°") + text.count("±")
     return round((digits + capitals + specials) / max(len(text), 1), 4)
 
 
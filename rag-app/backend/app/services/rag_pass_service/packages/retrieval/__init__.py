@@ -1,5 +1,17 @@
 """Retrieval utilities for pass execution."""
 
-from .hybrid import retrieve_ranked
+from .corpus import IndexShard, load_shards, search_shards
+from .hybrid import retrieve_ranked, retrieve_ranked_batch
+from .persist import index_manifest_path
+from .session import RetrievalSession, ranking_signature
 
-__all__ = ["retrieve_ranked"]
+__all__ = [
+    "IndexShard",
+    "RetrievalSession",
+    "index_manifest_path",
+    "load_shards",
+    "ranking_signature",
+    "retrieve_ranked",
+    "retrieve_ranked_batch",
+    "search_shards",
+]
@@ -0,0 +1,183 @@
+"""Cross-document search over per-document index shards.
+
+Every chunked document persists a BM25 and a dense index next to its
+``index.manifest.json``; each such pair is one shard. A query is fanned out
+over the shards on a thread pool and the per-shard top-k lists are merged
+with a heap. Sparse scores use corpus-wide statistics (``N``, ``avgdl`` and
+document frequencies summed over all shards), so they are comparable across
+shards and equal to those of one index over the whole corpus.
+"""
+
+from __future__ import annotations
+
+import heapq
+import json
+import threading
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from itertools import islice
+from pathlib import Path
+from typing import Any
+
+from backend.app.adapters import (
+    BM25Index,
+    CorpusStats,
+    FaissIndex,
+    hybrid_search,
+    make_dense_index,
+)
+from backend.app.config import get_settings
+from backend.app.util.logging import get_logger
+
+logger = get_logger(__name__)
+
+MANIFEST_NAME = "index.manifest.json"
+
+
+@dataclass(frozen=True)
+class IndexShard:
+    """Persisted indexes of one document."""
+
+    doc_id: str
+    bm25: BM25Index
+    dense: FaissIndex | None
+    stamp: float
+
+    @classmethod
+    def from_manifest(cls, manifest_path: Path) -> IndexShard | None:
+        """Open the indexes a chunk manifest points to (None without BM25)."""
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+        bm25_path = manifest.get("bm25_index_path")
+        if not bm25_path or not Path(bm25_path).exists():
+            return None
+        dense: FaissIndex | None = None
+        dense_path = manifest.get("dense_index_path")
+        if dense_path and manifest.get("dense_dim"):
+            dense = make_dense_index(
+                int(manifest["dense_dim"]),
+                index_path=dense_path,
+                index_type=manifest.get("dense_index_type"),
+                params=manifest.get("dense_index_params"),
+            )
+        return cls(
+            doc_id=str(manifest.get("doc_id") or manifest_path.parent.name),
+            bm25=BM25Index.load(bm25_path),
+            dense=dense,
+            stamp=manifest_path.stat().st_mtime,
+        )
+
+    def search(
+        self,
+        query: str,
+        query_vec: list[float] | None,
+        alpha: float,
+        k: int,
+        stats: CorpusStats,
+    ) -> list[dict[str, Any]]:
+        """Return this shard's fused top-k, best first."""
+        dense = self.dense
+        if dense is None or query_vec is None or len(query_vec) != dense.dim:
+            dense, query_vec = None, None
+        hits = hybrid_search(
+            self.bm25,
+            dense,
+            query=query,
+            query_vec=query_vec,
+            alpha=alpha,
+            k=k,
+            sparse_stats=stats,
+        )
+        return [
+            {
+                "doc_id": self.doc_id,
+                "chunk_id": self.bm25.chunk_id(int(hit["id"])),
+                **hit,
+            }
+            for hit in hits
+        ]
+
+
+_SHARDS: dict[Path, IndexShard] = {}
+_SHARDS_LOCK = threading.Lock()
+
+
+def _manifest_paths(doc_ids: Iterable[str] | None) -> list[Path]:
+    root = get_settings().artifact_root_path
+    if doc_ids is None:
+        return sorted(root.glob(f"*/{MANIFEST_NAME}"))
+    paths = (root / doc_id / MANIFEST_NAME for doc_id in sorted(set(doc_ids)))
+    return [path for path in paths if path.exists()]
+
+
+def load_shards(doc_ids: Iterable[str] | None = None) -> list[IndexShard]:
+    """Return shards for *doc_ids* (all documents when None), cached by mtime."""
+    shards: list[IndexShard] = []
+    with _SHARDS_LOCK:
+        for path in _manifest_paths(doc_ids):
+            cached = _SHARDS.get(path)
+            if cached is None or cached.stamp != path.stat().st_mtime:
+                try:
+                    loaded = IndexShard.from_manifest(path)
+                except (OSError, ValueError) as exc:
+                    logger.warning(
+                        "corpus.shard.load_failed",
+                        extra={"path": str(path), "error": str(exc)},
+                    )
+                    continue
+                if loaded is None:
+                    continue
+                cached = _SHARDS[path] = loaded
+            shards.append(cached)
+    return shards
+
+
+def clear_shard_cache() -> None:
+    """Forget loaded shards (tests and re-chunked corpora)."""
+    with _SHARDS_LOCK:
+        _SHARDS.clear()
+
+
+def search_shards(
+    shards: list[IndexShard],
+    query: str,
+    query_vec: list[float] | None = None,
+    alpha: float = 0.5,
+    k: int = 10,
+    max_workers: int | None = None,
+) -> list[dict[str, Any]]:
+    """Fan *query* out over *shards* and merge their top-k lists."""
+    if not shards or k <= 0:
+        return []
+    stats = CorpusStats.merge(shard.bm25.stats(query) for shard in shards)
+    workers = min(max_workers or get_settings().corpus_search_workers, len(shards))
+    if workers <= 1:
+        per_shard = [
+            shard.search(query, query_vec, alpha, k, stats) for shard in shards
+        ]
+    else:
+        with ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="corpus"
+        ) as pool:
+            per_shard = list(
+                pool.map(
+                    lambda shard: shard.search(query, query_vec, alpha, k, stats),
+                    shards,
+                )
+            )
+    # Each list is sorted best first; ties keep shard (doc id) order.
+    merged = heapq.merge(*per_shard, key=lambda hit: -hit["score"])
+    hits = list(islice(merged, k))
+    logger.debug(
+        "corpus.search",
+        extra={"shards": len(shards), "docs": stats.docs, "hits": len(hits)},
+    )
+    return hits
+
+
+__all__ = [
+    "IndexShard",
+    "clear_shard_cache",
+    "load_shards",
+    "search_shards",
+]
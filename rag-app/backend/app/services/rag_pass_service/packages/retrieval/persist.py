@@ -0,0 +1,123 @@
+"""Persisted BM25 and dense indexes of a header chunks artifact.
+
+Indexing and embedding every chunk is the expensive part of a
+:class:`~.session.RetrievalSession`. Header joining saves the indexes next to
+``header_chunks.jsonl``, with a manifest using the keys chunking writes for
+UF chunks (``bm25_index_path``, ``dense_index_*``) plus a digest of the chunk
+texts and the embedding model. :func:`open_indexes` returns None unless both
+still match, so a stale or partial set of files is rebuilt, never used.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from pathlib import Path
+from typing import Any
+
+from backend.app.adapters import (
+    BM25Index,
+    FaissIndex,
+    make_dense_index,
+    sparse_format,
+    vector_format,
+    write_json,
+)
+from backend.app.util.logging import get_logger
+
+logger = get_logger(__name__)
+
+INDEX_MANIFEST_SUFFIX = ".index.manifest.json"
+
+
+def index_manifest_path(chunks_path: str | Path) -> Path:
+    """Return the manifest path of the indexes of a chunks artifact."""
+    path = Path(chunks_path)
+    return path.with_name(path.stem + INDEX_MANIFEST_SUFFIX)
+
+
+def _texts_digest(texts: list[str]) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    for text in texts:
+        digest.update(text.encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+def save_indexes(
+    chunks_path: str | Path,
+    texts: list[str],
+    bm25: BM25Index,
+    dense: FaissIndex | None,
+    embed_model: str,
+) -> Path:
+    """Write *bm25*, *dense* and their manifest next to *chunks_path*."""
+    target = index_manifest_path(chunks_path)
+    stem = Path(chunks_path).stem
+    bm25_path = target.with_name(f"{stem}.bm25.index.bin")
+    bm25.save_to(str(bm25_path))
+    manifest: dict[str, Any] = {
+        "chunk_count": len(texts),
+        "chunks_digest": _texts_digest(texts),
+        "bm25_index_path": str(bm25_path),
+        "bm25_index_format": sparse_format.FORMAT_NAME,
+        "bm25_index_version": sparse_format.FORMAT_VERSION,
+        "dense_index_path": None,
+        "dense_index_format": None,
+        "dense_index_version": None,
+        "dense_embed_model": embed_model,
+    }
+    if dense is not None:
+        dense_path = target.with_name(f"{stem}.vectors.bin")
+        dense.save_to(str(dense_path))
+        manifest["dense_index_path"] = str(dense_path)
+        manifest["dense_index_format"] = vector_format.FORMAT_NAME
+        manifest["dense_index_version"] = vector_format.FORMAT_VERSION
+        manifest["dense_index_type"] = dense.index_type
+        manifest["dense_index_params"] = dense.params
+        manifest["dense_dim"] = dense.dim
+    # Written last, so a manifest only ever names complete index files.
+    write_json(str(target), manifest)
+    return target
+
+
+def open_indexes(
+    chunks_path: str | Path, texts: list[str], embed_model: str
+) -> tuple[BM25Index, FaissIndex | None] | None:
+    """Load the saved indexes of *texts*, or None if absent or stale."""
+    path = index_manifest_path(chunks_path)
+    if not path.exists():
+        return None
+    try:
+        manifest = json.loads(path.read_text(encoding="utf-8"))
+        if (
+            manifest.get("chunks_digest") != _texts_digest(texts)
+            or manifest.get("dense_embed_model") != embed_model
+        ):
+            return None
+        bm25 = BM25Index.load(str(manifest["bm25_index_path"]))
+        dense: FaissIndex | None = None
+        if manifest.get("dense_index_path") and manifest.get("dense_dim"):
+            dense = make_dense_index(
+                int(manifest["dense_dim"]),
+                index_path=manifest["dense_index_path"],
+                index_type=manifest.get("dense_index_type"),
+                params=manifest.get("dense_index_params"),
+            )
+    except (OSError, ValueError, KeyError, TypeError) as exc:
+        logger.warning(
+            "retrieval.indexes.unreadable", extra={"path": str(path), "error": str(exc)}
+        )
+        return None
+    # A dense file that failed to load opens empty; treat it as stale.
+    if len(bm25) != len(texts) or (dense is not None and len(dense) != len(texts)):
+        return None
+    return bm25, dense
+
+
+__all__ = [
+    "INDEX_MANIFEST_SUFFIX",
+    "index_manifest_path",
+    "open_indexes",
+    "save_indexes",
+]
@@ -0,0 +1,214 @@
+"""Per-document retrieval state shared by every domain pass.
+
+Building the BM25 index, embedding every chunk and building the dense index
+are the expensive parts of hybrid retrieval and none of them depend on the
+domain being ranked. A :class:`RetrievalSession` does that work once for a
+document's chunks, takes the domain-independent rank features (flow,
+energy and graph scores) as columns precomputed at header time, and then
+ranks any number of domains against the same state. The async builder and
+ranker fetch chunk and query embeddings through ``LLMClient.embed_async``
+and keep the index work in a worker thread; given the chunks artifact, the
+builder opens the indexes saved with it (see :mod:`.persist`) instead.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from backend.app.adapters import (
+    BM25Index,
+    FaissIndex,
+    LLMClient,
+    hybrid_search_batch,
+    make_dense_index,
+)
+from backend.app.util.logging import get_logger, log_span
+
+from ..rank.features import PRIOR_WEIGHTS, RankFeatures
+from .persist import open_indexes, save_indexes
+
+logger = get_logger(__name__)
+
+_MAX_CANDIDATES = 12
+_ALPHA = 0.5
+
+
+def domain_query(domain: str) -> str:
+    """Return the retrieval query used for *domain*."""
+    return f"{domain} engineering insights"
+
+
+def ranking_signature(domain: str) -> dict[str, Any]:
+    """Return the ranking parameters that determine *domain*'s results."""
+    return {
+        "query": domain_query(domain),
+        "alpha": _ALPHA,
+        "candidates": _MAX_CANDIDATES,
+        "prior_weights": list(PRIOR_WEIGHTS),
+    }
+
+
+def _texts(chunks: list[dict[str, Any]]) -> list[str]:
+    return [str(chunk.get("text", "")) for chunk in chunks]
+
+
+class RetrievalSession:
+    """Indexes, embeddings and rank features built once for a chunk list."""
+
+    def __init__(
+        self,
+        chunks: list[dict[str, Any]],
+        client: LLMClient | None = None,
+        features: RankFeatures | None = None,
+        embeddings: list[list[float]] | None = None,
+        indexes: tuple[BM25Index, FaissIndex | None] | None = None,
+    ) -> None:
+        """Index and embed *chunks*, unless prebuilt *indexes* cover them."""
+        self.chunks = chunks
+        self.client = client or LLMClient()
+        self.features = (
+            features if features is not None else RankFeatures.compute(chunks)
+        )
+        self.bm25 = BM25Index()
+        self.dense: FaissIndex | None = None
+        self._query_vecs: dict[str, list[float]] = {}
+        self._lock = threading.Lock()
+        if indexes is not None:
+            self.bm25, self.dense = indexes
+            return
+        if not chunks:
+            return
+        with log_span(
+            "retrieval.session.build", logger=logger, extra={"chunks": len(chunks)}
+        ):
+            texts = _texts(chunks)
+            self.bm25.add(texts)
+            if embeddings is None:
+                embeddings = self.client.embed(texts)
+            if embeddings:
+                self.dense = make_dense_index(len(embeddings[0]))
+                self.dense.add(embeddings)
+
+    @classmethod
+    async def build_async(
+        cls,
+        chunks: list[dict[str, Any]],
+        client: LLMClient | None = None,
+        features: RankFeatures | None = None,
+        chunks_path: str | Path | None = None,
+    ) -> RetrievalSession:
+        """Build a session, embedding the chunks with ``embed_async``.
+
+        With *chunks_path*, indexes saved for the same chunk texts and
+        embedding model are opened rather than rebuilt.
+        """
+        client = client or LLMClient()
+        texts = _texts(chunks)
+        if chunks_path is not None and texts:
+            indexes = await asyncio.to_thread(
+                open_indexes, chunks_path, texts, client.embed_model
+            )
+            if indexes is not None:
+                logger.info(
+                    "retrieval.session.reused",
+                    extra={"chunks": len(texts), "path": str(chunks_path)},
+                )
+                return await asyncio.to_thread(
+                    cls, chunks, client, features, None, indexes
+                )
+        embeddings = await client.embed_async(texts) if texts else []
+        return await asyncio.to_thread(cls, chunks, client, features, embeddings)
+
+    def save(self, chunks_path: str | Path) -> Path:
+        """Save the indexes next to *chunks_path*; return their manifest."""
+        return save_indexes(
+            chunks_path,
+            _texts(self.chunks),
+            self.bm25,
+            self.dense,
+            self.client.embed_model,
+        )
+
+    def rank(self, domain: str) -> list[dict[str, Any]]:
+        """Rank the session's chunks for one *domain*."""
+        return self.rank_batch([domain])[domain]
+
+    def rank_batch(self, domains: list[str]) -> dict[str, list[dict[str, Any]]]:
+        """Rank the session's chunks for several domains in one scan."""
+        if not self.chunks:
+            return {domain: [] for domain in domains}
+        queries = [domain_query(domain) for domain in domains]
+        fused_batch = hybrid_search_batch(
+            self.bm25,
+            self.dense,
+            queries=queries,
+            query_vecs=self._embed_queries(queries),
+            alpha=_ALPHA,
+            k=min(len(self.chunks), _MAX_CANDIDATES),
+        )
+        return {
+            domain: self._rank(fused, domain)
+            for domain, fused in zip(domains, fused_batch, strict=True)
+        }
+
+    async def rank_batch_async(
+        self, domains: list[str]
+    ) -> dict[str, list[dict[str, Any]]]:
+        """Async :meth:`rank_batch`; query vectors come from ``embed_async``."""
+        queries = [domain_query(domain) for domain in domains]
+        if self.dense is not None and self.chunks:
+            with self._lock:
+                missing = [
+                    q for q in dict.fromkeys(queries) if q not in self._query_vecs
+                ]
+            if missing:
+                vectors = await self.client.embed_async(missing)
+                with self._lock:
+                    self._query_vecs.update(zip(missing, vectors, strict=True))
+        return await asyncio.to_thread(self.rank_batch, domains)
+
+    def _embed_queries(self, queries: list[str]) -> list[list[float]] | None:
+        if self.dense is None or not queries:
+            return None
+        with self._lock:
+            missing = [q for q in dict.fromkeys(queries) if q not in self._query_vecs]
+        if missing:
+            vectors = self.client.embed(missing)
+            with self._lock:
+                self._query_vecs.update(zip(missing, vectors, strict=True))
+        return [self._query_vecs[query] for query in queries]
+
+    def _rank(self, fused: list[dict[str, Any]], domain: str) -> list[dict[str, Any]]:
+        count = len(fused)
+        rows = np.fromiter((int(row["id"]) for row in fused), np.int64, count)
+        scores = np.fromiter(
+            (float(row.get("score", 0.0)) for row in fused), np.float64, count
+        )
+        totals = self.features.prior(rows, scores)
+        ranked: list[dict[str, Any]] = []
+        for position in np.argsort(-totals, kind="stable").tolist():
+            row = fused[position]
+            idx = int(rows[position])
+            chunk = dict(self.chunks[idx])
+            chunk["sparse_score"] = float(row.get("sparse", 0.0))
+            chunk["dense_score"] = float(row.get("dense", 0.0))
+            chunk["score"] = float(scores[position])
+            chunk["flow_score"] = float(self.features.flow[idx])
+            chunk["energy_score"] = float(self.features.energy[idx])
+            chunk["graph_score"] = float(self.features.graph[idx])
+            chunk["total_score"] = float(totals[position])
+            ranked.append(chunk)
+
+        logger.debug(
+            "retrieval.rank",
+            extra={"domain": domain, "candidates": len(ranked)},
+        )
+        return ranked
+
+
+__all__ = ["RetrievalSession", "domain_query", "ranking_signature"]
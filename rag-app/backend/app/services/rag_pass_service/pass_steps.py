@@ -0,0 +1,288 @@
+"""Steps shared by the batch and streaming pass controllers.
+
+Both controllers validate the request, plan which passes to run or reuse,
+compose each pass's context and prompt, and commit the pass manifest and
+stage audit the same way; only how the LLM is called differs.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Protocol
+
+from pydantic import BaseModel, Field
+from pydantic import ValidationError as PydanticValidationError
+
+from backend.app.adapters import LLMClient, read_jsonl, write_json
+from backend.app.config import get_settings
+from backend.app.contracts.passes import PassResult
+from backend.app.util.audit import stage_record
+from backend.app.util.errors import AppError, NotFoundError, ValidationError
+from backend.app.util.logging import get_logger
+
+from .packages.compose.context import compose_window
+from .packages.emit.manifest import PassManifestWriter, read_pass_manifest
+from .packages.prompts import (
+    ControlsPrompt,
+    ElectricalPrompt,
+    MechanicalPrompt,
+    ProjectManagementPrompt,
+    SoftwarePrompt,
+)
+from .packages.retrieval import ranking_signature
+
+logger = get_logger(__name__)
+
+_CONTEXT_BUDGET = 400
+
+
+class PromptTemplate(Protocol):
+    """Protocol describing prompt renderers."""
+
+    def render(self, context: str) -> tuple[str, str]: ...
+
+
+class PassJobsInternal(BaseModel):
+    """Internal pass job bundle."""
+
+    doc_id: str
+    manifest_path: str
+    passes: dict[str, str]
+    failures: dict[str, str] = Field(default_factory=dict)
+    reused: list[str] = Field(default_factory=list)
+
+
+def validate_inputs(doc_id: str, rechunk_artifact: str) -> Path:
+    """Return the header chunks path, rejecting a blank *doc_id*."""
+    if not doc_id or not doc_id.strip():
+        raise ValidationError("doc_id is required for pass execution")
+    path = Path(rechunk_artifact)
+    if not path.exists():
+        raise NotFoundError(f"header chunks artifact missing: {rechunk_artifact}")
+    return path
+
+
+def load_chunks(path: Path) -> list[dict[str, Any]]:
+    """Read header chunks, filling the fields retrieval expects."""
+    chunks = read_jsonl(str(path))
+    if not chunks:
+        raise ValidationError("header chunks artifact empty")
+    for index, chunk in enumerate(chunks):
+        chunk.setdefault("chunk_id", chunk.get("id") or f"{index}")
+        chunk.setdefault("header_path", chunk.get("header_path") or chunk.get("header"))
+        chunk.setdefault("sentence_start", chunk.get("sentence_start", 0))
+        chunk.setdefault("sentence_end", chunk.get("sentence_end", 0))
+    return chunks
+
+
+def _build_prompts() -> dict[str, PromptTemplate]:
+    return {
+        "mechanical": MechanicalPrompt(),
+        "electrical": ElectricalPrompt(),
+        "software": SoftwarePrompt(),
+        "controls": ControlsPrompt(),
+        "project_mgmt": ProjectManagementPrompt(),
+    }
+
+
+def compose_pass(
+    prompt: PromptTemplate, ranked: list[dict[str, Any]]
+) -> tuple[str, str, str]:
+    """Return the context window, system prompt and user prompt of a pass."""
+    context = compose_window(
+        ranked, budget_tokens=_CONTEXT_BUDGET, packing=get_settings().context_packing
+    )
+    system, user = prompt.render(context)
+    return context, system, user
+
+
+@dataclass
+class PassPlan:
+    """Passes selected for a run, split into those to execute and reuse."""
+
+    names: list[str]
+    prompts: dict[str, PromptTemplate]
+    fingerprints: dict[str, str]
+    reused: dict[str, str] = field(default_factory=dict)
+
+
+def _select_prompts(passes: list[str] | None) -> dict[str, PromptTemplate]:
+    prompts = _build_prompts()
+    if passes is None:
+        return prompts
+    unknown = sorted(set(passes) - set(prompts))
+    if unknown:
+        raise ValidationError(f"unknown passes: {', '.join(unknown)}")
+    if not passes:
+        raise ValidationError("at least one pass must be selected")
+    return {name: prompt for name, prompt in prompts.items() if name in passes}
+
+
+def _fingerprint(
+    chunks_digest: str, name: str, prompt: PromptTemplate, model: str
+) -> str:
+    settings = get_settings()
+    system, user = prompt.render("{context}")
+    payload = {
+        "chunks": chunks_digest,
+        "prompt": {"system": system, "user": user},
+        "model": model,
+        "budget": {
+            "tokens": _CONTEXT_BUDGET,
+            "packing": settings.context_packing,
+            "tokenizer": settings.context_tokenizer,
+        },
+        "ranking": ranking_signature(name),
+    }
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def _reusable_result(artifact: str, name: str) -> bool:
+    try:
+        result = PassResult.model_validate_json(Path(artifact).read_bytes())
+    except (OSError, PydanticValidationError):
+        return False
+    return result.pass_name == name
+
+
+def plan_passes(
+    doc_id: str,
+    path: Path,
+    llm: LLMClient,
+    *,
+    passes: list[str] | None,
+    force: bool,
+) -> PassPlan:
+    """Fingerprint the selected passes and find results that can be reused."""
+
+    selected = _select_prompts(passes)
+    chunks_digest = hashlib.sha256(path.read_bytes()).hexdigest()
+    fingerprints = {
+        name: _fingerprint(chunks_digest, name, prompt, llm.model)
+        for name, prompt in selected.items()
+    }
+    reused: dict[str, str] = {}
+    if not force:
+        manifest = read_pass_manifest(doc_id)
+        for name, fingerprint in fingerprints.items():
+            artifact = manifest.passes.get(name)
+            if (
+                artifact
+                and manifest.fingerprints.get(name) == fingerprint
+                and _reusable_result(artifact, name)
+            ):
+                reused[name] = artifact
+    if reused:
+        logger.info("passes.reused", extra={"doc_id": doc_id, "passes": list(reused)})
+    return PassPlan(
+        names=list(selected),
+        prompts={n: p for n, p in selected.items() if n not in reused},
+        fingerprints=fingerprints,
+        reused=reused,
+    )
+
+
+def record_failure(
+    writer: PassManifestWriter, doc_id: str, name: str, exc: Exception
+) -> None:
+    """Record and log the failure of pass *name*."""
+    writer.fail(name, f"{type(exc).__name__}: {exc}")
+    logger.error(
+        "passes.pass_failed",
+        extra={
+            "doc_id": doc_id,
+            "pass": name,
+            "error": str(exc),
+            "type": type(exc).__name__,
+        },
+    )
+
+
+def finalize_run(
+    doc_id: str,
+    names: list[str],
+    writer: PassManifestWriter,
+    *,
+    reused: list[str] | None = None,
+    stage: str,
+    stage_start: float,
+) -> PassJobsInternal:
+    """Commit the pass manifest and write the stage audit.
+
+    Raises :class:`AppError` when no pass of the run succeeded. *reused*
+    names passes whose persisted results were kept instead of re-executed.
+    """
+
+    manifests = {name: writer.passes[name] for name in names if name in writer.passes}
+    failures = {
+        name: writer.failures[name] for name in names if name in writer.failures
+    }
+    writer.commit(names)
+    manifest_path = writer.path
+
+    reused = reused or []
+    logger.info(
+        f"{stage}.success" if not failures else f"{stage}.partial",
+        extra={
+            "doc_id": doc_id,
+            "passes": len(manifests),
+            "reused": len(reused),
+            "failed": len(failures),
+        },
+    )
+
+    audit_path = manifest_path.with_name("passes.audit.json")
+    audit_payload = stage_record(
+        stage=stage,
+        status="ok" if not failures else "partial",
+        doc_id=doc_id,
+        passes=len(manifests),
+        reused=reused,
+        failures=failures,
+        duration_ms=(time.perf_counter() - stage_start) * 1000.0,
+    )
+    write_json(str(audit_path), audit_payload)
+    if not manifests:
+        raise AppError(f"all {len(failures)} passes failed for {doc_id}")
+
+    return PassJobsInternal(
+        doc_id=doc_id,
+        manifest_path=str(manifest_path),
+        passes=manifests,
+        failures=failures,
+        reused=reused,
+    )
+
+
+def handle_pass_errors(e: Exception) -> None:
+    """Normalize and raise rag pass errors."""
+
+    if isinstance(e, ValidationError):
+        logger.warning("passes.validation_failed", extra={"error": str(e)})
+        raise
+    if isinstance(e, NotFoundError):
+        logger.error("passes.artifact_missing", extra={"error": str(e)})
+        raise
+    if isinstance(e, AppError):
+        raise
+    logger.error("passes.unexpected", extra={"error": str(e), "type": type(e).__name__})
+    raise AppError("pass execution failed") from e
+
+
+__all__ = [
+    "PassJobsInternal",
+    "PassPlan",
+    "PromptTemplate",
+    "compose_pass",
+    "finalize_run",
+    "handle_pass_errors",
+    "load_chunks",
+    "plan_passes",
+    "record_failure",
+    "validate_inputs",
+]
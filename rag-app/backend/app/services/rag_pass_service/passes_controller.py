@@ -2,145 +2,149 @@
 
 from __future__ import annotations
 
+import asyncio
 import time
 from pathlib import Path
-from typing import Any, Protocol
+from typing import Any
 
-from pydantic import BaseModel
-
-from backend.app.adapters import LLMClient, read_jsonl, write_json
+from backend.app.adapters import LLMClient
 from backend.app.config import get_settings
-from backend.app.contracts.passes import PassManifest
-from backend.app.util.audit import stage_record
-from backend.app.util.errors import AppError, NotFoundError, ValidationError
 from backend.app.util.logging import get_logger, log_span
 
-from .packages.compose.context import compose_window
+from .packages.emit.manifest import PassManifestWriter
 from .packages.emit.results import write_pass_results
-from .packages.prompts import (
-    ControlsPrompt,
-    ElectricalPrompt,
-    MechanicalPrompt,
-    ProjectManagementPrompt,
-    SoftwarePrompt,
+from .packages.rank import load_rank_features
+from .packages.retrieval import RetrievalSession
+from .pass_steps import (
+    PassJobsInternal,
+    PassPlan,
+    PromptTemplate,
+    compose_pass,
+    finalize_run,
+    handle_pass_errors,
+    load_chunks,
+    plan_passes,
+    record_failure,
+    validate_inputs,
 )
-from .packages.retrieval import retrieve_ranked
 
 logger = get_logger(__name__)
 
 
-class PromptTemplate(Protocol):
-    """Protocol describing prompt renderers."""
-
-    def render(self, context: str) -> tuple[str, str]: ...
-
-
-class PassJobsInternal(BaseModel):
-    """Internal pass job bundle."""
-
-    doc_id: str
-    manifest_path: str
-    passes: dict[str, str]
-
-
-def _validate_inputs(doc_id: str, rechunk_artifact: str) -> Path:
-    if not doc_id or not doc_id.strip():
-        raise ValidationError("doc_id is required for pass execution")
-    path = Path(rechunk_artifact)
-    if not path.exists():
-        raise NotFoundError(f"header chunks artifact missing: {rechunk_artifact}")
-    return path
-
-
-def _load_chunks(path: Path) -> list[dict[str, Any]]:
-    chunks = read_jsonl(str(path))
-    if not chunks:
-        raise ValidationError("header chunks artifact empty")
-    for index, chunk in enumerate(chunks):
-        chunk.setdefault("chunk_id", chunk.get("id") or f"{index}")
-        chunk.setdefault("header_path", chunk.get("header_path") or chunk.get("header"))
-        chunk.setdefault("sentence_start", chunk.get("sentence_start", 0))
-        chunk.setdefault("sentence_end", chunk.get("sentence_end", 0))
-    return chunks
-
-
-def run_all(doc_id: str, rechunk_artifact: str) -> PassJobsInternal:
-    """Retrieve, compose context, LLM calls, emit results."""
-
-    path = _validate_inputs(doc_id, rechunk_artifact)
+async def _run_pass(
+    llm: LLMClient,
+    doc_id: str,
+    name: str,
+    prompt: PromptTemplate,
+    ranked: list[dict[str, Any]],
+) -> str:
+    context, system, user = compose_pass(prompt, ranked)
+    completion = await llm.chat_async(system=system, user=user, context=context)
+    completion["context"] = context
+    completion["prompt"] = {"system": system, "user": user}
+    return await asyncio.to_thread(write_pass_results, doc_id, name, completion, ranked)
+
+
+def run_all(
+    doc_id: str,
+    rechunk_artifact: str,
+    *,
+    passes: list[str] | None = None,
+    force: bool = False,
+) -> PassJobsInternal:
+    """Blocking :func:`run_all_async` for callers outside an event loop."""
+
+    return asyncio.run(
+        run_all_async(doc_id, rechunk_artifact, passes=passes, force=force)
+    )
+
+
+async def run_all_async(
+    doc_id: str,
+    rechunk_artifact: str,
+    *,
+    passes: list[str] | None = None,
+    force: bool = False,
+) -> PassJobsInternal:
+    """Retrieve, compose context, LLM calls, emit results.
+
+    Only the passes named in *passes* run (all of them by default). A pass
+    whose input fingerprint matches the one recorded in the manifest reuses
+    its persisted result unless *force* is set. Passes call the LLM through
+    the async client, at most ``LLM_BATCH_SIZE`` at a time.
+    """
+
+    path = validate_inputs(doc_id, rechunk_artifact)
     stage_start = time.perf_counter()
     try:
         settings = get_settings()
-        chunks = _load_chunks(path)
-        prompts: dict[str, PromptTemplate] = {
-            "mechanical": MechanicalPrompt(),
-            "electrical": ElectricalPrompt(),
-            "software": SoftwarePrompt(),
-            "controls": ControlsPrompt(),
-            "project_mgmt": ProjectManagementPrompt(),
-        }
         llm = LLMClient()
-        manifests: dict[str, str] = {}
+        plan = await asyncio.to_thread(
+            plan_passes, doc_id, path, llm, passes=passes, force=force
+        )
+        writer = PassManifestWriter(doc_id)
+        for name, artifact in plan.reused.items():
+            writer.record(name, artifact, plan.fingerprints[name])
+        workers = max(min(settings.llm_batch_size, len(plan.prompts)), 1)
         with log_span(
             "passes.run_all",
             logger=logger,
-            extra={"doc_id": doc_id, "prompt_count": len(prompts)},
+            extra={
+                "doc_id": doc_id,
+                "prompt_count": len(plan.prompts),
+                "reused": len(plan.reused),
+                "workers": workers,
+            },
         ) as span_meta:
-            for name, prompt in prompts.items():
-                ranked = retrieve_ranked(chunks, domain=name)
-                context = compose_window(ranked, budget_tokens=400)
-                system, user = prompt.render(context)
-                completion = llm.chat(system=system, user=user, context=context)
-                completion["context"] = context
-                completion["prompt"] = {"system": system, "user": user}
-                artifact = write_pass_results(doc_id, name, completion, ranked)
-                manifests[name] = artifact
-            span_meta["passes"] = len(manifests)
-
-        manifest_path = (
-            Path(settings.artifact_root_path) / doc_id / "passes" / "manifest.json"
-        )
-        payload = PassManifest(doc_id=doc_id, passes=manifests)
-        write_json(str(manifest_path), payload.model_dump())
-
-        logger.info(
-            "passes.run_all.success",
-            extra={"doc_id": doc_id, "passes": len(manifests)},
-        )
-
-        audit_path = manifest_path.with_name("passes.audit.json")
-        audit_payload = stage_record(
+            if plan.prompts:
+                await _execute(doc_id, path, llm, plan, writer, workers)
+            span_meta["passes"] = len(writer.passes)
+            span_meta["failed"] = len(writer.failures)
+
+        return await asyncio.to_thread(
+            finalize_run,
+            doc_id,
+            plan.names,
+            writer,
+            reused=list(plan.reused),
             stage="passes.run_all",
-            status="ok",
-            doc_id=doc_id,
-            passes=len(manifests),
-            duration_ms=(time.perf_counter() - stage_start) * 1000.0,
-        )
-        write_json(str(audit_path), audit_payload)
-
-        return PassJobsInternal(
-            doc_id=doc_id,
-            manifest_path=str(manifest_path),
-            passes=manifests,
+            stage_start=stage_start,
         )
     except Exception as exc:  # noqa: BLE001
         handle_pass_errors(exc)
         raise
 
 
-def handle_pass_errors(e: Exception) -> None:
-    """Normalize and raise rag pass errors."""
-
-    if isinstance(e, ValidationError):
-        logger.warning("passes.validation_failed", extra={"error": str(e)})
-        raise
-    if isinstance(e, NotFoundError):
-        logger.error("passes.artifact_missing", extra={"error": str(e)})
-        raise
-    if isinstance(e, AppError):
-        raise
-    logger.error("passes.unexpected", extra={"error": str(e), "type": type(e).__name__})
-    raise AppError("pass execution failed") from e
-
-
-__all__ = ["PassJobsInternal", "run_all", "handle_pass_errors"]
+async def _execute(
+    doc_id: str,
+    path: Path,
+    llm: LLMClient,
+    plan: PassPlan,
+    writer: PassManifestWriter,
+    workers: int,
+) -> None:
+    chunks = await asyncio.to_thread(load_chunks, path)
+    features = await asyncio.to_thread(load_rank_features, path, chunks)
+    session = await RetrievalSession.build_async(
+        chunks, llm, features, chunks_path=path
+    )
+    ranked_by_domain = await session.rank_batch_async(list(plan.prompts))
+    # Upstream calls also queue for the HTTP pool's per-loop slots; this only
+    # caps how many passes of one run are in flight.
+    limit = asyncio.Semaphore(workers)
+
+    async def run_pass(name: str, prompt: PromptTemplate) -> None:
+        async with limit:
+            try:
+                artifact = await _run_pass(
+                    llm, doc_id, name, prompt, ranked_by_domain[name]
+                )
+            except Exception as exc:  # noqa: BLE001
+                record_failure(writer, doc_id, name, exc)
+                return
+        writer.record(name, artifact, plan.fingerprints[name])
+
+    await asyncio.gather(*(run_pass(n, p) for n, p in plan.prompts.items()))
+
+
+__all__ = ["PassJobsInternal", "run_all", "run_all_async", "handle_pass_errors"]
@@ -0,0 +1,263 @@
+"""Controller streaming pass answers as they are generated."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections.abc import AsyncIterator
+from pathlib import Path
+from typing import Any
+
+from pydantic import BaseModel, Field
+
+from backend.app.adapters import LLMClient
+from backend.app.config import get_settings
+from backend.app.util.errors import AppError
+from backend.app.util.logging import get_logger
+
+from .packages.emit.manifest import PassManifestWriter
+from .packages.emit.results import write_pass_results
+from .packages.rank import RankFeatures, load_rank_features
+from .packages.retrieval import RetrievalSession
+from .pass_steps import (
+    PassPlan,
+    PromptTemplate,
+    compose_pass,
+    finalize_run,
+    handle_pass_errors,
+    load_chunks,
+    plan_passes,
+    record_failure,
+    validate_inputs,
+)
+
+logger = get_logger(__name__)
+
+
+class PassStreamEventInternal(BaseModel):
+    """One server-sent event of a streamed pass run."""
+
+    event: str
+    data: dict[str, Any] = Field(default_factory=dict)
+
+
+def stream_all(
+    doc_id: str,
+    rechunk_artifact: str,
+    *,
+    passes: list[str] | None = None,
+    force: bool = False,
+) -> AsyncIterator[PassStreamEventInternal]:
+    """Validate inputs eagerly and return the event stream of the passes.
+
+    Events are ``start``, then interleaved ``delta`` (one text fragment of a
+    pass answer), ``pass_complete`` (with the persisted artifact and the
+    pass's time to first token; ``ttft_source`` is ``replay`` when the
+    offline client replays a finished answer rather than streaming it) or
+    ``pass_error``, and finally ``done`` with
+    the pass manifest, or ``error`` when no pass succeeded. Passes reused
+    from an earlier run (see :func:`run_all`) complete right after ``start``
+    with ``reused`` set and no deltas. If ranking fails the stream is a
+    single ``error`` event; if it ends early (for example when the client
+    disconnects) the passes finished so far are still committed.
+    """
+
+    stage_start = time.perf_counter()
+    try:
+        path = validate_inputs(doc_id, rechunk_artifact)
+        llm = LLMClient()
+        plan = plan_passes(doc_id, path, llm, passes=passes, force=force)
+        chunks = load_chunks(path) if plan.prompts else []
+        features = load_rank_features(path, chunks) if plan.prompts else None
+    except Exception as exc:  # noqa: BLE001
+        handle_pass_errors(exc)
+        raise
+    return _stream(doc_id, path, llm, plan, chunks, features, stage_start)
+
+
+async def _rank(
+    path: Path,
+    llm: LLMClient,
+    plan: PassPlan,
+    chunks: list[dict[str, Any]],
+    features: RankFeatures | None,
+) -> dict[str, list[dict[str, Any]]]:
+    if not plan.prompts:
+        return {}
+    session = await RetrievalSession.build_async(
+        chunks, llm, features, chunks_path=path
+    )
+    return await session.rank_batch_async(list(plan.prompts))
+
+
+def _commit_partial(
+    doc_id: str, plan: PassPlan, writer: PassManifestWriter, stage_start: float
+) -> None:
+    """Record the passes that finished before the stream ended early."""
+
+    names = [n for n in plan.names if n in writer.passes or n in writer.failures]
+    try:
+        finalize_run(
+            doc_id,
+            names,
+            writer,
+            reused=list(plan.reused),
+            stage="passes.stream",
+            stage_start=stage_start,
+        )
+    except AppError:
+        pass  # the audit already records that every pass failed
+
+
+async def _stream(
+    doc_id: str,
+    path: Path,
+    llm: LLMClient,
+    plan: PassPlan,
+    chunks: list[dict[str, Any]],
+    features: RankFeatures | None,
+    stage_start: float,
+) -> AsyncIterator[PassStreamEventInternal]:
+    writer = PassManifestWriter(doc_id)
+    for name, artifact in plan.reused.items():
+        writer.record(name, artifact, plan.fingerprints[name])
+    finalized = False
+    try:
+        try:
+            ranked_by_domain = await _rank(path, llm, plan, chunks, features)
+        except Exception as exc:  # noqa: BLE001
+            for name in plan.prompts:
+                record_failure(writer, doc_id, name, exc)
+            yield PassStreamEventInternal(
+                event="error",
+                data={
+                    "error": f"{type(exc).__name__}: {exc}",
+                    "failures": writer.failures,
+                },
+            )
+            return
+        yield PassStreamEventInternal(
+            event="start",
+            data={"doc_id": doc_id, "passes": plan.names, "reused": list(plan.reused)},
+        )
+        for name, artifact in plan.reused.items():
+            yield PassStreamEventInternal(
+                event="pass_complete",
+                data={"pass": name, "artifact": artifact, "reused": True},
+            )
+
+        queue: asyncio.Queue[PassStreamEventInternal | None] = asyncio.Queue()
+        runner = asyncio.create_task(
+            _run_passes(doc_id, llm, plan, ranked_by_domain, writer, queue)
+        )
+        try:
+            while (event := await queue.get()) is not None:
+                yield event
+        finally:
+            if not runner.done():
+                runner.cancel()
+        await runner
+
+        finalized = True
+        try:
+            jobs = await asyncio.to_thread(
+                finalize_run,
+                doc_id,
+                plan.names,
+                writer,
+                reused=list(plan.reused),
+                stage="passes.stream",
+                stage_start=stage_start,
+            )
+        except AppError as exc:
+            yield PassStreamEventInternal(
+                event="error", data={"error": str(exc), "failures": writer.failures}
+            )
+            return
+        yield PassStreamEventInternal(event="done", data=jobs.model_dump())
+    finally:
+        if not finalized:
+            # The manifest and audit writes block; keep them off the loop.
+            await asyncio.to_thread(_commit_partial, doc_id, plan, writer, stage_start)
+
+
+async def _run_passes(
+    doc_id: str,
+    llm: LLMClient,
+    plan: PassPlan,
+    ranked_by_domain: dict[str, list[dict[str, Any]]],
+    writer: PassManifestWriter,
+    queue: asyncio.Queue[PassStreamEventInternal | None],
+) -> None:
+    limit = asyncio.Semaphore(get_settings().llm_batch_size)
+
+    async def run_pass(name: str, prompt: PromptTemplate) -> None:
+        ranked = ranked_by_domain[name]
+        async with limit:
+            started = time.perf_counter()
+            ttft_ms: float | None = None
+            ttft_source: str | None = None
+            try:
+                context, system, user = compose_pass(prompt, ranked)
+                completion: dict[str, Any] = {}
+                async for item in llm.chat_stream(
+                    system=system, user=user, context=context
+                ):
+                    if item["type"] == "done":
+                        completion = dict(item["completion"])
+                        continue
+                    if ttft_ms is None:
+                        ttft_ms = round((time.perf_counter() - started) * 1000.0, 3)
+                        ttft_source = "replay" if item.get("replayed") else "stream"
+                        logger.info(
+                            "passes.stream.first_token",
+                            extra={
+                                "doc_id": doc_id,
+                                "pass": name,
+                                "ttft_ms": ttft_ms,
+                                "ttft_source": ttft_source,
+                            },
+                        )
+                    await queue.put(
+                        PassStreamEventInternal(
+                            event="delta", data={"pass": name, "text": item["text"]}
+                        )
+                    )
+                completion["context"] = context
+                completion["prompt"] = {"system": system, "user": user}
+                artifact = await asyncio.to_thread(
+                    write_pass_results, doc_id, name, completion, ranked
+                )
+                writer.record(name, artifact, plan.fingerprints[name])
+            except Exception as exc:  # noqa: BLE001
+                record_failure(writer, doc_id, name, exc)
+                await queue.put(
+                    PassStreamEventInternal(
+                        event="pass_error",
+                        data={"pass": name, "error": writer.failures[name]},
+                    )
+                )
+                return
+        await queue.put(
+            PassStreamEventInternal(
+                event="pass_complete",
+                data={
+                    "pass": name,
+                    "artifact": writer.passes[name],
+                    "reused": False,
+                    "ttft_ms": ttft_ms,
+                    "ttft_source": ttft_source,
+                    "duration_ms": round((time.perf_counter() - started) * 1000.0, 3),
+                },
+            )
+        )
+
+    try:
+        await asyncio.gather(
+            *(run_pass(name, prompt) for name, prompt in plan.prompts.items())
+        )
+    finally:
+        await queue.put(None)
+
+
+__all__ = ["PassStreamEventInternal", "stream_all"]
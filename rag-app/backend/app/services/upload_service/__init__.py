@@ -7,6 +7,7 @@ from .main import (
     get_document_headers,
     get_document_status,
     handle_upload,
+    list_document_ids,
 )
 
 __all__ = [
@@ -16,4 +17,5 @@ __all__ = [
     "handle_upload",
     "get_document_status",
     "get_document_headers",
+    "list_document_ids",
 ]
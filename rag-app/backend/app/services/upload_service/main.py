@@ -16,6 +16,7 @@ from .upload_controller import (
     ensure_normalized as controller_ensure_normalized,
     get_headers as controller_get_headers,
     get_status as controller_get_status,
+    list_records as controller_list_records,
     process_upload as controller_process_upload,
 )
 
@@ -164,6 +165,12 @@ def get_document_status(doc_id: str) -> dict[str, Any]:
     return payload
 
 
+def list_document_ids(project_id: str | None = None) -> list[str]:
+    """Return ids of uploaded documents, optionally filtered by project."""
+
+    return [record.doc_id for record in controller_list_records(project_id)]
+
+
 def get_document_headers(doc_id: str) -> dict[str, Any]:
     """Return headers tree artifact."""
 
@@ -177,4 +184,5 @@ __all__ = [
     "handle_upload",
     "get_document_status",
     "get_document_headers",
+    "list_document_ids",
 ]
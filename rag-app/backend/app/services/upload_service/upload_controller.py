@@ -1100,6 +1100,26 @@ def get_status(doc_id: str) -> UploadRecord:
     return record
 
 
+def list_records(project_id: str | None = None) -> list[UploadRecord]:
+    """Return stored upload records, optionally limited to one project."""
+
+    settings = get_settings()
+    final_dir = _flatten_app_path(settings.upload_storage_final)
+    if not final_dir.exists():
+        return []
+    records: list[UploadRecord] = []
+    for doc_dir in sorted(final_dir.iterdir()):
+        if not doc_dir.is_dir():
+            continue
+        record = _load_record(doc_dir)
+        if record is None:
+            continue
+        if project_id is not None and record.project_id != project_id:
+            continue
+        records.append(record)
+    return records
+
+
 def get_headers(doc_id: str) -> dict[str, Any]:
     """Load headers tree artifact for a document."""
 
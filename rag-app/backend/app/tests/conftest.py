@@ -12,6 +12,7 @@ from typing import TextIO
 import pytest
 
 from backend.app.config import get_settings
+from backend.app.llm.clients import get_http_pool, get_rate_limiter
 from backend.app.util.logging import get_logger
 
 FIXTURE_ROOT = Path(__file__).resolve().parent / "data"
@@ -63,6 +64,8 @@ def _apply_offline_settings(
     get_settings.cache_clear()
     yield
     get_settings.cache_clear()
+    get_http_pool().close()
+    get_rate_limiter().reset()
 
 
 @pytest.fixture(autouse=True)
@@ -0,0 +1,76 @@
+"""Tests for the shared text analyzer."""
+
+from __future__ import annotations
+
+import zlib
+
+import pytest
+
+from ...adapters.analyzer import Analyzer
+from ...adapters.tokenizer import get_token_counter
+from ...adapters.vectors import BM25Index
+from ...services.chunk_service.packages.index.local_vss import _hash_embed
+from ...services.rag_pass_service.packages.compose.context import compose_window
+
+
+def test_analyzer_caches_by_content_and_interns_terms() -> None:
+    analyzer = Analyzer(cache_size=2)
+    first = analyzer.token_ids("Pump, PUMP pressure!")
+    assert analyzer.terms("Pump, PUMP pressure!") == ("pump", "pump", "pressure")
+    assert first[0] == first[1]
+    assert (analyzer.hits, analyzer.misses) == (1, 1)
+    assert not first.flags.writeable
+
+    other = analyzer.terms("pressure pump")
+    assert other[0] is analyzer.terms("Pump, PUMP pressure!")[2]
+    analyzer.count("a")
+    analyzer.count("b")
+    assert analyzer.count("Pump, PUMP pressure!") == 3
+    assert analyzer.misses == 5, "oldest entries are evicted past the cap"
+
+
+def test_analyzer_vocabulary_is_capped() -> None:
+    analyzer = Analyzer(cache_size=8, max_terms=3)
+    hashes = analyzer.token_hashes("pump valve")
+    first = analyzer.vocabulary
+    assert analyzer.count("pump valve") == 2 and analyzer.hits == 1
+
+    assert analyzer.terms("seat pump gasket") == ("seat", "pump", "gasket")
+    assert analyzer.rotations == 1
+    assert analyzer.vocabulary is not first and len(analyzer.vocabulary) == 0
+    assert (
+        analyzer.count("pump valve") == 2 and analyzer.misses == 3
+    ), "analyses holding retired ids are dropped"
+    assert analyzer.token_hashes("pump valve").tolist() == hashes.tolist()
+
+
+def test_hash_embed_is_stable_across_processes() -> None:
+    vector = _hash_embed("valve valve seat")
+    buckets = {
+        term: zlib.crc32(term.encode("utf-8")) % len(vector)
+        for term in ("valve", "seat")
+    }
+    expected = [0.0] * len(vector)
+    expected[buckets["valve"]] += 2.0
+    expected[buckets["seat"]] += 1.0
+    norm = sum(value * value for value in expected) ** 0.5
+    assert vector == pytest.approx([value / norm for value in expected])
+    assert _hash_embed("...") == [0.0] * len(vector)
+
+
+def test_bm25_tokenization_and_context_token_budget() -> None:
+    index = BM25Index()
+    index.add(["relief-valve, setpoint.", "pump curve"])
+    assert [row for row, _ in index.search("Valve setpoint?")] == [0]
+
+    chunks = [
+        {"chunk_id": "a", "text": "one, two; three"},
+        {"chunk_id": "b", "text": "four five"},
+    ]
+    # Context budgets are spent in model tokens, separators included.
+    counter = get_token_counter()
+    first = counter.count("one, two; three")
+    both = first + counter.count("\n\n") + counter.count("four five")
+    assert compose_window(chunks, budget_tokens=first) == "one, two; three"
+    assert compose_window(chunks, budget_tokens=both - 1) == "one, two; three"
+    assert compose_window(chunks, budget_tokens=both) == "one, two; three\n\nfour five"
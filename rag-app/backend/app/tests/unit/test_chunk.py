@@ -5,6 +5,8 @@ from pathlib import Path
 
 import pytest
 
+from ...adapters.sparse_format import is_sparse_file
+from ...adapters.vector_format import is_vector_file
 from ...adapters.vectors import BM25Index, FaissIndex, hybrid_search
 from ...config import get_settings
 from ...services.chunk_service import ChunkResult, run_uf_chunking
@@ -41,6 +43,12 @@ def test_uf_chunk_pipeline(
     assert chunks_path.exists(), "uf_chunks.jsonl should be written"
     assert manifest_path.exists(), "index manifest should exist"
     assert audit_path.exists(), "chunk audit record should exist"
+    index_manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    assert index_manifest["dense_index_format"] == "fluidrag-f32"
+    assert index_manifest["dense_index_version"] == 1
+    assert is_vector_file(index_manifest["dense_index_path"])
+    assert index_manifest["bm25_index_format"] == "fluidrag-bm25"
+    assert is_sparse_file(index_manifest["bm25_index_path"])
 
     rows = [
         json.loads(line)
@@ -48,6 +56,9 @@ def test_uf_chunk_pipeline(
         if line
     ]
     assert len(rows) >= 2, "chunking should produce multiple segments for long text"
+    bm25 = BM25Index.load(index_manifest["bm25_index_path"])
+    assert len(bm25) == len(rows) == index_manifest["bm25_docs"]
+    assert bm25.chunk_id(0) == rows[0]["chunk_id"]
     assert rows[0]["sentence_start"] == 0
     assert rows[0]["sentence_end"] >= rows[0]["sentence_start"]
     assert (
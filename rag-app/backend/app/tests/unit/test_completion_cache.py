@@ -0,0 +1,196 @@
+"""Tests for the completion cache and request coalescing."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+import pytest
+from fastapi.testclient import TestClient
+
+from ...adapters import LLMClient
+from ...adapters.completion_cache import CompletionCache
+from ...main import create_app
+
+
+def test_completion_cache_ttl_lru_and_temperature(tmp_path: Path) -> None:
+    now = [1000.0]
+    cache = CompletionCache(
+        tmp_path / "c.sqlite3", max_entries=2, ttl_seconds=60.0, clock=lambda: now[0]
+    )
+    calls: list[str] = []
+
+    def fetch(name: str) -> Any:
+        def _fetch() -> dict[str, Any]:
+            calls.append(name)
+            return {"content": name}
+
+        return _fetch
+
+    params = {"temperature": 0.0}
+    assert cache.complete("m", "a", params, fetch("a")) == {"content": "a"}
+    assert cache.complete("m", "a", params, fetch("a")) == {"content": "a"}
+    cache.complete("m", "b", params, fetch("b"))
+    cache.complete("m", "a", params, fetch("a"))
+    cache.complete("m", "c", params, fetch("c"))
+    cache.complete("m", "b", params, fetch("b"))
+    assert calls == ["a", "b", "c", "b"], "b was evicted as least recently used"
+
+    now[0] += 61.0
+    cache.complete("m", "c", params, fetch("c"))
+    cache.complete("m", "c", {"temperature": 0.7}, fetch("c"))
+    cache.complete("m", "c", {"temperature": 0.7}, fetch("c"))
+    assert calls[-3:] == ["c", "c", "c"], "expired and sampled requests refetch"
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["expired"]) == (2, 5, 1)
+
+
+def test_cache_hits_do_not_write(tmp_path: Path) -> None:
+    cache = CompletionCache(tmp_path / "c.sqlite3", max_entries=2, ttl_seconds=60.0)
+    params = {"temperature": 0.0}
+    cache.complete("m", "a", params, lambda: {"content": "a"})
+    cache.complete("m", "b", params, lambda: {"content": "b"})
+    conn = cache._conn
+    assert conn is not None
+    writes = conn.total_changes
+    for _ in range(5):
+        cache.complete("m", "a", params, lambda: {"content": "refetched"})
+    assert conn.total_changes == writes, "hits only stamp recency in memory"
+    cache.complete("m", "c", params, lambda: {"content": "c"})
+    assert cache.complete("m", "a", params, lambda: {"content": "x"}) == {
+        "content": "a"
+    }, "pending stamps reach sqlite before the LRU eviction"
+
+
+def test_leader_rechecks_cache_before_fetching(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    cache = CompletionCache(tmp_path / "c.sqlite3", max_entries=8, ttl_seconds=60.0)
+    params = {"temperature": 0.0}
+    cache.complete("m", "k", params, lambda: {"content": "stored"})
+    real_get = cache.get
+    stale = [True]
+    # The first lookup loses the race with the previous leader's put().
+    monkeypatch.setattr(
+        cache, "get", lambda key: None if stale and stale.pop() else real_get(key)
+    )
+
+    def fetch() -> dict[str, Any]:
+        raise AssertionError("key is already cached")
+
+    assert cache.complete("m", "k", params, fetch) == {"content": "stored"}
+    assert cache.stats()["hits"] == 1
+
+
+def test_concurrent_identical_requests_share_one_call(tmp_path: Path) -> None:
+    cache = CompletionCache(tmp_path / "c.sqlite3", max_entries=0, ttl_seconds=60.0)
+    release = threading.Event()
+    calls: list[int] = []
+
+    def fetch() -> dict[str, Any]:
+        calls.append(1)
+        release.wait(5)
+        return {"content": "shared"}
+
+    results: list[dict[str, Any]] = []
+    threads = [
+        threading.Thread(
+            target=lambda: results.append(
+                cache.complete("m", "same", {"temperature": 0.0}, fetch)
+            )
+        )
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    while not calls:
+        time.sleep(0.001)
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert calls == [1]
+    assert results == [{"content": "shared"}] * 4
+    assert results[0] is not results[1]
+    assert cache.stats()["coalesced"] == 3
+
+
+def test_async_identical_requests_share_one_call(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    calls: list[str] = []
+    original = LLMClient._chat
+
+    def counting(self: LLMClient, *args: Any) -> dict[str, Any]:
+        calls.append(args[1])
+        return original(self, *args)
+
+    monkeypatch.setattr(LLMClient, "_chat", counting)
+    client = LLMClient()
+
+    async def burst() -> list[dict[str, Any]]:
+        return await asyncio.gather(
+            *(client.chat_async("s", "u", "pump curve") for _ in range(5)),
+            client.chat_async("s", "hot", "pump curve", temperature=0.7),
+        )
+
+    *shared, hot = asyncio.run(burst())
+    # Cache lookups run in a worker thread, so the uncached call starts first.
+    assert sorted(calls) == ["hot", "u"], "one fetch per key; sampled calls bypass"
+    assert all(result == shared[0] for result in shared)
+    assert shared[0] == client.chat("s", "u", "pump curve") and hot["content"]
+    assert sorted(calls) == ["hot", "u"]
+
+
+def test_cancelled_async_leader_hands_fetch_to_follower(tmp_path: Path) -> None:
+    cache = CompletionCache(tmp_path / "c.sqlite3", max_entries=0, ttl_seconds=60.0)
+    calls: list[int] = []
+
+    async def fetch() -> dict[str, Any]:
+        calls.append(1)
+        await asyncio.sleep(0.05 if len(calls) == 1 else 0)
+        return {"content": f"call-{len(calls)}"}
+
+    async def scenario() -> tuple[list[Any], bool]:
+        params = {"temperature": 0.0}
+        leader = asyncio.create_task(cache.complete_async("m", "k", params, fetch))
+        await asyncio.sleep(0)
+        followers = [
+            asyncio.create_task(cache.complete_async("m", "k", params, fetch))
+            for _ in range(3)
+        ]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        results = await asyncio.gather(*followers)
+        return results, leader.cancelled()
+
+    results, cancelled = asyncio.run(scenario())
+    assert cancelled
+    assert calls == [1, 1], "one follower took over the abandoned fetch"
+    assert results == [{"content": "call-2"}] * 3
+
+
+def test_llm_client_chat_is_served_from_cache(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    calls: list[str] = []
+    original = LLMClient._chat
+
+    def counting(self: LLMClient, *args: Any) -> dict[str, Any]:
+        calls.append(args[1])
+        return original(self, *args)
+
+    monkeypatch.setattr(LLMClient, "_chat", counting)
+    first = LLMClient().chat(system="s", user="u", context="pump curve")
+    first["context"] = "mutated by caller"
+    again = LLMClient().chat(system="s", user="u", context="pump curve")
+    assert "context" not in again
+    LLMClient().chat(system="s", user="other", context="pump curve")
+    assert calls == ["u", "other"]
+
+    metrics = TestClient(create_app()).get("/metrics").json()
+    assert metrics["completion_cache"]["hits"] == 1
+    assert metrics["completion_cache"]["hit_rate"] == pytest.approx(0.3333)
@@ -0,0 +1,136 @@
+"""Tests for sharded cross-document search."""
+
+from __future__ import annotations
+
+import json
+from collections.abc import Iterator
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+from ...adapters.vectors import BM25Index
+from ...config import get_settings
+from ...main import create_app
+from ...services.chunk_service.packages.index.local_vss import build_local_index
+from ...services.rag_pass_service import search_corpus
+from ...services.rag_pass_service.packages.retrieval.corpus import (
+    clear_shard_cache,
+    load_shards,
+)
+from ...util.errors import ValidationError
+
+_DOCS = {
+    "doc-a": ["pump pressure relief valve", "motor torque curve", "pump seal"],
+    "doc-b": ["valve actuator wiring", "pressure transmitter range"] * 3,
+    "doc-c": ["pump pump pressure", "conveyor belt tension", "gearbox oil"],
+}
+
+
+@pytest.fixture()
+def corpus(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> Iterator[Path]:
+    final_dir = tmp_path / "uploads"
+    monkeypatch.setenv("UPLOAD_STORAGE_FINAL", str(final_dir))
+    get_settings.cache_clear()
+    clear_shard_cache()
+    root = get_settings().artifact_root_path
+    now = datetime.now(timezone.utc).isoformat()
+    for doc_id, texts in _DOCS.items():
+        chunks_path = root / doc_id / "uf_chunks.jsonl"
+        chunks_path.parent.mkdir(parents=True)
+        chunks_path.write_text(
+            "\n".join(
+                json.dumps({"chunk_id": f"{doc_id}:u{i}", "text": text})
+                for i, text in enumerate(texts)
+            ),
+            encoding="utf-8",
+        )
+        build_local_index(doc_id=doc_id, chunks_path=str(chunks_path))
+        record_dir = final_dir / doc_id
+        record_dir.mkdir(parents=True)
+        record = {
+            "doc_id": doc_id,
+            "filename_original": f"{doc_id}.pdf",
+            "filename_stored": f"{doc_id}.pdf",
+            "size_bytes": 1,
+            "sha256": doc_id,
+            "project_id": "beta" if doc_id == "doc-c" else "alpha",
+            "uploaded_at": now,
+            "updated_at": now,
+            "storage_path": str(record_dir / f"{doc_id}.pdf"),
+        }
+        (record_dir / "index.json").write_text(json.dumps(record), encoding="utf-8")
+    yield root
+    clear_shard_cache()
+
+
+def test_corpus_search_matches_single_global_index(corpus: Path) -> None:
+    merged = BM25Index()
+    merged.upsert(
+        (f"{doc_id}:u{i}", text)
+        for doc_id, texts in _DOCS.items()
+        for i, text in enumerate(texts)
+    )
+    expected = [
+        (merged.chunk_id(row), score)
+        for row, score in merged.search("pump pressure", k=4)
+    ]
+
+    hits = search_corpus("pump pressure", k=4)
+    assert [(hit.chunk_id, hit.sparse) for hit in hits] == [
+        (chunk_id, pytest.approx(score, rel=1e-12)) for chunk_id, score in expected
+    ]
+    assert {hit.doc_id for hit in hits} == {"doc-a", "doc-b", "doc-c"}
+    assert all(hit.chunk_id.startswith(hit.doc_id) for hit in hits if hit.chunk_id)
+
+
+def test_corpus_search_filters_by_project(corpus: Path) -> None:
+    hits = search_corpus("pump pressure", project_id="beta", k=10)
+    assert hits and {hit.doc_id for hit in hits} == {"doc-c"}
+    assert search_corpus("pump", project_id="missing") == []
+    with pytest.raises(ValidationError):
+        search_corpus("   ")
+
+
+def test_corpus_search_endpoint(corpus: Path) -> None:
+    client = TestClient(create_app())
+    response = client.post(
+        "/passes/search", json={"query": "pump pressure", "project_id": "beta"}
+    )
+    assert response.status_code == 200
+    assert {hit["doc_id"] for hit in response.json()} == {"doc-c"}
+    assert client.post("/passes/search", json={"query": " "}).status_code == 400
+
+
+def test_corpus_search_before_any_upload(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    monkeypatch.setenv("UPLOAD_STORAGE_FINAL", str(tmp_path / "never-created"))
+    get_settings.cache_clear()
+    assert search_corpus("pump", project_id="alpha") == []
+
+
+def test_shards_reopen_dense_indexes_with_saved_params(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    monkeypatch.setenv("VECTOR_INDEX_TYPE", "ivf")
+    monkeypatch.setenv("VECTOR_IVF_NLIST", "2")
+    monkeypatch.setenv("VECTOR_IVF_NPROBE", "1")
+    get_settings.cache_clear()
+    clear_shard_cache()
+    chunks_path = get_settings().artifact_root_path / "doc-ivf" / "uf_chunks.jsonl"
+    chunks_path.parent.mkdir(parents=True)
+    chunks_path.write_text(
+        "\n".join(json.dumps({"text": text}) for text in _DOCS["doc-b"]),
+        encoding="utf-8",
+    )
+    build_local_index(doc_id="doc-ivf", chunks_path=str(chunks_path))
+
+    monkeypatch.setenv("VECTOR_IVF_NLIST", "64")
+    monkeypatch.setenv("VECTOR_IVF_NPROBE", "9")
+    get_settings.cache_clear()
+    (shard,) = load_shards(["doc-ivf"])
+    assert shard.dense is not None
+    assert shard.dense.params == {"nlist": 2, "nprobe": 1}
+    clear_shard_cache()
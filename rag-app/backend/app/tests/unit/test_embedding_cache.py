@@ -0,0 +1,76 @@
+"""Tests for the persistent embedding cache."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from ...adapters import LLMClient
+from ...adapters.embedding_cache import EmbeddingCache, embed_cached
+
+
+def test_embedding_cache_persists_and_evicts_least_recently_used(
+    tmp_path: Path,
+) -> None:
+    path = tmp_path / "embeddings.sqlite3"
+    cache = EmbeddingCache(path, max_entries=2)
+    cache.put_many("m", ["a", "b"], [[0.1, 0.2], [0.3, 0.4]])
+    assert cache.get_many("m", ["a", "x"]) == [[0.1, 0.2], None]
+    cache.put_many("m", ["c"], [[0.5, 0.6]])
+    assert cache.get_many("m", ["b"]) == [None], "b was least recently used"
+    assert cache.get_many("other", ["a"]) == [None], "models do not share vectors"
+
+    reopened = EmbeddingCache(path, max_entries=2)
+    assert reopened.get_many("m", ["c", "a"]) == [[0.5, 0.6], [0.1, 0.2]]
+    assert cache.stats()["evicted"] == 1
+
+
+def test_embedding_cache_hits_do_not_write(tmp_path: Path) -> None:
+    cache = EmbeddingCache(tmp_path / "embeddings.sqlite3", max_entries=2)
+    cache.put_many("m", ["a", "b"], [[0.1], [0.2]])
+    conn = cache._conn
+    assert conn is not None
+    writes = conn.total_changes
+    for _ in range(3):
+        assert cache.get_many("m", ["a", "b"]) == [[0.1], [0.2]]
+    assert cache.get_many("m", ["a"]) == [[0.1]]
+    assert conn.total_changes == writes, "hits only stamp recency in memory"
+    cache.put_many("m", ["c"], [[0.3]])
+    assert cache.get_many("m", ["a", "b"]) == [[0.1], None], "stamps flushed first"
+
+
+def test_embed_cached_batches_unique_misses(tmp_path: Path) -> None:
+    sent: list[list[str]] = []
+
+    def embed_batch(batch: list[str]) -> list[list[float]]:
+        sent.append(batch)
+        return [[float(len(text))] for text in batch]
+
+    texts = ["aa", "b", "aa", "ccc"]
+    assert embed_cached("m", texts, embed_batch, 2) == [[2.0], [1.0], [2.0], [3.0]]
+    assert sent == [["aa", "b"], ["ccc"]]
+    assert embed_cached("m", ["ccc", "dddd"], embed_batch, 2) == [[3.0], [4.0]]
+    assert sent[-1] == ["dddd"]
+    with pytest.raises(ValueError):
+        embed_cached("m", ["aa", "eeeee"], lambda batch: [], 2)
+    with pytest.raises(ValueError):
+        embed_cached("m", ["ff", "ff"], lambda batch: [[1.0], [2.0], [3.0]], 4)
+    assert embed_cached("m", ["gg", "h"], lambda batch: [[9.0]], 4) == [[9.0]]
+
+
+def test_llm_client_reembeds_nothing_for_unchanged_texts(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    calls: list[int] = []
+    original = LLMClient._embed_batch
+
+    def counting(self: LLMClient, batch: list[str]) -> list[list[float]]:
+        calls.append(len(batch))
+        return original(self, batch)
+
+    monkeypatch.setattr(LLMClient, "_embed_batch", counting)
+    texts = [f"chunk {index}" for index in range(5)]
+    first = LLMClient().embed(texts)
+    assert LLMClient().embed(texts) == first
+    assert calls == [5], "the second run is served from the cache"
@@ -2,10 +2,15 @@
 
 from __future__ import annotations
 
+import asyncio
+from collections.abc import AsyncIterator
+from typing import Any
+
 import pytest
 
 from ...adapters.llm import LLMClient, call_llm
 from ...config import get_settings
+from ...llm import clients
 from ...util.errors import ExternalServiceError
 
 
@@ -25,10 +30,125 @@ def test_llm_client_embed_is_deterministic() -> None:
     assert len(first) == 16
 
 
-def test_llm_client_raises_when_online(monkeypatch: pytest.MonkeyPatch) -> None:
+def test_llm_client_embed_async_matches_sync() -> None:
+    client = LLMClient()
+    texts = ["alpha", "beta", "alpha", "gamma"]
+    vectors = asyncio.run(client.embed_async(texts))
+    assert vectors == client.embed(texts)
+    assert vectors[0] == vectors[2]
+
+
+def test_llm_client_sync_calls_openrouter_when_online(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
     monkeypatch.setenv("FLUIDRAG_OFFLINE", "false")
+    monkeypatch.setenv("LLM_CHAT_MODEL", "vendor/chat")
+    monkeypatch.setenv("LLM_EMBED_MODEL", "vendor/embed")
     get_settings.cache_clear()
+    sent: list[tuple[str, Any]] = []
+
+    def fake_chat(model: str, messages: Any, **kwargs: Any) -> dict[str, Any]:
+        sent.append((model, messages))
+        return {"model": model, "choices": [{"message": {"content": "remote"}}]}
+
+    def fake_embed(model: str, texts: list[str], **kwargs: Any) -> Any:
+        sent.append((model, texts))
+        return [[1.0] for _ in texts]
+
+    monkeypatch.setattr(clients, "chat_sync", fake_chat)
+    monkeypatch.setattr(clients, "embed_sync", fake_embed)
     client = LLMClient()
+    assert client.chat("sys", "question", "ctx")["content"] == "remote"
+    assert client.embed(["a"]) == [[1.0]]
+    assert sent == [
+        (
+            "vendor/chat",
+            [
+                {"role": "system", "content": "sys"},
+                {"role": "user", "content": "question\n\nContext:\nctx"},
+            ],
+        ),
+        ("vendor/embed", ["a"]),
+    ]
+
+    def failing_chat(model: str, messages: Any, **kwargs: Any) -> dict[str, Any]:
+        raise clients.OpenRouterError("upstream down")
+
+    monkeypatch.setattr(clients, "chat_sync", failing_chat)
     with pytest.raises(ExternalServiceError):
         client.chat("system", "user", "context")
     get_settings.cache_clear()
+
+
+def test_llm_client_async_calls_openrouter_when_online(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setenv("FLUIDRAG_OFFLINE", "false")
+    monkeypatch.setenv("LLM_CHAT_MODEL", "vendor/chat")
+    monkeypatch.setenv("LLM_EMBED_MODEL", "vendor/embed")
+    get_settings.cache_clear()
+    sent: list[tuple[str, Any]] = []
+
+    async def fake_chat(model: str, messages: Any, **kwargs: Any) -> dict[str, Any]:
+        sent.append((model, messages))
+        return {
+            "model": model,
+            "choices": [{"message": {"content": "remote answer"}}],
+            "usage": {"prompt_tokens": 7, "completion_tokens": 2},
+        }
+
+    async def fake_embed(model: str, texts: list[str], **kwargs: Any) -> Any:
+        sent.append((model, texts))
+        return [[1.0] for _ in texts]
+
+    monkeypatch.setattr(clients, "chat_async", fake_chat)
+    monkeypatch.setattr(clients, "embed_async", fake_embed)
+    client = LLMClient()
+    result = asyncio.run(client.chat_async("sys", "question\n\nContext:\nctx", "ctx"))
+    assert result["content"] == "remote answer"
+    assert result["tokens"] == {"prompt": 7, "completion": 2}
+    assert asyncio.run(client.embed_async(["a", "b"])) == [[1.0], [1.0]]
+    assert sent == [
+        (
+            "vendor/chat",
+            [
+                {"role": "system", "content": "sys"},
+                {"role": "user", "content": "question\n\nContext:\nctx"},
+            ],
+        ),
+        ("vendor/embed", ["a", "b"]),
+    ]
+    get_settings.cache_clear()
+
+
+def test_llm_client_chat_stream_forwards_openrouter_deltas(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setenv("FLUIDRAG_OFFLINE", "false")
+    monkeypatch.setenv("LLM_CHAT_MODEL", "vendor/chat")
+    get_settings.cache_clear()
+
+    async def fake_stream(
+        model: str, messages: Any, **kwargs: Any
+    ) -> AsyncIterator[dict[str, Any]]:
+        for text in ("Hel", "lo"):
+            yield {"type": "delta", "data": {"choices": [{"delta": {"content": text}}]}}
+        yield {
+            "type": "delta",
+            "data": {"model": model, "usage": {"prompt_tokens": 3}, "choices": []},
+        }
+        yield {"type": "done"}
+
+    monkeypatch.setattr(clients, "chat_stream_async", fake_stream)
+
+    async def _collect() -> list[dict[str, Any]]:
+        return [item async for item in LLMClient().chat_stream("s", "u", "c")]
+
+    events = asyncio.run(_collect())
+    assert [e.get("text") for e in events[:-1]] == ["Hel", "lo"]
+    assert not any(e.get("replayed") for e in events[:-1])
+    completion = events[-1]["completion"]
+    assert completion["content"] == "Hello"
+    assert completion["model"] == "vendor/chat"
+    assert completion["tokens"] == {"prompt": 3, "completion": 0}
+    get_settings.cache_clear()
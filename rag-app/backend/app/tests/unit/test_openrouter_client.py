@@ -4,14 +4,18 @@ from __future__ import annotations
 
 import asyncio
 import json
+import threading
 from collections.abc import AsyncGenerator, Iterator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from types import TracebackType
 from typing import Any, ClassVar
 
 import pytest
 
 from ...config import get_settings
+from ...llm.clients import chat_async, embed_async, get_http_pool
 from ...llm.clients import openrouter as client_module
+from ...llm.clients import ratelimit as ratelimit_module
 from ...llm.clients.openrouter import (
     OpenRouterAuthError,
     OpenRouterHTTPError,
@@ -20,6 +24,8 @@ from ...llm.clients.openrouter import (
     chat_sync,
     embed_sync,
 )
+from ...llm.clients.ratelimit import RateLimiter
+from ...util.metrics import collect_metrics
 
 
 def _clear_settings_cache() -> None:
@@ -29,9 +35,15 @@ def _clear_settings_cache() -> None:
 
 
 class DummyResponse:
-    def __init__(self, status_code: int, payload: dict[str, Any] | None = None) -> None:
+    def __init__(
+        self,
+        status_code: int,
+        payload: dict[str, Any] | None = None,
+        headers: dict[str, str] | None = None,
+    ) -> None:
         self.status_code = status_code
         self._payload = payload or {}
+        self.headers = headers or {}
         self.text = json.dumps(self._payload)
 
     def json(self) -> dict[str, Any]:
@@ -57,8 +69,15 @@ class MockClient:
     ) -> None:  # pragma: no cover - context stub
         return None
 
+    def close(self) -> None:
+        return None
+
     def post(
-        self, url: str, headers: dict[str, str], json: dict[str, Any]
+        self,
+        url: str,
+        headers: dict[str, str],
+        json: dict[str, Any],
+        timeout: float | None = None,
     ) -> DummyResponse:
         if not self.queue:
             raise AssertionError("MockClient queue exhausted")
@@ -75,6 +94,7 @@ class DummyStreamResponse:
         self, status_code: int, lines: list[Any], body: bytes | str = b""
     ) -> None:
         self.status_code = status_code
+        self.headers: dict[str, str] = {}
         self._lines = lines
         self._body = body if isinstance(body, bytes) else str(body).encode()
 
@@ -125,8 +145,32 @@ class MockAsyncClient:
     ) -> None:  # pragma: no cover - context stub
         return None
 
+    async def post(
+        self,
+        url: str,
+        headers: dict[str, str],
+        json: dict[str, Any],
+        timeout: float | None = None,
+    ) -> DummyResponse:
+        if not self.queue:
+            raise AssertionError("MockAsyncClient queue exhausted")
+        response = self.queue.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        if isinstance(response, float):
+            await asyncio.sleep(response)
+            return DummyResponse(200, {"id": "slow", "echo": json})
+        if not isinstance(response, DummyResponse):
+            raise TypeError("MockAsyncClient queue must yield DummyResponse")
+        return response
+
     def stream(
-        self, method: str, url: str, headers: dict[str, str], json: dict[str, Any]
+        self,
+        method: str,
+        url: str,
+        headers: dict[str, str],
+        json: dict[str, Any],
+        timeout: float | None = None,
     ) -> DummyStreamResponse:
         if not self.queue:
             raise AssertionError("MockAsyncClient queue exhausted")
@@ -238,6 +282,17 @@ def test_chat_stream_idle_timeout(
         asyncio.run(_consume())
 
 
+def test_chat_sync_serves_repeated_prompts_from_cache(
+    monkeypatch: pytest.MonkeyPatch, online_env: None
+) -> None:
+    monkeypatch.setattr("backend.app.llm.clients.openrouter.httpx.Client", MockClient)
+    MockClient.queue = [DummyResponse(200, {"id": "once", "choices": []})]
+    messages = [{"role": "user", "content": "cached"}]
+    assert chat_sync("gpt", messages, retries=0)["id"] == "once"
+    assert chat_sync("gpt", messages, retries=0)["id"] == "once"
+    assert not MockClient.queue
+
+
 def test_embed_sync_parses_vectors(
     monkeypatch: pytest.MonkeyPatch, online_env: None
 ) -> None:
@@ -249,6 +304,152 @@ def test_embed_sync_parses_vectors(
     assert result == [[1.0, 2.0, 3.0]]
 
 
+def test_embed_sync_sends_only_cache_misses(
+    monkeypatch: pytest.MonkeyPatch, online_env: None
+) -> None:
+    monkeypatch.setattr("backend.app.llm.clients.openrouter.httpx.Client", MockClient)
+    MockClient.queue = [
+        DummyResponse(200, {"data": [{"embedding": [1, 0]}, {"embedding": [0, 1]}]}),
+        DummyResponse(200, {"data": [{"embedding": [1, 1]}]}),
+    ]
+    assert embed_sync("text-embed", ["a", "b"], retries=0) == [[1.0, 0.0], [0.0, 1.0]]
+    result = embed_sync("text-embed", ["b", "c", "a"], retries=0)
+    assert result == [[0.0, 1.0], [1.0, 1.0], [1.0, 0.0]]
+    assert not MockClient.queue, "only the unseen input was requested"
+
+
+def test_chat_async_retries_then_succeeds(
+    monkeypatch: pytest.MonkeyPatch, online_env: None
+) -> None:
+    monkeypatch.setattr(
+        "backend.app.llm.clients.openrouter.httpx.AsyncClient", MockAsyncClient
+    )
+    MockAsyncClient.queue = [
+        DummyResponse(503, {"error": {"message": "busy"}}),
+        DummyResponse(200, {"id": "ok", "choices": []}),
+        DummyResponse(401, {"error": {"message": "bad key"}}),
+    ]
+    messages = [{"role": "user", "content": "hello"}]
+    result = asyncio.run(chat_async("gpt", messages, retries=1))
+    assert result["id"] == "ok"
+    with pytest.raises(OpenRouterAuthError):
+        asyncio.run(chat_async("gpt", [{"role": "user", "content": "x"}], retries=3))
+
+
+def test_embed_async_sends_only_cache_misses(
+    monkeypatch: pytest.MonkeyPatch, online_env: None
+) -> None:
+    monkeypatch.setattr(
+        "backend.app.llm.clients.openrouter.httpx.AsyncClient", MockAsyncClient
+    )
+    MockAsyncClient.queue = [
+        DummyResponse(200, {"data": [{"embedding": [1, 0]}, {"embedding": [0, 1]}]}),
+    ]
+    result = asyncio.run(embed_async("text-embed", ["a", "b", "a"], retries=0))
+    assert result == [[1.0, 0.0], [0.0, 1.0], [1.0, 0.0]]
+    assert asyncio.run(embed_async("text-embed", ["b"], retries=0)) == [[0.0, 1.0]]
+    assert not MockAsyncClient.queue
+
+
+def test_chat_async_caps_in_flight_calls(
+    monkeypatch: pytest.MonkeyPatch, online_env: None
+) -> None:
+    monkeypatch.setenv("LLM_MAX_CONCURRENCY", "3")
+    _clear_settings_cache()
+    monkeypatch.setattr(
+        "backend.app.llm.clients.openrouter.httpx.AsyncClient", MockAsyncClient
+    )
+    MockAsyncClient.queue = [0.01] * 12
+    pool = get_http_pool()
+    peaks: list[int] = []
+    original_post = MockAsyncClient.post
+
+    async def tracking_post(self: MockAsyncClient, *args: Any, **kwargs: Any) -> Any:
+        peaks.append(pool.stats()["in_flight"])
+        return await original_post(self, *args, **kwargs)
+
+    monkeypatch.setattr(MockAsyncClient, "post", tracking_post)
+    throttled = pool.stats()["throttled"]
+
+    async def fan_out() -> list[dict[str, Any]]:
+        return await asyncio.gather(
+            *(
+                chat_async("gpt", [{"role": "user", "content": f"q{i}"}], retries=0)
+                for i in range(12)
+            )
+        )
+
+    results = asyncio.run(fan_out())
+    assert len(results) == 12 and not MockAsyncClient.queue
+    assert max(peaks) == 3
+    assert pool.stats()["throttled"] - throttled == 9
+    assert pool.stats()["in_flight"] == 0
+
+
+def test_chat_sync_waits_for_retry_after(
+    monkeypatch: pytest.MonkeyPatch, online_env: None
+) -> None:
+    waits: list[float] = []
+    monkeypatch.setattr(ratelimit_module, "_sleep", waits.append)
+    monkeypatch.setattr("backend.app.llm.clients.openrouter.httpx.Client", MockClient)
+    MockClient.queue = [
+        DummyResponse(429, {"error": {"message": "slow"}}, {"Retry-After": "2"}),
+        DummyResponse(200, {"id": "ok", "choices": []}),
+    ]
+    result = chat_sync("gpt", [{"role": "user", "content": "hello"}], retries=1)
+    assert result["id"] == "ok"
+    assert waits and 1.9 < waits[-1] <= 2.0
+    stats = collect_metrics()["rate_limiter"]
+    assert stats["throttled"] == 1
+    assert stats["retries"] == 1
+    assert stats["requests_per_minute"] < get_settings().openrouter_requests_per_minute
+
+
+def test_chat_sync_stops_retrying_when_budget_is_spent(
+    monkeypatch: pytest.MonkeyPatch, online_env: None
+) -> None:
+    monkeypatch.setenv("OPENROUTER_RETRY_BUDGET_MIN", "1")
+    monkeypatch.setenv("OPENROUTER_RETRY_BUDGET_RATIO", "0")
+    monkeypatch.setattr("backend.app.llm.clients.openrouter.httpx.Client", MockClient)
+    MockClient.queue = [DummyResponse(503, {"error": {"message": "down"}})] * 4
+    with pytest.raises(OpenRouterHTTPError):
+        chat_sync("gpt", [{"role": "user", "content": "hello"}], retries=3)
+    assert len(MockClient.queue) == 2
+    stats = collect_metrics()["rate_limiter"]
+    assert stats["retries"] == 1
+    assert stats["retries_denied"] == 1
+    MockClient.queue = []
+
+
+def test_rate_limiter_queues_callers_and_adapts_to_headers(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setenv("OPENROUTER_REQUESTS_PER_MINUTE", "60")
+    monkeypatch.setenv("OPENROUTER_TOKENS_PER_MINUTE", "600")
+    now = [100.0]
+    waits: list[float] = []
+    monkeypatch.setattr(ratelimit_module, "_sleep", waits.append)
+    limiter = RateLimiter(clock=lambda: now[0], wall=lambda: 1_000.0)
+
+    for _ in range(61):
+        assert limiter.acquire(1)
+    assert waits == [pytest.approx(1.0)]
+    limiter.acquire(600)
+    assert waits[-1] == pytest.approx(6.1)
+
+    now[0] += 120.0
+    limiter.observe(
+        200,
+        {"x-ratelimit-remaining-tokens": "0", "x-ratelimit-reset-tokens": "6m0s"},
+    )
+    assert limiter.stats()["paused_for_seconds"] == pytest.approx(300.0)
+    limiter.reset()
+    limiter.observe(200, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": "1010000"})
+    stats = limiter.stats()
+    assert stats["paused_for_seconds"] == pytest.approx(10.0)
+    assert stats["tokens_available"] == pytest.approx(600.0)
+
+
 def test_chat_sync_propagates_auth_error(
     monkeypatch: pytest.MonkeyPatch, online_env: None
 ) -> None:
@@ -256,3 +457,43 @@ def test_chat_sync_propagates_auth_error(
     MockClient.queue = [DummyResponse(401, {"error": {"message": "bad key"}})]
     with pytest.raises(OpenRouterAuthError):
         chat_sync("gpt", [{"role": "user", "content": "hi"}], retries=0)
+
+
+class _KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self) -> None:  # noqa: N802 - http.server naming
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        body = b'{"id": "ok", "choices": []}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        return None
+
+
+def test_chat_sync_reuses_pooled_keepalive_connection(
+    monkeypatch: pytest.MonkeyPatch, online_env: None
+) -> None:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _KeepAliveHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setenv("OPENROUTER_BASE_URL", f"http://127.0.0.1:{server.server_port}")
+    pool = get_http_pool()
+    before = pool.stats()
+    try:
+        for turn in range(3):
+            messages = [{"role": "user", "content": f"turn {turn}"}]
+            assert chat_sync("gpt", messages, retries=0)["id"] == "ok"
+    finally:
+        pool.close()
+        server.shutdown()
+        server.server_close()
+    after = pool.stats()
+    assert after["requests"] - before["requests"] == 3
+    assert after["connections_opened"] - before["connections_opened"] == 1
+    assert after["reused"] - before["reused"] == 2
+    assert collect_metrics()["http_pool"] == after
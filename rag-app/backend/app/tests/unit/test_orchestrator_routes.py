@@ -124,7 +124,7 @@ def test_pipeline_run_creates_manifest_and_results(
     pass_result_path = passes_dir / "mechanical.json"
     pass_result_path.write_text(json.dumps(pass_result.model_dump()), encoding="utf-8")
 
-    def _fake_run_passes(doc_id_arg: str, header_chunks_path: str) -> PassJobs:
+    async def _fake_run_passes(doc_id_arg: str, header_chunks_path: str) -> PassJobs:
         assert doc_id_arg == doc_id
         assert header_chunks_path == str(chunk_path)
         manifest = PassManifest(
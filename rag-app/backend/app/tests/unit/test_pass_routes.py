@@ -142,16 +142,12 @@ def test_get_pass_payload_not_dict(tmp_path: Path) -> None:
 def test_run_passes_executes_controller(monkeypatch: pytest.MonkeyPatch) -> None:
     called: dict[str, object] = {}
 
-    async def fake_threadpool(func, *args, **kwargs):  # type: ignore[no-untyped-def]
-        return func(*args, **kwargs)
-
-    def fake_run_all(doc_id: str, artifact: str) -> PassJobs:
+    async def fake_run_all(doc_id: str, artifact: str) -> PassJobs:
         called["doc_id"] = doc_id
         called["artifact"] = artifact
         return PassJobs(doc_id=doc_id, manifest_path="manifest.json", passes={})
 
-    monkeypatch.setattr(passes_routes, "run_in_threadpool", fake_threadpool)
-    monkeypatch.setattr(passes_routes, "run_all", fake_run_all)
+    monkeypatch.setattr(passes_routes, "run_all_async", fake_run_all)
 
     request = passes_routes.RunPassesRequest(
         doc_id="doc-123", rechunk_artifact="/tmp/header-chunks.json"
@@ -163,10 +159,10 @@ def test_run_passes_executes_controller(monkeypatch: pytest.MonkeyPatch) -> None
 
 
 def test_run_passes_maps_errors(monkeypatch: pytest.MonkeyPatch) -> None:
-    async def fake_threadpool(func, *args, **kwargs):  # type: ignore[no-untyped-def]
+    async def fake_run_all(doc_id: str, artifact: str) -> PassJobs:
         raise passes_routes.ValidationError("bad input")
 
-    monkeypatch.setattr(passes_routes, "run_in_threadpool", fake_threadpool)
+    monkeypatch.setattr(passes_routes, "run_all_async", fake_run_all)
 
     request = passes_routes.RunPassesRequest(
         doc_id="doc-123", rechunk_artifact="missing.json"
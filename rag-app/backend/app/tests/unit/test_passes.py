@@ -2,20 +2,46 @@
 
 from __future__ import annotations
 
+import asyncio
 import json
+import threading
 from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
 
 import pytest
+from fastapi.testclient import TestClient
 
+from ...adapters import LLMClient
+from ...adapters.analyzer import get_analyzer
+from ...config import get_settings
 from ...contracts.passes import PassResult
+from ...main import create_app
 from ...services.chunk_service import run_uf_chunking
 from ...services.header_service import join_and_rechunk
 from ...services.parser_service import parse_and_enrich
-from ...services.rag_pass_service import run_all
+from ...services.rag_pass_service import run_all, stream_all
+from ...services.rag_pass_service.packages.compose import context
 from ...services.rag_pass_service.packages.compose.context import compose_window
+from ...services.rag_pass_service.packages.emit.manifest import (
+    PassManifestWriter,
+    read_pass_manifest,
+)
 from ...services.rag_pass_service.packages.emit.results import write_pass_results
-from ...services.rag_pass_service.packages.retrieval import retrieve_ranked
+from ...services.rag_pass_service.packages.prompts import MechanicalPrompt
+from ...services.rag_pass_service.packages.rank import (
+    RankFeatures,
+    load_rank_features,
+    write_rank_features,
+)
+from ...services.rag_pass_service.packages.retrieval import (
+    RetrievalSession,
+    index_manifest_path,
+    retrieve_ranked,
+)
+from ...services.rag_pass_service.pass_steps import load_chunks
 from ...services.upload_service import ensure_normalized
+from ...util.errors import ValidationError
 
 pytestmark = pytest.mark.phase6
 
@@ -76,6 +102,62 @@ def test_hybrid_retrieval_emits_physics_scores_sorted() -> None:
         assert "graph_score" in item and item["graph_score"] >= 0
 
 
+def test_retrieval_session_builds_once_for_all_domains(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    calls: list[int] = []
+    original = LLMClient.embed
+
+    def counting_embed(self: LLMClient, texts: list[str]) -> list[list[float]]:
+        calls.append(len(texts))
+        return original(self, texts)
+
+    monkeypatch.setattr(LLMClient, "embed", counting_embed)
+    session = RetrievalSession(_sample_chunks())
+    assert calls == [3]
+    ranked = session.rank_batch(["mechanical", "controls"])
+    assert session.rank("mechanical") == ranked["mechanical"]
+    assert calls == [3, 2], "chunks and domain queries are embedded once"
+    single = retrieve_ranked(_sample_chunks(), "controls")
+    assert [item["chunk_id"] for item in ranked["controls"]] == [
+        item["chunk_id"] for item in single
+    ]
+    assert [item["total_score"] for item in ranked["controls"]] == pytest.approx(
+        [item["total_score"] for item in single]
+    )
+
+
+def test_rank_features_sidecar_matches_computed_scores(tmp_path: Path) -> None:
+    chunks = _sample_chunks()
+    chunks_path = tmp_path / "header_chunks.jsonl"
+    sidecar = write_rank_features(chunks_path, chunks)
+    assert sidecar.name == "header_chunks.features.npz"
+    loaded = load_rank_features(chunks_path, chunks)
+    assert loaded is not None
+    computed = RankFeatures.compute(chunks)
+    assert loaded.flow.tolist() == computed.flow.tolist()
+    assert loaded.energy.tolist() == computed.energy.tolist()
+    assert loaded.graph.tolist() == computed.graph.tolist()
+    assert RetrievalSession(chunks, features=loaded).rank("mechanical") == (
+        RetrievalSession(chunks).rank("mechanical")
+    )
+    for change in (
+        {"text": "Rewritten text."},
+        {"token_count": 40},
+        {"sentence_end": 3},
+        {"header_path": "Controls/Safety"},
+    ):
+        edited = [dict(chunks[0], **change), *chunks[1:]]
+        assert load_rank_features(chunks_path, edited) is None, f"stale: {change}"
+    assert load_rank_features(chunks_path, chunks[:2]) is None
+
+    assert not list(tmp_path.glob("*.tmp")), "saved via temp file and rename"
+    sidecar.write_bytes(sidecar.read_bytes()[:40])
+    assert load_rank_features(chunks_path, chunks) is None, "truncated sidecar"
+    sidecar.write_bytes(b"not an npz archive")
+    assert load_rank_features(chunks_path, chunks) is None
+
+
 def test_write_pass_results_persists_payload(tmp_path: Path) -> None:
     ranked = retrieve_ranked(_sample_chunks(), domain="controls")
     answer = {
@@ -87,6 +169,35 @@ def test_write_pass_results_persists_payload(tmp_path: Path) -> None:
     payload = json.loads(Path(path).read_text(encoding="utf-8"))
     assert payload["doc_id"] == "doc"
     assert payload["pass_name"] == "controls"
+    assert not Path(path).with_name("manifest.json").exists()
+
+
+def test_manifest_writer_merges_concurrent_commits() -> None:
+    names = [f"pass{index}" for index in range(8)]
+
+    def run(name: str) -> None:
+        writer = PassManifestWriter("doc")
+        if name.endswith(("3", "5")):
+            writer.fail(name, "RuntimeError: boom")
+        else:
+            writer.record(name, f"/artifacts/{name}.json")
+        writer.commit([name])
+
+    threads = [threading.Thread(target=run, args=(name,)) for name in names]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    manifest = read_pass_manifest("doc")
+    assert sorted(manifest.passes) == [n for n in names if n not in {"pass3", "pass5"}]
+    assert sorted(manifest.failures) == ["pass3", "pass5"]
+
+    rerun = PassManifestWriter("doc")
+    rerun.record("pass3", "/artifacts/pass3.json")
+    rerun.fail("pass0", "ValueError: bad")
+    manifest = rerun.commit(["pass0", "pass3"])
+    assert "pass0" not in manifest.passes and manifest.passes["pass3"]
+    assert sorted(manifest.failures) == ["pass0", "pass5"]
 
 
 def _prepare_header_chunks(
@@ -107,12 +218,80 @@ def test_run_all_emits_all_passes(
     expected_sections: dict[str, list[str]],
 ) -> None:
     doc_id, chunks_path = _prepare_header_chunks(sample_pdf_path, monkeypatch)
+    assert chunks_path.with_name("header_chunks.features.npz").exists()
+    assert load_rank_features(chunks_path, load_chunks(chunks_path)) is not None
     jobs = run_all(doc_id, str(chunks_path))
     assert set(jobs.passes.keys()) == set(expected_sections["passes"])
     for artifact in jobs.passes.values():
         assert Path(artifact).exists()
 
 
+def test_passes_open_retrieval_indexes_saved_at_header_time(
+    sample_pdf_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    doc_id, chunks_path = _prepare_header_chunks(sample_pdf_path, monkeypatch)
+    assert index_manifest_path(chunks_path).exists()
+    chunks = load_chunks(chunks_path)
+    domains = ["mechanical", "controls"]
+    expected = RetrievalSession(chunks).rank_batch(domains)
+
+    embedded: list[int] = []
+    original = LLMClient.embed_async
+
+    async def counting_embed(self: LLMClient, texts: list[str]) -> Any:
+        embedded.append(len(texts))
+        return await original(self, texts)
+
+    monkeypatch.setattr(LLMClient, "embed_async", counting_embed)
+    session = asyncio.run(RetrievalSession.build_async(chunks, chunks_path=chunks_path))
+    assert session.dense is not None and len(session.dense) == len(chunks)
+    assert asyncio.run(session.rank_batch_async(domains)) == expected
+    assert embedded == [len(domains)], "only the queries are embedded"
+
+    edited = [dict(chunks[0], text="Rewritten text."), *chunks[1:]]
+    asyncio.run(RetrievalSession.build_async(edited, chunks_path=chunks_path))
+    assert embedded[-1] == len(chunks), "stale indexes are rebuilt"
+
+
+def test_run_all_reuses_passes_with_unchanged_fingerprints(
+    sample_pdf_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    doc_id, chunks_path = _prepare_header_chunks(sample_pdf_path, monkeypatch)
+    first = run_all(doc_id, str(chunks_path))
+    assert first.reused == []
+
+    chats: list[str] = []
+    original_chat = LLMClient.chat_async
+
+    async def counting_chat(
+        self: LLMClient, system: str, **kwargs: Any
+    ) -> dict[str, Any]:
+        chats.append(system)
+        return await original_chat(self, system, **kwargs)
+
+    monkeypatch.setattr(LLMClient, "chat_async", counting_chat)
+    again = run_all(doc_id, str(chunks_path))
+    assert chats == [] and sorted(again.reused) == sorted(first.passes)
+    assert again.passes == first.passes
+
+    def edited_render(self: MechanicalPrompt, context: str) -> tuple[str, str]:
+        return "Edited mechanical system prompt.", f"Summarise.\n\n{context}"
+
+    monkeypatch.setattr(MechanicalPrompt, "render", edited_render)
+    edited = run_all(doc_id, str(chunks_path))
+    assert chats == ["Edited mechanical system prompt."]
+    assert "mechanical" not in edited.reused and len(edited.reused) == 4
+
+    subset = run_all(doc_id, str(chunks_path), passes=["controls"], force=True)
+    assert list(subset.passes) == ["controls"] and subset.reused == []
+    assert len(chats) == 2
+    manifest = read_pass_manifest(doc_id)
+    assert list(manifest.passes) == list(first.passes)
+    assert set(manifest.fingerprints) == set(first.passes)
+    with pytest.raises(ValidationError):
+        run_all(doc_id, str(chunks_path), passes=["acoustics"])
+
+
 def test_run_all_outputs_validate_schema_and_content(
     sample_pdf_path: Path,
     monkeypatch: pytest.MonkeyPatch,
@@ -149,9 +328,13 @@ def test_run_all_outputs_validate_schema_and_content(
             assert preview in result.answer
 
 
-def test_compose_window_dedupes_and_honors_budget() -> None:
+def test_compose_window_dedupes_and_honors_budget(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
     """Context composer removes duplicates and respects token ceiling."""
 
+    words = SimpleNamespace(name="words", count=get_analyzer().count)
+    monkeypatch.setattr(context, "get_token_counter", lambda: words)
     ranked = [
         {
             "chunk_id": "doc:c1",
@@ -175,3 +358,146 @@ def test_compose_window_dedupes_and_honors_budget() -> None:
     assert "Controls/Safety" not in window
     segments = window.split("\n\n")
     assert segments == ["[Mechanics/Drive] Alpha beta gamma"]
+    assert (
+        compose_window(ranked, budget_tokens=3) == "[Mechanics/Drive] Alpha"
+    ), "an oversize top chunk is cut to the budget"
+
+
+def test_compose_window_knapsack_fills_budget_by_score_per_token(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    # Budgets below are in words; pin counting so they do not depend on
+    # whether a tiktoken encoding is available.
+    words = SimpleNamespace(name="words", count=get_analyzer().count)
+    monkeypatch.setattr(context, "get_token_counter", lambda: words)
+    ranked = [
+        {"chunk_id": "a", "text": "pump seal leak rate", "total_score": 3.0},
+        {
+            "chunk_id": "b",
+            "text": "relief valve set. five six seven eight",
+            "total_score": 2.0,
+        },
+        {"chunk_id": "c", "text": "motor frame bolt torque", "total_score": 1.0},
+    ]
+    assert compose_window(ranked, budget_tokens=10) == "pump seal leak rate"
+    assert compose_window(ranked, budget_tokens=10, packing="knapsack") == (
+        "pump seal leak rate\n\nmotor frame bolt torque"
+    )
+    assert compose_window(ranked, budget_tokens=7, packing="knapsack") == (
+        "pump seal leak rate\n\nrelief valve set."
+    ), "oversize chunks are trimmed at sentence boundaries"
+    assert compose_window(ranked[:1], budget_tokens=2, packing="knapsack") == (
+        "pump seal"
+    ), "the top chunk is always kept, cut to the budget"
+
+
+def test_run_all_runs_passes_concurrently_and_isolates_failures(
+    sample_pdf_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    doc_id, chunks_path = _prepare_header_chunks(sample_pdf_path, monkeypatch)
+    monkeypatch.setenv("LLM_BATCH_SIZE", "3")
+    get_settings.cache_clear()
+    active = [0, 0]
+    original = LLMClient.chat_async
+
+    async def slow_chat(self: LLMClient, system: str, user: str, context: str) -> Any:
+        active[0] += 1
+        active[1] = max(active)
+        try:
+            await asyncio.sleep(0.05)
+            if "software" in system:
+                raise RuntimeError("provider timeout")
+            return await original(self, system=system, user=user, context=context)
+        finally:
+            active[0] -= 1
+
+    monkeypatch.setattr(LLMClient, "chat_async", slow_chat)
+    jobs = run_all(doc_id, str(chunks_path))
+    assert 1 < active[1] <= 3, "passes overlap up to LLM_BATCH_SIZE"
+    assert "software" not in jobs.passes and len(jobs.passes) == 4
+    assert jobs.failures == {"software": "RuntimeError: provider timeout"}
+    manifest = json.loads(Path(jobs.manifest_path).read_text(encoding="utf-8"))
+    assert manifest["failures"] == jobs.failures
+    assert list(manifest["passes"]) == list(jobs.passes)
+
+
+def test_stream_endpoint_forwards_deltas_and_persists_results(
+    sample_pdf_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    doc_id, chunks_path = _prepare_header_chunks(sample_pdf_path, monkeypatch)
+    client = TestClient(create_app())
+    with client.stream(
+        "POST",
+        "/passes/stream",
+        json={"doc_id": doc_id, "rechunk_artifact": str(chunks_path)},
+    ) as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        body = "".join(response.iter_text())
+
+    events = [
+        (block.split("\n")[0][len("event: ") :], json.loads(block.split("\n")[1][6:]))
+        for block in body.strip().split("\n\n")
+    ]
+    names = [name for name, _ in events]
+    assert names[0] == "start" and names[-1] == "done"
+    completed = {data["pass"]: data for name, data in events if name == "pass_complete"}
+    assert set(completed) == set(events[0][1]["passes"])
+    for pass_name, data in completed.items():
+        assert data["ttft_ms"] is not None
+        assert data["ttft_source"] == "replay", "offline answers are replayed"
+        streamed = "".join(
+            d["text"] for n, d in events if n == "delta" and d["pass"] == pass_name
+        )
+        result = PassResult.model_validate_json(
+            Path(data["artifact"]).read_text(encoding="utf-8")
+        )
+        assert result.answer == streamed.strip()
+    assert events[-1][1]["passes"] == {n: d["artifact"] for n, d in completed.items()}
+
+    missing = client.post(
+        "/passes/stream", json={"doc_id": doc_id, "rechunk_artifact": "nope.jsonl"}
+    )
+    assert missing.status_code == 404
+
+
+def test_stream_reports_ranking_failure_as_error_event(
+    sample_pdf_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    doc_id, chunks_path = _prepare_header_chunks(sample_pdf_path, monkeypatch)
+
+    def broken(self: RetrievalSession, domains: list[str]) -> Any:
+        raise RuntimeError("index unavailable")
+
+    monkeypatch.setattr(RetrievalSession, "rank_batch", broken)
+
+    async def collect() -> list[Any]:
+        return [event async for event in stream_all(doc_id, str(chunks_path))]
+
+    events = asyncio.run(collect())
+    assert [event.event for event in events] == ["error"]
+    assert "index unavailable" in events[0].data["error"]
+    manifest = read_pass_manifest(doc_id)
+    assert set(manifest.failures) == set(events[0].data["failures"])
+    assert manifest.failures and not manifest.passes
+
+
+def test_stream_commits_finished_passes_when_closed_early(
+    sample_pdf_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    doc_id, chunks_path = _prepare_header_chunks(sample_pdf_path, monkeypatch)
+    monkeypatch.setenv("LLM_BATCH_SIZE", "1")
+    get_settings.cache_clear()
+
+    async def first_pass() -> str:
+        stream = stream_all(doc_id, str(chunks_path))
+        async for event in stream:
+            if event.event == "pass_complete":
+                await stream.aclose()  # type: ignore[attr-defined]
+                return str(event.data["pass"])
+        raise AssertionError("no pass completed")
+
+    finished = asyncio.run(first_pass())
+    manifest = read_pass_manifest(doc_id)
+    assert list(manifest.passes) == [finished]
+    assert finished in manifest.fingerprints
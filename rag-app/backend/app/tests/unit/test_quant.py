@@ -0,0 +1,161 @@
+"""Tests for quantized dense indexes."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from ...adapters.ann import make_dense_index
+from ...adapters.quant import ProductQuantizedIndex, ScalarQuantizedIndex
+from ...adapters.vector_format import read_vector_file, write_vector_file
+from ...adapters.vectors import FaissIndex
+from ...config import get_settings
+
+
+def _corpus(count: int, dim: int, seed: int = 3) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(32, dim))
+    labels = rng.integers(0, len(centres), size=count)
+    return centres[labels] + 0.3 * rng.normal(size=(count, dim))
+
+
+def _recall(index: FaissIndex, exact: FaissIndex, queries: np.ndarray) -> float:
+    hits = 0
+    for query in queries.tolist():
+        expected = {row for row, _ in exact.search(query, k=10)}
+        hits += len(expected & {row for row, _ in index.search(query, k=10)})
+    return hits / (10 * len(queries))
+
+
+@pytest.mark.parametrize(
+    ("factory", "bytes_per_vector", "min_recall"),
+    [
+        (lambda: ScalarQuantizedIndex(32, rescore_factor=0), 32, 0.9),
+        (lambda: ProductQuantizedIndex(32, subvectors=8, rescore_factor=0), 8, 0.5),
+        (lambda: ProductQuantizedIndex(32, subvectors=8, rescore_factor=8), 8, 0.9),
+    ],
+)
+def test_quantized_index_recall_and_code_size(
+    factory: object, bytes_per_vector: int, min_recall: float
+) -> None:
+    vectors = _corpus(2000, 32)
+    queries = _corpus(25, 32, seed=9)
+    exact = FaissIndex(dim=32)
+    exact.add(vectors.tolist())
+    index = factory()  # type: ignore[operator]
+    index.add(vectors.tolist())
+
+    assert _recall(index, exact, queries) >= min_recall
+    assert index.is_trained
+    assert index.code_bytes == bytes_per_vector
+
+
+def test_quantized_rescoring_returns_exact_scores() -> None:
+    vectors = _corpus(600, 16)
+    index = ScalarQuantizedIndex(16, rescore_factor=4)
+    index.add(vectors.tolist())
+    exact = FaissIndex(dim=16)
+    exact.add(vectors.tolist())
+    query = vectors[17].tolist()
+    results = index.search(query, k=3)
+    assert results[0] == (17, pytest.approx(1.0, abs=1e-6))
+    for row, score in results:
+        assert score == pytest.approx(dict(exact.search(query, k=600))[row], abs=1e-6)
+
+
+def test_product_quantized_index_persists_codes(tmp_path: Path) -> None:
+    vectors = _corpus(700, 16)
+    path = tmp_path / "vectors.pq.bin"
+    index = ProductQuantizedIndex(
+        16, index_path=str(path), subvectors=4, rescore_factor=2, ksub=64
+    )
+    index.add(vectors[:500].tolist())
+    index.train()
+    index.add(vectors[500:].tolist())
+    index.save()
+
+    stored = read_vector_file(path)
+    assert stored.arrays["pq_codes"].shape == (700, 4)
+    assert stored.arrays["pq_centroids"].shape == (4, 64, 4)
+    assert stored.meta["subvectors"] == 4
+
+    reloaded = ProductQuantizedIndex(
+        16, index_path=str(path), subvectors=4, rescore_factor=2, ksub=64
+    )
+    assert reloaded.is_trained
+    query = vectors[650].tolist()
+    assert reloaded.search(query, k=5) == index.search(query, k=5)
+    with pytest.raises(ValueError):
+        ProductQuantizedIndex(16, subvectors=5)
+
+
+def test_make_dense_index_builds_quantized_types(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setenv("VECTOR_INDEX_TYPE", "pq")
+    monkeypatch.setenv("VECTOR_PQ_SUBVECTORS", "4")
+    monkeypatch.setenv("VECTOR_RESCORE_FACTOR", "0")
+    get_settings.cache_clear()
+    index = make_dense_index(8)
+    assert isinstance(index, ProductQuantizedIndex)
+    assert index.params == {"subvectors": 4, "ksub": 256, "rescore_factor": 0}
+    assert isinstance(make_dense_index(8, index_type="sq8"), ScalarQuantizedIndex)
+
+
+def test_trained_index_keeps_no_resident_float_rows(tmp_path: Path) -> None:
+    vectors = _corpus(400, 16)
+    dropped = ScalarQuantizedIndex(16, rescore_factor=0)
+    dropped.add(vectors[:100].tolist())
+    dropped.search(vectors[0].tolist(), k=1)
+    assert not dropped.is_trained, "searches never train"
+    dropped.add(vectors[100:300].tolist())
+    assert dropped.is_trained, "the add crossing the minimum trains"
+    dropped.train()
+    assert len(dropped._matrix) == 0, "rescore_factor 0 never reads float rows"
+    dropped.add(vectors[300:].tolist())
+    dropped.update([5], [vectors[6].tolist()])
+    query = vectors[6].tolist()
+    assert {row for row, _ in dropped.search(query, k=2)} == {5, 6}
+    assert dropped.search_rows(query, [5, 6, 7], k=1)[0][0] in {5, 6}
+
+    path = tmp_path / "vectors.sq8.bin"
+    dropped.save_to(str(path))
+    assert read_vector_file(path).meta["float_rows"] == "decoded"
+    reloaded = ScalarQuantizedIndex(16, index_path=str(path), rescore_factor=0)
+    assert reloaded.is_trained and len(reloaded._matrix) == 0
+    assert reloaded.search(query, k=5) == dropped.search(query, k=5)
+
+    rescored = ProductQuantizedIndex(16, subvectors=4, rescore_factor=2, ksub=64)
+    rescored.add(vectors.tolist())
+    rescored.train()
+    assert isinstance(rescored._matrix, np.memmap), "float rows are only mapped"
+    rescored.add(vectors[:3].tolist())
+    assert isinstance(rescored._matrix, np.memmap)
+    np.testing.assert_array_equal(rescored._matrix[400:403], rescored._matrix[:3])
+    exact = FaissIndex(dim=16)
+    exact.add(vectors.tolist())
+    expected = dict(exact.search(vectors[7].tolist(), k=400))
+    for row, score in rescored.search(vectors[7].tolist(), k=3):
+        assert score == pytest.approx(expected[row % 400], abs=1e-6)
+
+
+def test_product_quantized_load_rejects_mismatched_codebook(tmp_path: Path) -> None:
+    vectors = _corpus(300, 16)
+    path = tmp_path / "vectors.pq.bin"
+    index = ProductQuantizedIndex(16, subvectors=4, rescore_factor=1, ksub=64)
+    index.add(vectors.tolist())
+    index.train()
+    index.save_to(str(path))
+
+    assert ProductQuantizedIndex(16, str(path), 4, 1, ksub=64).is_trained
+    assert not ProductQuantizedIndex(16, str(path), 4, 1, ksub=32).is_trained
+
+    stored = read_vector_file(path, mmap=False)
+    arrays = dict(stored.arrays)
+    arrays["pq_centroids"] = arrays["pq_centroids"][:, :8]
+    write_vector_file(path, stored.matrix, arrays=arrays, meta=stored.meta)
+    assert not ProductQuantizedIndex(
+        16, str(path), 4, 1, ksub=64
+    ).is_trained, "codes address centroids beyond the stored codebook"
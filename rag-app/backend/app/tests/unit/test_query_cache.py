@@ -0,0 +1,128 @@
+"""Tests for the versioned hybrid search result cache."""
+
+from __future__ import annotations
+
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+from ...adapters.ann import IVFIndex
+from ...adapters.query_cache import QueryCache, get_query_cache
+from ...adapters.vectors import (
+    BM25Index,
+    FaissIndex,
+    hybrid_search,
+    hybrid_search_batch,
+)
+from ...main import create_app
+
+
+@pytest.fixture(autouse=True)
+def _fresh_cache() -> Iterator[None]:
+    get_query_cache.cache_clear()
+    yield
+    get_query_cache.cache_clear()
+
+
+def test_query_cache_lru_and_ttl() -> None:
+    now = [0.0]
+    cache = QueryCache(max_entries=2, ttl_seconds=10.0, clock=lambda: now[0])
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None, "least recently used entry is evicted"
+    now[0] = 11.0
+    assert cache.get("a") is None, "entries expire after the ttl"
+    assert cache.stats() == {
+        "entries": 1,
+        "max_entries": 2,
+        "hits": 1,
+        "misses": 2,
+        "hit_rate": 0.3333,
+        "expired": 1,
+        "evicted": 1,
+    }
+
+
+def test_hybrid_search_cache_is_invalidated_by_index_versions() -> None:
+    bm25 = BM25Index()
+    bm25.upsert([("a", "pump pressure"), ("b", "valve seat")])
+    dense = FaissIndex(dim=2)
+    dense.add([[1.0, 0.0], [0.0, 1.0]])
+    cache = get_query_cache()
+
+    first = hybrid_search(bm25, dense, "pump", [1.0, 0.0], k=2)
+    first[0]["score"] = -1.0
+    again = hybrid_search(bm25, dense, "pump", [1.0, 0.0], k=2)
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert again[0]["score"] > 0, "callers cannot corrupt cached entries"
+
+    hybrid_search(bm25, dense, "pump", [0.0, 1.0], k=2)
+    hybrid_search(bm25, dense, "pump", [1.0, 0.0], alpha=0.2, k=2)
+    assert cache.misses == 3, "vector and alpha are part of the key"
+
+    bm25.upsert([("b", "pump pump pump")])
+    changed = hybrid_search(bm25, dense, "pump", [1.0, 0.0], k=2)
+    assert cache.misses == 4
+    assert changed != again
+    dense.add([[0.6, 0.8]])
+    hybrid_search(bm25, dense, "pump", [1.0, 0.0], k=2)
+    assert cache.misses == 5
+
+    batch = hybrid_search_batch(
+        bm25, dense, ["pump", "valve"], [[1.0, 0.0], [0.0, 1.0]], k=2
+    )
+    assert batch[0] == hybrid_search(bm25, dense, "pump", [1.0, 0.0], k=2)
+    assert cache.hits == 3, "batch reuses cached queries and stores the rest"
+
+
+def _build(dense_path: Path | None = None) -> tuple[BM25Index, FaissIndex]:
+    bm25 = BM25Index()
+    bm25.upsert([("a", "pump pressure"), ("b", "valve seat")])
+    dense = FaissIndex(dim=2, index_path=str(dense_path) if dense_path else None)
+    dense.add([[1.0, 0.0], [0.0, 1.0]], ids=["a", "b"])
+    return bm25, dense
+
+
+def test_rebuilt_and_reopened_indexes_share_cache_entries(tmp_path: Path) -> None:
+    cache = get_query_cache()
+    bm25, dense = _build(tmp_path / "vectors.bin")
+    expected = hybrid_search(bm25, dense, "pump", [1.0, 0.0], k=2)
+
+    rebuilt_bm25, rebuilt_dense = _build()
+    assert rebuilt_bm25.version == bm25.version
+    assert rebuilt_dense.version == dense.version
+    assert hybrid_search(rebuilt_bm25, rebuilt_dense, "pump", [1.0, 0.0], k=2) == (
+        expected
+    )
+    assert (cache.hits, cache.misses) == (1, 1), "equal content hits the cache"
+
+    bm25.save_to(str(tmp_path / "bm25.sparse"))
+    dense.save()
+    reopened_bm25 = BM25Index.load(str(tmp_path / "bm25.sparse"))
+    reopened_dense = FaissIndex(dim=2, index_path=str(tmp_path / "vectors.bin"))
+    assert hybrid_search(reopened_bm25, reopened_dense, "pump", [1.0, 0.0], k=2) == (
+        expected
+    )
+    assert cache.hits == 2, "saved indexes keep their version"
+
+    rebuilt_bm25.delete(["b"])
+    assert rebuilt_bm25.version != bm25.version
+
+    coarse, fine = IVFIndex(2, nlist=2, nprobe=1), IVFIndex(2, nlist=2, nprobe=2)
+    for index in (coarse, fine):
+        index.add([[1.0, 0.0], [0.0, 1.0]])
+    assert coarse.version == fine.version
+    hybrid_search(None, coarse, "pump", [1.0, 0.0], k=2)
+    hybrid_search(None, fine, "pump", [1.0, 0.0], k=2)
+    assert cache.misses == 3, "index parameters are part of the key"
+
+
+def test_metrics_endpoint_reports_query_cache() -> None:
+    hybrid_search(BM25Index(), None, "anything", None)
+    response = TestClient(create_app()).get("/metrics")
+    assert response.status_code == 200
+    assert response.json()["query_cache"]["misses"] == 1
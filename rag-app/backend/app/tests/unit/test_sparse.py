@@ -0,0 +1,116 @@
+"""Tests for incremental BM25 maintenance."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+
+from ...adapters.sparse import _SEGMENT_SIZE, BM25Index
+from ...adapters.sparse_format import read_sparse_file
+
+
+def _scores(index: BM25Index, query: str) -> dict[str | None, float]:
+    return {index.chunk_id(row): score for row, score in index.search(query, k=10**6)}
+
+
+def test_bm25_upsert_and_delete_match_fresh_index() -> None:
+    index = BM25Index(compaction_threshold=1.0)
+    index.add(["pump pressure", "valve seat leak", "pump motor"], ids=["a", "b", "c"])
+    index.upsert([("b", "pump valve pressure pressure"), ("d", "motor torque")])
+    assert index.delete(["c", "missing"]) == 1
+    assert len(index) == 3 and index.tombstones == 2
+
+    fresh = BM25Index()
+    fresh.add(
+        ["pump pressure", "pump valve pressure pressure", "motor torque"],
+        ids=["a", "b", "d"],
+    )
+    for query in ("pump pressure", "motor", "valve leak"):
+        assert _scores(index, query) == _scores(fresh, query)
+    assert index.search("leak") == [], "replaced text no longer matches"
+
+
+def test_bm25_compaction_purges_tombstones_without_changing_scores() -> None:
+    rng = np.random.default_rng(2)
+    vocab = [f"t{i}" for i in range(50)]
+    docs = {
+        f"chunk-{i}": " ".join(rng.choice(vocab, size=int(rng.integers(3, 12))))
+        for i in range(_SEGMENT_SIZE + 200)
+    }
+    index = BM25Index(compaction_threshold=0.5)
+    index.upsert(docs.items())
+    doomed = [f"chunk-{i}" for i in range(0, _SEGMENT_SIZE, 3)]
+    index.delete(doomed)
+    assert index.tombstones == len(doomed), "below threshold: nothing compacted"
+
+    before = _scores(index, "t1 t2 t3")
+    index.delete([f"chunk-{i}" for i in range(1, _SEGMENT_SIZE, 3)])
+    assert index.tombstones == 0, "segment past threshold is rewritten"
+    assert len(index) == len(docs) - len(doomed) - len(range(1, _SEGMENT_SIZE, 3))
+
+    live = {
+        key: text
+        for key, text in docs.items()
+        if int(key.split("-")[1]) % 3 == 2 or int(key.split("-")[1]) >= _SEGMENT_SIZE
+    }
+    fresh = BM25Index()
+    fresh.upsert(live.items())
+    assert _scores(index, "t1 t2 t3") == _scores(fresh, "t1 t2 t3")
+    assert before.keys() >= _scores(index, "t1 t2 t3").keys()
+    assert index.compact() == 0
+
+
+def test_bm25_save_and_load_round_trip(tmp_path: Path) -> None:
+    rng = np.random.default_rng(5)
+    vocab = [f"t{i}" for i in range(200)]
+    docs = {
+        f"chunk-{i}": " ".join(rng.choice(vocab, size=int(rng.integers(5, 30))))
+        for i in range(3000)
+    }
+    index = BM25Index(compaction_threshold=1.0)
+    index.upsert(docs.items())
+    index.delete([f"chunk-{i}" for i in range(0, 3000, 4)])
+    path = tmp_path / "bm25.index.bin"
+    index.save_to(str(path))
+    assert index.tombstones == 0, "saving compacts first"
+
+    stored = read_sparse_file(path)
+    assert isinstance(stored.arrays["posting_docs"], np.memmap)
+    loaded = BM25Index.load(str(path))
+    assert len(loaded) == len(index)
+    assert isinstance(loaded._doc_lengths, np.memmap)
+    assert isinstance(loaded._stored and loaded._stored.posting_offsets, np.memmap)
+    for query in ("t1", "t3 t5 t7 t9 t11 t13", "missing t2"):
+        assert _scores(loaded, query) == _scores(index, query)
+        assert loaded.search(query, k=5) == index.search(query, k=5)
+
+    assert loaded.search_batch(["t1", "t3 t5"], k=5) == index.search_batch(
+        ["t1", "t3 t5"], k=5
+    )
+    assert isinstance(loaded._norms, np.memmap), "searches read the saved norms"
+
+    loaded.upsert([("chunk-1", "t1 t1 fresh"), ("chunk-new", "fresh t2")])
+    loaded.delete(["chunk-2"])
+    index.upsert([("chunk-1", "t1 t1 fresh"), ("chunk-new", "fresh t2")])
+    index.delete(["chunk-2"])
+    for query in ("fresh", "t1 t2"):
+        assert _scores(loaded, query) == _scores(index, query)
+
+
+def test_bm25_search_batch_equals_single_searches() -> None:
+    rng = np.random.default_rng(8)
+    vocab = [f"t{i}" for i in range(120)]
+    docs = {
+        f"chunk-{i}": " ".join(rng.choice(vocab, size=int(rng.integers(3, 25))))
+        for i in range(2500)
+    }
+    index = BM25Index(compaction_threshold=1.0)
+    index.upsert(docs.items())
+    index.delete([f"chunk-{i}" for i in range(0, 2500, 5)])
+    queries = ["t1 t2", "t2 t1 t3 t4 t5 t6 t7", "unknown", "t9 t9 t10"]
+
+    for k in (1, 10, 5000):
+        batch = index.search_batch(queries, k=k)
+        assert batch == [index.search(query, k=k) for query in queries]
+    assert BM25Index().search_batch(queries) == [[], [], [], []]
@@ -6,6 +6,7 @@ import asyncio
 import io
 import json
 import logging
+import threading
 from collections.abc import AsyncIterator
 from pathlib import Path
 
@@ -24,6 +25,34 @@ def test_write_and_read_json_roundtrip(tmp_path: Path) -> None:
     assert data == payload
 
 
+def test_write_json_replaces_file_atomically(tmp_path: Path) -> None:
+    target = tmp_path / "manifest.json"
+    storage.write_json(str(target), {"version": 0})
+    seen: list[int] = []
+    torn: list[str] = []
+    stop = threading.Event()
+
+    def read_loop() -> None:
+        while not stop.is_set():
+            text = target.read_text(encoding="utf-8")
+            try:
+                seen.append(json.loads(text)["version"])
+            except ValueError:
+                torn.append(text)
+
+    reader = threading.Thread(target=read_loop)
+    reader.start()
+    try:
+        for version in range(1, 200):
+            storage.write_json(str(target), {"version": version, "pad": "x" * 4096})
+    finally:
+        stop.set()
+        reader.join()
+    assert not torn, "readers only ever see whole documents"
+    assert seen == sorted(seen)
+    assert [path.name for path in tmp_path.iterdir()] == ["manifest.json"]
+
+
 def test_write_jsonl_and_read_handles_invalid_rows(
     tmp_path: Path, caplog: pytest.LogCaptureFixture
 ) -> None:
@@ -0,0 +1,29 @@
+"""Tests for model-token counting."""
+
+from __future__ import annotations
+
+import sys
+from typing import Any
+
+import pytest
+
+from ...adapters import tokenizer
+from ...adapters.tokenizer import ESTIMATOR_NAME, TokenCounter
+
+
+def test_token_counter_estimates_without_tiktoken(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    warnings: list[str] = []
+
+    def record(message: str, **kwargs: Any) -> None:
+        warnings.append(message)
+
+    monkeypatch.setitem(sys.modules, "tiktoken", None)
+    monkeypatch.setattr(tokenizer.logger, "warning", record)
+    counter = TokenCounter("cl100k_base")
+    assert counter.name == ESTIMATOR_NAME
+    assert warnings == ["tokenizer.encoding_unavailable"]
+    assert counter.count("") == 0
+    assert counter.count("pressure transducer calibration") == 8, "31 chars / 4"
+    assert counter.count("a b c d e f") == 6, "never below the word count"
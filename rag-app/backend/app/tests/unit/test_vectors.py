@@ -3,15 +3,24 @@
 from __future__ import annotations
 
 import math
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+import numpy as np
 import pytest
+from fastapi.testclient import TestClient
 
+from ...adapters import sparse
+from ...adapters.ann import IVFIndex, make_dense_index
+from ...adapters.bm25_search import search_exhaustive
+from ...adapters.qdrant_standin import create_app
+from ...adapters.vector_format import is_vector_file, read_vector_file
 from ...adapters.vectors import (
     BM25Index,
     FaissIndex,
     QdrantIndex,
     hybrid_search,
+    hybrid_search_batch,
 )
 from ...config import get_settings
 
@@ -27,6 +36,81 @@ def test_bm25_index_add_and_search() -> None:
     assert results[0][1] >= results[1][1] > 0
 
 
+def test_bm25_postings_match_exhaustive_scoring() -> None:
+    docs = [
+        "pump pressure rating 10 bar",
+        "pressure sensor wiring and pressure alarms",
+        "conveyor motor torque",
+        "pump motor pressure pressure pressure",
+    ]
+    index = BM25Index()
+    index.add(docs[:2])
+    index.add(docs[2:])
+
+    tokenized = [doc.lower().split() for doc in docs]
+    avgdl = sum(len(tokens) for tokens in tokenized) / len(tokenized)
+
+    def reference(query: str) -> dict[int, float]:
+        scores: dict[int, float] = {}
+        for idx, tokens in enumerate(tokenized):
+            score = 0.0
+            for term in query.lower().split():
+                tf = tokens.count(term)
+                if not tf:
+                    continue
+                df = sum(1 for other in tokenized if term in other)
+                idf = math.log(1 + (len(docs) - df + 0.5) / (df + 0.5))
+                norm = 1.5 * (1 - 0.75 + 0.75 * len(tokens) / avgdl)
+                score += idf * tf * 2.5 / (tf + norm)
+            if score > 0:
+                scores[idx] = score
+        return scores
+
+    results = index.search("pump pressure", k=10)
+    expected = reference("pump pressure")
+    assert [idx for idx, _ in results] == sorted(
+        expected, key=lambda idx: expected[idx], reverse=True
+    )
+    for idx, score in results:
+        assert score == pytest.approx(expected[idx])
+    assert len(index.search("pump pressure", k=2)) == 2
+    assert index.search("unknown terms") == []
+
+
+def test_bm25_pruned_search_is_identical_to_exhaustive(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    rng = np.random.default_rng(5)
+    vocab = [f"term{i}" for i in range(300)]
+    weights = 1.0 / np.arange(1, len(vocab) + 1)
+    weights /= weights.sum()
+    docs = [
+        " ".join(rng.choice(vocab, size=int(rng.integers(4, 40)), p=weights))
+        for _ in range(1500)
+    ]
+    index = BM25Index()
+    index.add(docs[:700])
+    index.add(docs[700:])
+
+    exhaustive_calls: list[int] = []
+
+    def _tracking(
+        terms: list, k: int, norms: list[float], dead: set[int]
+    ) -> list[tuple[int, float]]:
+        exhaustive_calls.append(k)
+        return search_exhaustive(terms, k, norms, dead)
+
+    norms = index._doc_norms()
+    for size in (2, 5, 9):
+        query = " ".join(rng.choice(vocab, size=size, p=weights))
+        for k in (1, 10, 50):
+            expected = search_exhaustive(index._query_terms(query), k, norms, set())
+            monkeypatch.setattr(sparse, "search_exhaustive", _tracking)
+            assert index.search(query, k=k) == expected
+            monkeypatch.undo()
+    assert not exhaustive_calls, "large queries should take the pruned path"
+
+
 def test_bm25_empty_index_returns_empty() -> None:
     index = BM25Index()
     assert index.search("anything") == []
@@ -47,6 +131,157 @@ def test_faiss_index_add_search_and_persist(tmp_path: Path) -> None:
     assert math.isclose(similarity, 1.0, rel_tol=1e-6)
 
 
+def test_faiss_index_binary_format_is_memory_mapped(tmp_path: Path) -> None:
+    index_path = tmp_path / "vectors.faiss.bin"
+    index = FaissIndex(dim=3, index_path=str(index_path))
+    index.add([[3.0, 0.0, 0.0], [0.0, 2.0, 0.0]], ids=["doc:c1", "doc:c2"])
+    index.save()
+    assert is_vector_file(index_path)
+
+    stored = read_vector_file(index_path)
+    assert isinstance(stored.matrix, np.memmap)
+    assert (stored.dim, stored.count, stored.ids) == (3, 2, ["doc:c1", "doc:c2"])
+
+    reloaded = FaissIndex(dim=3, index_path=str(index_path))
+    assert reloaded.ids == ["doc:c1", "doc:c2"]
+    assert reloaded.search([0.0, 1.0, 0.0], k=1)[0][0] == 1
+    reloaded.add([[0.0, 0.0, 5.0]], ids=["doc:c3"])
+    assert reloaded.search([0.0, 0.0, 1.0], k=1) == [(2, pytest.approx(1.0))]
+    assert read_vector_file(index_path).count == 2, "mapped file stays untouched"
+
+    with pytest.raises(ValueError):
+        reloaded.add([[1.0, 0.0, 0.0]])
+
+
+def test_concurrent_saves_of_one_index_do_not_share_a_temp_file(
+    tmp_path: Path,
+) -> None:
+    index_path = tmp_path / "vectors.faiss.bin"
+    index = FaissIndex(dim=8, index_path=str(index_path))
+    index.add(np.eye(8).tolist() * 64)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda _: index.save(), range(32)))
+    assert read_vector_file(index_path).count == 512
+    assert [path.name for path in tmp_path.iterdir()] == ["vectors.faiss.bin"]
+
+
+def test_faiss_index_matrix_search_matches_cosine_ranking() -> None:
+    vectors = [[float((i * 7 + j * 3) % 11) - 5.0 for j in range(4)] for i in range(40)]
+    query = [1.0, -2.0, 0.5, 3.0]
+    index = FaissIndex(dim=4)
+    for offset in range(0, len(vectors), 7):
+        index.add(vectors[offset : offset + 7])
+    assert len(index) == len(vectors)
+
+    def cosine(a: list[float], b: list[float]) -> float:
+        dot = sum(x * y for x, y in zip(a, b, strict=True))
+        norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+        return dot / (norm or 1.0)
+
+    expected = sorted(
+        ((idx, cosine(query, vector)) for idx, vector in enumerate(vectors)),
+        key=lambda item: (-item[1], item[0]),
+    )[:5]
+    results = index.search(query, k=5)
+    assert [idx for idx, _ in results] == [idx for idx, _ in expected]
+    for (_, score), (_, reference) in zip(results, expected, strict=True):
+        assert score == pytest.approx(reference, abs=1e-5)
+    assert len(index.search(query, k=100)) == len(vectors)
+
+
+def _clustered_vectors(count: int, dim: int, seed: int = 7) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(16, dim))
+    labels = rng.integers(0, len(centres), size=count)
+    return centres[labels] + 0.1 * rng.normal(size=(count, dim))
+
+
+def test_ivf_index_recall_and_exact_probe() -> None:
+    vectors = _clustered_vectors(800, 8)
+    queries = _clustered_vectors(20, 8, seed=11)
+    flat = FaissIndex(dim=8)
+    flat.add(vectors.tolist())
+    ivf = IVFIndex(dim=8, nlist=16, nprobe=16)
+    ivf.add(vectors.tolist())
+
+    for query in queries.tolist():
+        assert [i for i, _ in ivf.search(query, k=10)] == [
+            i for i, _ in flat.search(query, k=10)
+        ]
+    assert ivf.is_trained
+
+    ivf.nprobe = 4
+    hits = 0
+    for query in queries.tolist():
+        exact = {i for i, _ in flat.search(query, k=10)}
+        hits += len(exact & {i for i, _ in ivf.search(query, k=10)})
+    assert hits / (10 * len(queries)) >= 0.8
+
+
+def test_ivf_index_incremental_insert_and_persistence(tmp_path: Path) -> None:
+    vectors = _clustered_vectors(300, 6)
+    path = tmp_path / "vectors.ivf.bin"
+    ivf = IVFIndex(dim=6, index_path=str(path), nlist=8, nprobe=8)
+    ivf.add(vectors[:200].tolist())
+    ivf.train()
+    ivf.add(vectors[200:].tolist())
+    query = vectors[250].tolist()
+    assert ivf.search(query, k=1)[0][0] == 250
+    ivf.save()
+
+    stored = read_vector_file(path)
+    assert stored.meta["index_type"] == "ivf"
+    assert stored.arrays["ivf_assign"].shape == (300,)
+
+    reloaded = IVFIndex(dim=6, index_path=str(path))
+    assert reloaded.is_trained
+    assert reloaded.params == {"nlist": 8, "nprobe": 8}, "saved params win"
+    assert reloaded.search(query, k=5) == ivf.search(query, k=5)
+    assert IVFIndex(dim=6, index_path=str(path), nprobe=2).nprobe == 2
+
+
+def test_ivf_index_trains_on_write_and_searches_read_only() -> None:
+    vectors = _clustered_vectors(700, 6)
+    ivf = IVFIndex(dim=6, nlist=8, nprobe=8)
+    ivf.add(vectors[:20].tolist())
+    assert not ivf.is_trained, "too few rows; searches stay exact"
+    ivf.add(vectors[20:40].tolist())
+    assert ivf.is_trained, "training happens on the add that crosses nlist * 4"
+    for start in range(40, 70, 3):
+        ivf.add(vectors[start : start + 3].tolist())
+    snapshot = ivf._ivf
+    assert snapshot is not None and any(snapshot.pending)
+    pending = [list(rows) for rows in snapshot.pending]
+    version = ivf.version
+    assert ivf.search(vectors[65].tolist(), k=1)[0][0] == 65
+    assert ivf._ivf is snapshot and snapshot.pending == pending
+    assert ivf.version == version
+
+    ivf.add(vectors[70:].tolist())
+    assert ivf._trained_rows == 700, "doubling the rows retrains"
+    flat = FaissIndex(dim=6)
+    flat.add(vectors.tolist())
+    query = vectors[333].tolist()
+    assert ivf.search(query, k=5) == flat.search(query, k=5)
+
+
+def test_make_dense_index_follows_settings(monkeypatch: pytest.MonkeyPatch) -> None:
+    assert type(make_dense_index(4)) is FaissIndex
+    monkeypatch.setenv("VECTOR_INDEX_TYPE", "ivf")
+    monkeypatch.setenv("VECTOR_IVF_NPROBE", "3")
+    get_settings.cache_clear()
+    index = make_dense_index(4)
+    assert isinstance(index, IVFIndex) and index.nprobe == 3
+    index = make_dense_index(4, params={"nlist": 5, "nprobe": 2, "ksub": 16})
+    assert isinstance(index, IVFIndex) and index.params == {"nlist": 5, "nprobe": 2}
+    pq = make_dense_index(
+        4, index_type="pq", params={"subvectors": 2, "ksub": 16, "rescore_factor": 0}
+    )
+    assert pq.params == {"subvectors": 2, "ksub": 16, "rescore_factor": 0}
+    with pytest.raises(ValueError):
+        make_dense_index(4, index_type="hnsw")
+
+
 def test_faiss_index_validates_dimensions() -> None:
     index = FaissIndex(dim=2)
     with pytest.raises(ValueError):
@@ -82,6 +317,85 @@ def test_qdrant_search_handles_missing_payloads() -> None:
     assert results[0]["payload"].get("id", "") in {"only", ""}
 
 
+def _sections() -> list[dict[str, object]]:
+    return [
+        {
+            "id": f"doc{d}:c{i}",
+            "vector": [float(i % 3 == 0), float(i % 3 == 1), float(d)],
+            "payload": {
+                "doc_id": f"doc{d}",
+                "section_id": f"doc{d}:s{i % 2}",
+                "level": 1 + i % 2,
+            },
+        }
+        for d in range(2)
+        for i in range(6)
+    ]
+
+
+def test_qdrant_collection_upsert_filter_and_persist(tmp_path: Path) -> None:
+    path = tmp_path / "chunks.qdrant.bin"
+    index = QdrantIndex("chunks", storage_path=str(path))
+    assert index.upsert(_sections(), batch_size=5) == 12
+    assert len(index) == 12
+
+    hits = index.search([1.0, 0.0, 0.0], k=3, payload_filter={"doc_id": "doc1"})
+    assert {hit["payload"]["doc_id"] for hit in hits} == {"doc1"}
+    assert hits[0]["id"] == "doc1:c0"
+    level_two = index.search(
+        [0.0, 1.0, 0.0], k=10, payload_filter={"doc_id": ["doc0"], "level": 2}
+    )
+    assert [hit["id"] for hit in level_two] == ["doc0:c1", "doc0:c3", "doc0:c5"]
+    assert all(hit["payload"]["section_id"] == "doc0:s1" for hit in level_two)
+    assert index.search([1.0, 0.0, 0.0], payload_filter={"doc_id": "doc9"}) == []
+
+    # Re-upserting an id replaces vector and payload in place.
+    index.upsert(
+        [{"id": "doc0:c3", "vector": [0.0, 0.0, -1.0], "payload": {"doc_id": "x"}}]
+    )
+    assert len(index) == 12
+    assert index.search([0.0, 0.0, -1.0], k=1)[0]["id"] == "doc0:c3"
+    assert index.search([0.0, 0.0, -1.0], payload_filter={"doc_id": "x"}, k=5) == [
+        {"id": "doc0:c3", "score": pytest.approx(1.0), "payload": {"doc_id": "x"}}
+    ]
+    index.save()
+
+    reloaded = QdrantIndex("chunks", storage_path=str(path))
+    assert len(reloaded) == 12
+    query = [0.3, 0.5, 1.0]
+    assert reloaded.search(query, k=4, payload_filter={"level": 1}) == index.search(
+        query, k=4, payload_filter={"level": 1}
+    )
+
+
+def test_qdrant_remote_client_against_standin(tmp_path: Path) -> None:
+    local = QdrantIndex("local")
+    local.upsert(_sections())
+    stored = tmp_path / "chunks.qdrant.bin"
+    with TestClient(create_app(str(tmp_path), flush_interval_seconds=3600)) as client:
+        remote = QdrantIndex("chunks", client=client)
+        assert remote.upsert(_sections(), batch_size=4) == 12
+        assert len(remote) == 12
+        assert not stored.exists(), "upserts only mark the collection dirty"
+        snapshot = client.post("/collections/chunks/snapshots").json()
+        assert snapshot["result"]["saved"] and stored.exists()
+        assert not client.post("/collections/chunks/snapshots").json()["result"][
+            "saved"
+        ]
+        for payload_filter in (None, {"doc_id": "doc0"}, {"level": [1, 2]}):
+            expected = local.search([0.2, 0.9, 0.1], k=4, payload_filter=payload_filter)
+            actual = remote.search([0.2, 0.9, 0.1], k=4, payload_filter=payload_filter)
+            assert [hit["id"] for hit in actual] == [hit["id"] for hit in expected]
+            assert [hit["payload"] for hit in actual] == [
+                hit["payload"] for hit in expected
+            ]
+        assert client.get("/collections/missing").status_code == 404
+        remote.upsert([{"id": "late", "vector": [1.0, 0.0, 0.0], "payload": {}}])
+    assert (
+        len(QdrantIndex("chunks", storage_path=str(stored))) == 13
+    ), "shutdown flushes pending upserts"
+
+
 def test_hybrid_search_with_faiss_and_bm25() -> None:
     bm25 = BM25Index()
     bm25.add(["fluid dynamics", "control systems"])
@@ -107,3 +421,42 @@ def test_hybrid_search_with_qdrant_only() -> None:
             "sparse": 0.0,
         }
     ]
+
+
+@pytest.mark.parametrize("index_type", ["flat", "ivf", "sq8", "pq"])
+def test_dense_search_batch_matches_single_queries(index_type: str) -> None:
+    rng = np.random.default_rng(11)
+    index = make_dense_index(16, index_type=index_type)
+    index.add(rng.normal(size=(1200, 16)).tolist())
+    index.train()
+    queries = rng.normal(size=(5, 16)).tolist()
+
+    batch = index.search_batch(queries, k=7)
+    assert len(batch) == len(queries)
+    for query, hits in zip(queries, batch, strict=True):
+        single = index.search(query, k=7)
+        assert [row for row, _ in hits] == [row for row, _ in single]
+        assert [score for _, score in hits] == pytest.approx(
+            [score for _, score in single], abs=1e-5
+        )
+    assert index.search_batch([], k=3) == []
+
+
+def test_hybrid_search_batch_matches_hybrid_search() -> None:
+    rng = np.random.default_rng(4)
+    vocab = ["pump", "valve", "motor", "sensor", "relay", "pressure", "flow"]
+    docs = [" ".join(rng.choice(vocab, size=6)) for _ in range(80)]
+    bm25 = BM25Index()
+    bm25.add(docs)
+    dense = FaissIndex(dim=8)
+    dense.add(rng.normal(size=(80, 8)).tolist())
+    queries = ["pump pressure", "relay sensor flow", "missing"]
+    vecs = rng.normal(size=(3, 8)).tolist()
+
+    batch = hybrid_search_batch(bm25, dense, queries, vecs, alpha=0.3, k=5)
+    for query, vec, hits in zip(queries, vecs, batch, strict=True):
+        expected = hybrid_search(bm25, dense, query, vec, alpha=0.3, k=5)
+        assert [hit["id"] for hit in hits] == [hit["id"] for hit in expected]
+        assert [hit["score"] for hit in hits] == pytest.approx(
+            [hit["score"] for hit in expected], abs=1e-6
+        )
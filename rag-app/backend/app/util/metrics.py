@@ -0,0 +1,28 @@
+"""Process-local counters exposed on ``/metrics``."""
+
+from __future__ import annotations
+
+import threading
+from collections.abc import Callable
+from typing import Any
+
+_PROVIDERS: dict[str, Callable[[], dict[str, Any]]] = {}
+_LOCK = threading.Lock()
+
+
+def register_metrics(name: str, provider: Callable[[], dict[str, Any]]) -> None:
+    """Publish *provider*'s snapshot under *name* (replacing any previous one)."""
+
+    with _LOCK:
+        _PROVIDERS[name] = provider
+
+
+def collect_metrics() -> dict[str, dict[str, Any]]:
+    """Return a snapshot from every registered provider."""
+
+    with _LOCK:
+        providers = dict(_PROVIDERS)
+    return {name: provider() for name, provider in sorted(providers.items())}
+
+
+__all__ = ["collect_metrics", "register_metrics"]
@@ -0,0 +1,40 @@
+"""Serve the local Qdrant stand-in for offline load tests."""
+
+from __future__ import annotations
+
+# ruff: noqa: E402
+import argparse
+import sys
+from pathlib import Path
+
+PACKAGE_ROOT = Path(__file__).resolve().parents[1]
+if str(PACKAGE_ROOT) not in sys.path:
+    sys.path.append(str(PACKAGE_ROOT))
+
+import uvicorn
+
+from backend.app.adapters.qdrant_standin import create_app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the Qdrant stand-in server")
+    parser.add_argument("--host", default="127.0.0.1", help="Bind address")
+    parser.add_argument("--port", type=int, default=6333, help="Bind port")
+    parser.add_argument(
+        "--storage-dir", default=None, help="Persist collections in this directory"
+    )
+    parser.add_argument(
+        "--flush-interval",
+        type=float,
+        default=5.0,
+        help="Seconds between writes of changed collections to --storage-dir",
+    )
+    args = parser.parse_args()
+
+    print(f"Point QDRANT_URL at http://{args.host}:{args.port}")
+    app = create_app(args.storage_dir, flush_interval_seconds=args.flush_interval)
+    uvicorn.run(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()